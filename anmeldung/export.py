@@ -0,0 +1,35 @@
+from anmeldung.models import Registration
+from tournaments.export import CHUNK_SIZE
+from tournaments.export import Export
+from tournaments.export import padel_games_export
+from tournaments.export import padel_ranking_export
+from tournaments.export import tournaments_export
+
+
+def registrations_export(tournament_id=None):
+    """Exports the registrations with the names of the players, contact data is not exported."""
+    registrations = Registration.objects.select_related('tournament', 'player_a', 'player_b').order_by('pk')
+    if tournament_id:
+        registrations = registrations.filter(tournament=tournament_id)
+
+    def rows():
+        for r in registrations.iterator(chunk_size=CHUNK_SIZE):
+            yield [r.pk, r.creation_date.isoformat(), r.tournament_id, r.tournament.name, r.player_a.first_name,
+                   r.player_a.last_name, r.player_b.first_name, r.player_b.last_name, r.is_active()]
+    return Export(['id', 'creation_date', 'tournament_id', 'tournament', 'player_a_first_name', 'player_a_last_name',
+                   'player_b_first_name', 'player_b_last_name', 'is_active'], rows(), header=True)
+
+
+EXPORTS = ('tournaments', 'games', 'rankings', 'registrations')
+
+
+def get_export(kind, tournament=None, date=None, division=None, type=None):
+    if kind == 'tournaments':
+        return tournaments_export(type)
+    elif kind == 'games':
+        return padel_games_export(tournament)
+    elif kind == 'rankings':
+        return padel_ranking_export(date, division)
+    elif kind == 'registrations':
+        return registrations_export(tournament)
+    raise ValueError('Export %s not supported.' % kind)
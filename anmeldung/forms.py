@@ -3,6 +3,7 @@ from django import forms
 from anmeldung.models import PadelPerson
 from anmeldung.models import Registration
 from tournaments.models import Club
+from tournaments.models import IngestJob
 from tournaments.models import Person
 from tournaments.models import PADEL_DIVISION_CHOICES
 from tournaments.models import PADEL_DIVISION_CHOICES_ALL
@@ -39,6 +40,12 @@ class RegistrationForm(forms.ModelForm):
         exclude = ['creation_date', 'is_active_a', 'is_active_b']
 
 
+class IngestJobForm(forms.ModelForm):
+    class Meta:
+        model = IngestJob
+        fields = ['csv_type', 'file', 'bulk']
+
+
 def get_new_player_form(request):
     NewPlayerInlineFormSet = get_new_player_form()
     return NewPlayerInlineFormSet(request)
@@ -0,0 +1,34 @@
+import sys
+
+from datetime import datetime
+
+from django.core.management.base import BaseCommand
+
+from anmeldung.export import EXPORTS
+from anmeldung.export import get_export
+
+
+class Command(BaseCommand):
+    help = 'Export tournaments, padel games, padel rankings or registrations as csv or jsonl.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=EXPORTS)
+        parser.add_argument('--format', choices=['csv', 'jsonl'], default='csv')
+        parser.add_argument('--output', default=None, help='File to write, the standard output by default.')
+        parser.add_argument('--tournament', type=int, default=None, help='Only games or registrations of a tournament.')
+        parser.add_argument('--date', default=None, help='Only rankings valid at a monday, as YYYY-MM-DD.')
+        parser.add_argument('--division', default=None, help='Only rankings of a division.')
+        parser.add_argument('--type', default=None, help='Only tournaments of a type: PADEL or TOUCH.')
+
+    def handle(self, *args, **options):
+        date = datetime.strptime(options['date'], '%Y-%m-%d').date() if options['date'] else None
+        export = get_export(options['kind'], tournament=options['tournament'], date=date,
+                            division=options['division'], type=options['type'])
+
+        output = open(options['output'], 'w', encoding='utf-8', newline='') if options['output'] else sys.stdout
+        try:
+            for line in export.lines(options['format']):
+                output.write(line)
+        finally:
+            if output is not sys.stdout:
+                output.close()
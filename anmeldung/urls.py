@@ -24,6 +24,10 @@ urlpatterns = [
     path('player/<int:id>/', views.player_detail, name='player'),
     path('team/<int:id>/', views.team_detail, name='team'),
     path('about', views.about, name='about'),
+    path('ingest', views.ingest, name='ingest'),
+    path('ingest/status', views.ingest_status, name='ingest_status'),
+    path('ingest/<int:id>/status', views.ingest_status, name='ingest_status'),
+    path('export/<str:kind>.<str:fmt>', views.export, name='export'),
 
     url(r'^activate/(?P<registration_uidb64>[0-9A-Za-z_\-]+)/(?P<player_uidb64>[0-9A-Za-z_\-]+)/(?P<token>[0-9A-Za-z]{1,13}-[0-9A-Za-z]{1,20})/$',
         views.activate, name='activate'),
@@ -1,6 +1,11 @@
 import logging
 
+from datetime import datetime
+
+from django.contrib.admin.views.decorators import staff_member_required
 from django.http import HttpResponse
+from django.http import JsonResponse
+from django.http import StreamingHttpResponse
 from django.shortcuts import render
 from django.shortcuts import redirect
 from django.utils.encoding import force_bytes
@@ -17,7 +22,9 @@ from django.db.models import Q
 #from anmeldung.models import Registration
 from anmeldung.models import get_tournament_teams_by_ranking
 from anmeldung.models import get_all_registrations
+from anmeldung.export import get_export
 from anmeldung.forms import TournamentsForm, RankingForm
+from anmeldung.forms import IngestJobForm
 from anmeldung.forms import RegistrationForm
 from anmeldung.forms import get_new_player_form
 from anmeldung.tokens import account_activation_token
@@ -25,13 +32,16 @@ from anmeldung.tokens import account_activation_token
 from tournaments.models import Person
 from tournaments.models import Tournament
 from tournaments.models import Game
+from tournaments.models import IngestJob
 from tournaments.models import Player
 from tournaments.models import get_tournament_games
 from tournaments.models import get_padel_tournament_teams
 from tournaments.models import get_padel_tournament
 from tournaments.models import get_padel_tournaments
 from tournaments.models import get_padel_ranking
+from tournaments.models import get_person_ranking_positions
 from tournaments.models import get_clubs
+from tournaments.models import get_ingest_jobs
 from tournaments.models import get_similar_tournaments
 from tournaments.models import total_clubs
 from tournaments.models import total_tournaments
@@ -248,7 +258,8 @@ def player_detail(request, id):
     return render(request, 'person.html',
                   {'partners': partners, 'tournaments': tournaments, 'games': games, 'total_games': total_games,
                    'total_tournaments': len(tournaments), 'total_wins': total_wins, 'total_lost': total_lost,
-                   'ratio': round(ratio * 100, 2), 'player': person, 'sorted_games': sorted_games, 'teams': teams})
+                   'ratio': round(ratio * 100, 2), 'player': person, 'sorted_games': sorted_games, 'teams': teams,
+                   'rankings': get_person_ranking_positions(id)})
 
 
 def _calc_team_player_detail(games, ids):
@@ -304,11 +315,58 @@ def activate(request, registration_uidb64, player_uidb64, token):
         return render(request, 'activation_failed.html')
 
 
+@staff_member_required
+def ingest(request):
+    if request.method == 'POST':
+        form = IngestJobForm(request.POST, request.FILES)
+        if form.is_valid():
+            job = form.save(commit=False)
+            job.uploaded_by = request.user
+            job.save()
+            logger.info("Ingest job %s uploaded by %s", job, request.user)
+            return redirect('ingest')
+    else:
+        form = IngestJobForm()
+
+    return render(request, 'ingest.html', {'form': form, 'jobs': get_ingest_jobs()})
+
+
+@staff_member_required
+def ingest_status(request, id=None):
+    if id is None:
+        return JsonResponse({'jobs': [job.to_dict() for job in get_ingest_jobs()]})
+    try:
+        job = IngestJob.objects.get(pk=id)
+    except ObjectDoesNotExist:
+        return JsonResponse({'error': 'Ingest job %s does not exist.' % id}, status=404)
+    return JsonResponse(job.to_dict())
+
+
+@staff_member_required
+def export(request, kind, fmt):
+    date = request.GET.get('date')
+    tournament = request.GET.get('tournament')
+    try:
+        tournament = int(tournament) if tournament else None
+    except ValueError:
+        return JsonResponse({'error': 'Tournament %s is not an id.' % tournament}, status=400)
+    try:
+        lines = get_export(kind, tournament=tournament,
+                           date=datetime.strptime(date, '%Y-%m-%d').date() if date else None,
+                           division=request.GET.get('division'), type=request.GET.get('type')).lines(fmt)
+    except ValueError as ex:
+        return JsonResponse({'error': str(ex)}, status=400)
+    content_type = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    response = StreamingHttpResponse(lines, content_type=content_type + '; charset=utf-8')
+    response['Content-Disposition'] = 'attachment; filename="%s.%s"' % (kind, fmt)
+    return response
+
+
 def handler404(request, exception, template_name='404.html'):
     return render(request, template_name=template_name, status=404)
 
 
-def handler500(request, exception, template_name='404.html'):
+def handler500(request, template_name='404.html'):
     return render(request, template_name=template_name, status=500)
 
 
@@ -48,6 +48,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'tournaments.bluegreen.ReconnectMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.locale.LocaleMiddleware',
@@ -87,12 +88,19 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # seconds a connection waits for the write lock of another one, e.g. a chunk of a parallel readcsv job
+        'OPTIONS': {'timeout': 60},
+        # the apps have no migrations, the database tests create their tables from the models
+        'TEST': {'SERIALIZE': False},
     }
 }
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
 
+# uploaded csv files of ingest jobs, not served
+INGEST_ROOT = os.path.join(BASE_DIR, 'private')
+
 # Password validation
 # https://docs.djangoproject.com/en/1.11/ref/settings/#auth-password-validators
 
@@ -0,0 +1,215 @@
+import logging
+import os
+import shutil
+import sqlite3
+import time
+
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import Signal
+from django.dispatch import receiver
+
+# Get an instance of a logger
+logger = logging.getLogger(__name__)
+
+# pages copied per step of the online backup, readers and writers of the live database run between the steps
+BACKUP_PAGES = 1024
+BACKUP_SLEEP = 0.005
+GREEN_SUFFIX = '.green'
+BLUE_SUFFIX = '.blue'
+# offset of the file change counter in the sqlite header, incremented by every commit in rollback journal mode
+CHANGE_COUNTER_OFFSET = 24
+# seconds to wait for the write transactions running on the live database before the swap
+SWAP_TIMEOUT = 30
+
+# sent with the alias and the path after a new database file replaced the live one
+database_swapped = Signal(providing_args=['alias', 'path'])
+
+
+class SwapError(Exception):
+    pass
+
+
+def get_change_counter(path):
+    with open(path, 'rb') as f:
+        f.seek(CHANGE_COUNTER_OFFSET)
+        return int.from_bytes(f.read(4), 'big')
+
+
+def read_change_counter(fd):
+    return int.from_bytes(os.pread(fd, 4, CHANGE_COUNTER_OFFSET), 'big')
+
+
+def get_inode(path):
+    try:
+        return os.stat(path).st_ino
+    except OSError:
+        return None
+
+
+def copy_database(source, target, pages=BACKUP_PAGES, sleep=BACKUP_SLEEP):
+    """Copies a live sqlite database with the online backup api, in steps of pages so the source stays available."""
+    if os.path.exists(target):
+        os.remove(target)
+    src = sqlite3.connect(source)
+    dst = sqlite3.connect(target)
+    try:
+        with dst:
+            src.backup(dst, pages=pages, progress=lambda status, remaining, total: time.sleep(sleep))
+        # the copy replaces the live file, so it must not depend on a write-ahead log next to it
+        dst.execute('PRAGMA journal_mode=DELETE')
+    finally:
+        dst.close()
+        src.close()
+
+
+def verify_database(path, foreign_key_errors=0):
+    """Raises a SwapError if the database is corrupt or has more broken foreign keys than foreign_key_errors."""
+    db = sqlite3.connect(path)
+    try:
+        result = db.execute('PRAGMA integrity_check').fetchall()
+        if result != [('ok',)]:
+            raise SwapError('Integrity check of %s failed: %s' % (path, result[:10]))
+        errors = len(db.execute('PRAGMA foreign_key_check').fetchall())
+        if errors > foreign_key_errors:
+            raise SwapError('The import added %d broken foreign keys to %s' % (errors - foreign_key_errors, path))
+    finally:
+        db.close()
+
+
+def count_foreign_key_errors(path):
+    db = sqlite3.connect(path)
+    try:
+        return len(db.execute('PRAGMA foreign_key_check').fetchall())
+    finally:
+        db.close()
+
+
+@contextmanager
+def green_database(alias=DEFAULT_DB_ALIAS, keep_blue=True, force=False):
+    """
+    Runs the block against a copy of the live sqlite database and swaps the copy in when the block succeeds. The
+    live database stays readable and writable meanwhile, the copy is verified before the swap and the swap is a
+    rename, so readers see the old or the new database but never a partial import. If the live database was
+    written during the block the swap is refused, unless force, because those writes would be lost. The replaced
+    database is kept next to it with BLUE_SUFFIX if keep_blue.
+
+    Connections opened before the swap keep reading and writing the replaced file. Web requests reopen the database
+    through ReconnectMiddleware and the ingestworker command before every job, other long running processes writing
+    to the database must call close_swapped_connections after a swap, or be stopped while the block runs.
+    """
+    connection = connections[alias]
+    if connection.vendor != 'sqlite':
+        raise SwapError('Database %s is not sqlite.' % alias)
+    live = connection.settings_dict['NAME']
+    green = live + GREEN_SUFFIX
+    connection.close()
+    db = sqlite3.connect(live)
+    try:
+        if db.execute('PRAGMA journal_mode').fetchone()[0].lower() == 'wal':
+            raise SwapError('Database %s is in wal mode, its file can not be swapped.' % live)
+    finally:
+        db.close()
+
+    start = time.perf_counter()
+    counter = get_change_counter(live)
+    copy_database(live, green)
+    foreign_key_errors = count_foreign_key_errors(green)
+    logger.info('Copied %s to %s in %.1f s', live, green, time.perf_counter() - start)
+
+    connection.settings_dict['NAME'] = green
+    try:
+        yield green
+    except BaseException:
+        connection.close()
+        connection.settings_dict['NAME'] = live
+        os.remove(green)
+        raise
+    connection.close()
+    connection.settings_dict['NAME'] = live
+
+    try:
+        verify_database(green, foreign_key_errors)
+        swap_database(live, green, keep_blue, None if force else counter)
+    except SwapError:
+        os.remove(green)
+        raise
+    database_swapped.send(sender=None, alias=alias, path=live)
+
+
+def copy_ownership(source, target):
+    """Gives target the mode, owner and group of source, so the processes writing source can write target."""
+    shutil.copymode(source, target)
+    stat = os.stat(source)
+    target_stat = os.stat(target)
+    if (target_stat.st_uid, target_stat.st_gid) != (stat.st_uid, stat.st_gid):
+        try:
+            os.chown(target, stat.st_uid, stat.st_gid)
+        except PermissionError as ex:
+            raise SwapError('Owner of %s can not be given to %s: %s' % (source, target, ex))
+
+
+def swap_database(live, green, keep_blue=True, counter=None, timeout=SWAP_TIMEOUT):
+    """
+    Replaces the live database file by the green one with an atomic rename. The rename runs holding the write lock
+    of the live database, so no commit lands in the replaced file between the check of the change counter and the
+    rename. Raises a SwapError if counter is given and the live database was written since it was read.
+    """
+    blue = live + BLUE_SUFFIX
+    # the copy is created with the owner and umask of the importing user, not those of the web server
+    copy_ownership(live, green)
+    # the header is read through a descriptor kept open until the lock is released: closing any descriptor of the
+    # file would drop the posix locks sqlite holds on it
+    fd = os.open(live, os.O_RDONLY)
+    try:
+        db = sqlite3.connect(live, timeout=timeout, isolation_level=None)
+        try:
+            try:
+                # waits for the running write transactions and keeps new ones out until the rename is done
+                db.execute('BEGIN IMMEDIATE')
+            except sqlite3.OperationalError as ex:
+                raise SwapError('Database %s could not be locked for the swap: %s' % (live, ex))
+            if counter is not None and read_change_counter(fd) != counter:
+                raise SwapError('Database %s was written during the import, read the files again.' % live)
+            if keep_blue:
+                if os.path.exists(blue):
+                    os.remove(blue)
+                # a hard link keeps the old file without a moment in which the live path is missing
+                os.link(live, blue)
+            os.replace(green, live)
+            db.execute('ROLLBACK')
+        finally:
+            db.close()
+    finally:
+        os.close(fd)
+    logger.info('Swapped %s into %s', green, live)
+
+
+@receiver(connection_created)
+def remember_inode(sender, connection, **kwargs):
+    if connection.vendor == 'sqlite':
+        connection.database_inode = get_inode(connection.settings_dict['NAME'])
+
+
+def close_swapped_connections():
+    """Closes the sqlite connections of the thread whose file was swapped, the next query opens the new file."""
+    for connection in connections.all():
+        inode = getattr(connection, 'database_inode', None)
+        if connection.connection is not None and inode is not None and \
+                get_inode(connection.settings_dict['NAME']) != inode:
+            logger.info('Reconnecting %s after a database swap', connection.alias)
+            connection.close()
+
+
+class ReconnectMiddleware:
+    """Reopens the database at the start of a request if it was swapped, for persistent connections."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        close_swapped_connections()
+        return self.get_response(request)
@@ -0,0 +1,936 @@
+import heapq
+import logging
+
+from datetime import datetime
+from datetime import timedelta
+
+from django.db import connection
+from django.db import transaction
+from django.db.models import Max
+
+from tournaments.models import Game
+from tournaments.models import GameField
+from tournaments.models import PadelRanking
+from tournaments.models import PadelResult
+from tournaments.models import Person
+from tournaments.models import Player
+from tournaments.models import PlayerStadistic
+from tournaments.models import RankingPosition
+from tournaments.models import RankingSnapshot
+from tournaments.models import Team
+from tournaments.models import Tournament
+from tournaments.models import get_normalized_name
+from tournaments.models import get_player_gender
+from tournaments.service import ranking_interval
+from tournaments import phases
+from tournaments import telemetry
+
+# Get an instance of a logger
+logger = logging.getLogger(__name__)
+
+# sqlite does not accept more than 999 variables per query
+BATCH_SIZE = 500
+
+
+def chunks(items, size=BATCH_SIZE):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def bulk_create_with_ids(model, objs, batch_size=BATCH_SIZE):
+    """
+    Inserts objs with bulk_create and sets the primary key of every object.
+
+    Backends which cannot return ids from a bulk insert (sqlite) get the ids of the last inserted rows, therefore
+    it must run inside the transaction holding the write lock.
+    """
+    if not objs:
+        return objs
+    if connection.features.can_return_ids_from_bulk_insert:
+        return model.objects.bulk_create(objs, batch_size)
+    assert connection.in_atomic_block, "bulk_create_with_ids must run inside a transaction."
+    model.objects.bulk_create(objs, batch_size)
+    ids = model.objects.order_by('-pk').values_list('pk', flat=True)[:len(objs)]
+    for obj, pk in zip(objs, reversed(list(ids))):
+        obj.pk = pk
+    return objs
+
+
+def bulk_get_or_create(model, objs, fields, batch_size=BATCH_SIZE):
+    """
+    Inserts objs skipping the rows which already exist by the natural key fields of the model, for example because a
+    concurrent import wrote them meanwhile, and sets the primary key of every object from the stored rows. Returns
+    the number of objects whose rows were already stored.
+
+    The natural key must be a unique constraint of the model, the first field is used to query the stored rows. Rows
+    with a primary key above the last one before the insert are the inserted ones, like bulk_create_with_ids it
+    relies on the write lock of the transaction.
+    """
+    if not objs:
+        return 0
+    last = model.objects.aggregate(last=Max('pk'))['last'] or 0
+    model.objects.bulk_create(objs, batch_size, ignore_conflicts=True)
+    by_key = {tuple(getattr(obj, field) for field in fields): obj for obj in objs}
+    for batch in chunks({getattr(obj, fields[0]) for obj in objs}, batch_size):
+        for pk, *key in model.objects.filter(**{fields[0] + '__in': batch}).values_list('pk', *fields):
+            obj = by_key.get(tuple(key))
+            if obj is not None:
+                obj.pk = pk
+    return sum(1 for obj in objs if obj.pk is not None and obj.pk <= last)
+
+
+class PersonMap:
+    """
+    Resolves persons by normalized name with the same rules as DjangoSimpleFetcher.get_or_create_person from a
+    prefetched map. New persons and gender updates are written by flush.
+    """
+
+    def __init__(self):
+        self.persons = dict()
+        self.new_persons = list()
+        self.updated_persons = dict()
+        # stored persons returned by get
+        self.found = set()
+
+    def load(self, names):
+        """Prefetches the persons of the given (first_name, last_name) pairs."""
+        keys = {get_normalized_name(first_name, last_name) for first_name, last_name in names}
+        for batch in chunks(keys - set(self.persons)):
+            for person in Person.objects.filter(normalized_name__in=batch).order_by('pk'):
+                self.persons.setdefault(person.normalized_name, []).append(person)
+
+    def get(self, first_name, last_name, gender):
+        key = get_normalized_name(first_name, last_name)
+        candidates = self.persons.get(key, [])
+        if len(candidates) == 1:
+            person = candidates[0]
+            if gender != Person.UNKNOWN and person.gender == Person.UNKNOWN:
+                person.gender = gender
+                if person.pk:
+                    self.updated_persons[person.pk] = person
+            if person.pk:
+                self.found.add(person.pk)
+            return person
+        elif len(candidates) > 1:
+            candidates = [p for p in candidates if p.gender == gender]
+            if len(candidates) == 0:
+                raise Person.DoesNotExist('Person %s %s %s does not exist.' % (first_name, last_name, gender))
+            elif len(candidates) > 1:
+                raise Person.MultipleObjectsReturned(
+                    'Person %s %s %s returned more than one person.' % (first_name, last_name, gender))
+            self.found.add(candidates[0].pk)
+            return candidates[0]
+        person = Person(first_name=first_name, last_name=last_name, gender=gender, normalized_name=key)
+        self.persons[key] = [person]
+        self.new_persons.append(person)
+        return person
+
+    def flush(self):
+        """Writes new persons and gender updates, returns the number of persons created and found."""
+        stored = bulk_get_or_create(Person, self.new_persons, ('normalized_name', 'gender'))
+        created = len(self.new_persons) - stored
+        found = len(self.found) + stored
+        Person.objects.bulk_update(self.updated_persons.values(), ['gender'], BATCH_SIZE)
+        self.new_persons = list()
+        self.updated_persons = dict()
+        self.found = set()
+        return created, found
+
+
+class LinkBuffer:
+    """
+    Collects the tournament/team and player/tournament links of an import and writes them at once through the
+    many-to-many tables. Links which already exist are skipped by the database.
+    """
+
+    def __init__(self):
+        # dicts keep the links in insertion order
+        self.tournament_teams = dict()
+        self.player_tournaments = dict()
+
+    def add_team(self, tournament_id, team_id):
+        self.tournament_teams[(tournament_id, team_id)] = None
+
+    def add_tournament(self, player_id, tournament_id):
+        self.player_tournaments[(player_id, tournament_id)] = None
+
+    def clear(self):
+        self.tournament_teams.clear()
+        self.player_tournaments.clear()
+
+    def flush(self):
+        """Writes the collected links, returns the number of links written or already existing."""
+        TournamentTeam = Tournament.teams.through
+        PlayerTournament = Player.tournaments_played.through
+        TournamentTeam.objects.bulk_create(
+            [TournamentTeam(tournament_id=t, team_id=team) for t, team in self.tournament_teams],
+            BATCH_SIZE, ignore_conflicts=True)
+        PlayerTournament.objects.bulk_create(
+            [PlayerTournament(player_id=p, tournament_id=t) for p, t in self.player_tournaments],
+            BATCH_SIZE, ignore_conflicts=True)
+        result = len(self.tournament_teams) + len(self.player_tournaments)
+        self.clear()
+        return result
+
+
+def get_player_number(number):
+    """Returns the shirt number of a csv row as DjangoSimpleFetcher.get_or_create_player stores it."""
+    if number:
+        try:
+            return int(number)
+        except ValueError:
+            pass
+    return None
+
+
+RESULT_FIELDS = ['local1', 'local2', 'local3', 'local4', 'local5',
+                 'visitor1', 'visitor2', 'visitor3', 'visitor4', 'visitor5', 'winner']
+
+
+def get_game_key(game):
+    return game.tournament_id, game.phase_id, game.local_id, game.visitor_id
+
+
+def get_result_values(result):
+    """Returns the sets and the winner of a result as integers, None if the game has no result."""
+    if result is None:
+        return None
+    return tuple(None if getattr(result, name) in (None, '') else int(getattr(result, name))
+                 for name in RESULT_FIELDS)
+
+
+def get_game_values(game):
+    """Returns the values telling equal games apart: key, scores, field, time and the sets of the result."""
+    return get_game_key(game) + (int(game.local_score), int(game.visitor_score), game.field_id, game.time,
+                                 get_result_values(game.result_padel))
+
+
+class DjangoBulkFetcher:
+    """
+    Writes padel csv games with the same rows as DjangoCsvFetcher.create_padel_csv_game but resolving tournaments,
+    teams, persons, players, phases and fields through in-memory identity maps, so the number of queries depends on
+    the distinct objects of a file and not on its rows.
+    """
+    TYPE = 'PADEL'
+
+    def __init__(self):
+        self.tournaments = dict()
+        self.teams = dict()
+        self.persons = PersonMap()
+        self.players = dict()
+        self.fields = dict()
+        self.links = LinkBuffer()
+        self.created = dict()
+        self.found = dict()
+
+    def _count(self, model, created, found=0):
+        self.created[model.__name__] = self.created.get(model.__name__, 0) + created
+        self.found[model.__name__] = self.found.get(model.__name__, 0) + found
+
+    def create_padel_csv_games(self, games):
+        games = list(games)
+        stats = telemetry.stats
+        with transaction.atomic():
+            rows = self.resolve_games(games)
+            with stats.timer('write'):
+                self.flush_games(rows)
+        stats.count(self.created, self.found)
+        logger.info('Bulk import of %d padel games created: %s', len(games), self.created)
+        return self.created
+
+    def resolve_games(self, games):
+        """Resolves the csv games and writes their persons, players and tournament links, returns the game rows."""
+        stats = telemetry.stats
+        with stats.timer('resolve'):
+            self.load_fields(games)
+            self.load_tournaments(games)
+            self.load_teams(games)
+            self.load_persons(games)
+            rows = [self.resolve_game(game) for game in games]
+        with stats.timer('write'):
+            self.flush_persons()
+            self.load_players(rows)
+            self.add_tournament_teams(rows)
+            self.flush_players(rows)
+        return rows
+
+    # identity maps
+
+    def load_fields(self, games):
+        names = {game.field for game in games if game.field}
+        for batch in chunks(names):
+            for field in GameField.objects.filter(name__in=batch).order_by('pk'):
+                self.fields.setdefault(field.name, field)
+        new_fields = [GameField(name=name) for name in names if name not in self.fields]
+        stored = bulk_get_or_create(GameField, new_fields, ('name',))
+        self._count(GameField, len(new_fields) - stored, len(names) - len(new_fields) + stored)
+        for field in new_fields:
+            self.fields[field.name] = field
+
+    def load_tournaments(self, games):
+        keys = {(game.tournament_name, game.division, self.TYPE, game.ranking) for game in games}
+        for batch in chunks({key[0] for key in keys}):
+            for t in Tournament.objects.filter(type=self.TYPE, name__in=batch).order_by('pk'):
+                self.tournaments.setdefault((t.name, t.division, t.type, t.padel_serie), t)
+        new_tournaments = [Tournament(name=key[0], division=key[1], type=key[2], padel_serie=key[3])
+                           for key in keys if key not in self.tournaments]
+        stored = bulk_get_or_create(Tournament, new_tournaments, ('name', 'division', 'type', 'padel_serie'))
+        self._count(Tournament, len(new_tournaments) - stored, len(keys) - len(new_tournaments) + stored)
+        for t in new_tournaments:
+            self.tournaments[(t.name, t.division, t.type, t.padel_serie)] = t
+
+    def load_teams(self, games):
+        keys = set()
+        for game in games:
+            keys.add((game.local, game.division))
+            keys.add((game.visitor, game.division))
+        for batch in chunks({key[0] for key in keys}):
+            for team in Team.objects.filter(name__in=batch).order_by('pk'):
+                self.teams.setdefault((team.name, team.division), team)
+        new_teams = [Team(name=key[0], division=key[1]) for key in keys if key not in self.teams]
+        stored = bulk_get_or_create(Team, new_teams, ('name', 'division'))
+        self._count(Team, len(new_teams) - stored, len(keys) - len(new_teams) + stored)
+        for team in new_teams:
+            self.teams[(team.name, team.division)] = team
+
+    def load_persons(self, games):
+        persons = set()
+        for game in games:
+            names = game.padel_team_names
+            persons.update([(names.local_first_first_name, names.local_first_last_name),
+                            (names.local_second_first_name, names.local_second_last_name),
+                            (names.visitor_first_first_name, names.visitor_first_last_name),
+                            (names.visitor_second_first_name, names.visitor_second_last_name)])
+        self.persons.load(persons)
+
+    def load_players(self, rows):
+        team_ids = {row['local'].pk for row in rows} | {row['visitor'].pk for row in rows}
+        for batch in chunks(team_ids):
+            for player in Player.objects.filter(team_id__in=batch, number__isnull=True).order_by('pk'):
+                self.players.setdefault((player.person_id, player.team_id), player)
+
+    # resolution of a single csv game
+
+    @staticmethod
+    def get_phase(game):
+        return phases.registry.get(game.category, game.round, game.nteams)
+
+    def resolve_game(self, game):
+        names = game.padel_team_names
+        gender = get_player_gender(game.division)
+        return {
+            'tournament': self.tournaments[(game.tournament_name, game.division, self.TYPE, game.ranking)],
+            'local': self.teams[(game.local, game.division)],
+            'visitor': self.teams[(game.visitor, game.division)],
+            'phase': self.get_phase(game),
+            'field': self.fields[game.field] if game.field else None,
+            'time': getattr(game, 'time', None),
+            'local_persons': [
+                self.persons.get(names.local_first_first_name, names.local_first_last_name, gender),
+                self.persons.get(names.local_second_first_name, names.local_second_last_name, gender)],
+            'visitor_persons': [
+                self.persons.get(names.visitor_first_first_name, names.visitor_first_last_name, gender),
+                self.persons.get(names.visitor_second_first_name, names.visitor_second_last_name, gender)],
+            'local_score': game.local_score,
+            'visitor_score': game.visitor_score,
+            'scores': game.padel_result.scores,
+        }
+
+    # writes
+
+    def flush_persons(self):
+        self._count(Person, *self.persons.flush())
+
+    def add_tournament_teams(self, rows):
+        for row in rows:
+            for team in [row['local'], row['visitor']]:
+                self.links.add_team(row['tournament'].pk, team.pk)
+
+    def flush_players(self, rows):
+        keys = set()
+        new_players = list()
+        for row in rows:
+            for team, persons in [(row['local'], row['local_persons']), (row['visitor'], row['visitor_persons'])]:
+                for person in persons:
+                    keys.add((person.pk, team.pk))
+                    if (person.pk, team.pk) not in self.players:
+                        player = Player(person=person, team=team, number=None)
+                        self.players[(person.pk, team.pk)] = player
+                        new_players.append(player)
+        bulk_create_with_ids(Player, new_players)
+        self._count(Player, len(new_players), len(keys) - len(new_players))
+
+        for row in rows:
+            for team, persons in [(row['local'], row['local_persons']), (row['visitor'], row['visitor_persons'])]:
+                for person in persons:
+                    self.links.add_tournament(self.players[(person.pk, team.pk)].pk, row['tournament'].pk)
+        self.links.flush()
+
+    @staticmethod
+    def load_game_values(rows):
+        values = set()
+        for batch in chunks({row['tournament'].pk for row in rows}):
+            for game in Game.objects.filter(tournament_id__in=batch, result_padel__isnull=False).select_related(
+                    'result_padel'):
+                values.add(get_game_values(game))
+        return values
+
+    def flush_games(self, rows):
+        # like the single row path, a game and its result are only written if the tournament has no equal game
+        known = self.load_game_values(rows) if rows else set()
+        new_games = list()
+        for row in rows:
+            game = Game(tournament=row['tournament'], local=row['local'], visitor=row['visitor'],
+                        local_score=row['local_score'], visitor_score=row['visitor_score'], phase=row['phase'],
+                        field=row['field'], time=row['time'], result_padel=PadelResult.create(row['scores']))
+            values = get_game_values(game)
+            if values not in known:
+                known.add(values)
+                new_games.append(game)
+        bulk_create_with_ids(PadelResult, [game.result_padel for game in new_games])
+        self._count(PadelResult, len(new_games))
+        for game in new_games:
+            # assigned again so result_padel_id takes the id of the inserted result
+            game.result_padel = game.result_padel
+        Game.objects.bulk_create(new_games, BATCH_SIZE)
+        # games equal to a stored game or to a previous row
+        self._count(Game, len(new_games), len(rows) - len(new_games))
+
+
+class DjangoReplaceFetcher(DjangoBulkFetcher):
+    """
+    Replaces the padel games of the tournaments of a file by the games of the file. Games are matched by (phase,
+    local, visitor): games of the file missing in the tournament are inserted, games with other scores, field or time
+    are updated and the games of the tournament missing in the file, duplicates included, are deleted. Reading a
+    corrected file therefore writes only the corrected games.
+    """
+    GAME_FIELDS = ['local_score', 'visitor_score', 'field', 'time', 'result_padel']
+
+    def __init__(self):
+        super().__init__()
+        self.updated = dict()
+        self.deleted = dict()
+
+    def replace_padel_csv_games(self, games):
+        games = list(games)
+        stats = telemetry.stats
+        with transaction.atomic():
+            rows = self.resolve_games(games)
+            with stats.timer('resolve'):
+                existing, duplicates = self.load_games(rows)
+                new_rows, updated = self.diff_games(rows, existing)
+                self._count(Game, 0, len(rows) - len(new_rows))
+                deleted = duplicates + list(existing.values())
+            with stats.timer('write'):
+                self.flush_games(new_rows)
+                self.update_games(updated)
+                self.delete_games(deleted)
+        stats.count(self.created, self.found)
+        logger.info('Replaced the games of %d padel tournaments, created: %s, updated: %s, deleted: %s',
+                    len({row['tournament'].pk for row in rows}), self.created, self.updated, self.deleted)
+        return {'created': self.created, 'updated': self.updated, 'deleted': self.deleted}
+
+    @staticmethod
+    def load_games(rows):
+        """Returns the games of the tournaments of the rows by key and the games repeating a key."""
+        existing = dict()
+        duplicates = list()
+        for batch in chunks({row['tournament'].pk for row in rows}):
+            for game in Game.objects.filter(tournament_id__in=batch).select_related('result_padel').order_by('pk'):
+                key = get_game_key(game)
+                if key in existing:
+                    duplicates.append(game)
+                else:
+                    existing[key] = game
+        return existing, duplicates
+
+    @staticmethod
+    def diff_games(rows, existing):
+        """
+        Returns the rows of new games and the changed games. The games found for the rows are removed from
+        existing, what remains are the games missing in the file.
+        """
+        by_key = dict()
+        for row in rows:
+            key = (row['tournament'].pk, row['phase'].pk, row['local'].pk, row['visitor'].pk)
+            if key in by_key:
+                logger.warning('Game %s is repeated in the file, the last row is kept', key)
+            by_key[key] = row
+
+        new_rows = list()
+        updated = list()
+        for key, row in by_key.items():
+            game = existing.pop(key, None)
+            if game is None:
+                new_rows.append(row)
+                continue
+            result = PadelResult.create(row['scores'])
+            changed = get_result_values(game.result_padel) != get_result_values(result)
+            if changed:
+                if game.result_padel is not None:
+                    result.pk = game.result_padel.pk
+                game.result_padel = result
+            for name, value in [('local_score', row['local_score']), ('visitor_score', row['visitor_score']),
+                                ('field', row['field']), ('time', row['time'])]:
+                if getattr(game, name) != value:
+                    setattr(game, name, value)
+                    changed = True
+            if changed:
+                updated.append(game)
+        return new_rows, updated
+
+    def update_games(self, games):
+        results = [game.result_padel for game in games if game.result_padel is not None]
+        new_results = [result for result in results if result.pk is None]
+        PadelResult.objects.bulk_update(
+            [result for result in results if result.pk is not None], RESULT_FIELDS, BATCH_SIZE)
+        bulk_create_with_ids(PadelResult, new_results)
+        self._count(PadelResult, len(new_results))
+        for game in games:
+            # assigned again so result_padel_id takes the id of a new result
+            game.result_padel = game.result_padel
+        Game.objects.bulk_update(games, self.GAME_FIELDS, BATCH_SIZE)
+        self.updated[Game.__name__] = len(games)
+
+    def delete_games(self, games):
+        result_ids = [game.result_padel_id for game in games if game.result_padel_id]
+        for batch in chunks([game.pk for game in games]):
+            Game.objects.filter(pk__in=batch).delete()
+        for batch in chunks(result_ids):
+            PadelResult.objects.filter(pk__in=batch).delete()
+        self.deleted[Game.__name__] = len(games)
+        self.deleted[PadelResult.__name__] = len(result_ids)
+
+
+class DjangoBulkStatisticFetcher:
+    """
+    Writes nts and fit player statistics with the same rows as DjangoCsvFetcher.create_csv_nts_player_statistic and
+    create_csv_fit_statistic. The teams, players, games and statistics of the tournaments of a file are loaded once
+    into dictionaries keyed by the natural keys of the csv rows, so a tournament costs a few queries instead of about
+    ten per row, and the statistics are written in batches.
+    """
+    TYPE = 'TOUCH'
+    NTS_FIELDS = ['points', 'mvp']
+    FIT_FIELDS = ['played', 'points', 'mvp']
+
+    def __init__(self):
+        self.tournaments = dict()
+        self.teams = dict()
+        self.persons = PersonMap()
+        self.players = dict()
+        self.links = LinkBuffer()
+        self.games = dict()
+        self.statistics = dict()
+        self.new_statistics = list()
+        self.updated_statistics = dict()
+        self.created = dict()
+        self.found = dict()
+
+    def _count(self, model, created, found=0):
+        self.created[model.__name__] = self.created.get(model.__name__, 0) + created
+        self.found[model.__name__] = self.found.get(model.__name__, 0) + found
+
+    @staticmethod
+    def has_game(csv_stats):
+        # nts rows without visitor score only register the player
+        return bool(csv_stats.visitor_score)
+
+    def create_nts_statistics(self, csv_stats):
+        csv_stats = list(csv_stats)
+        stats = telemetry.stats
+        with transaction.atomic():
+            players = self.resolve_players(csv_stats, [s for s in csv_stats if self.has_game(s)])
+            with stats.timer('resolve'):
+                game_stats = [(s, player) for s, player in zip(csv_stats, players) if self.has_game(s)]
+                if game_stats:
+                    self.load_games(game_stats)
+                    self.load_nts_statistics(game_stats)
+                for s, player in game_stats:
+                    self.add_nts_statistic(s, player)
+            with stats.timer('write'):
+                self.flush_statistics(self.NTS_FIELDS)
+        return self.finish(len(csv_stats))
+
+    def create_fit_statistics(self, csv_stats):
+        csv_stats = list(csv_stats)
+        stats = telemetry.stats
+        with transaction.atomic():
+            players = self.resolve_players(csv_stats, [])
+            with stats.timer('resolve'):
+                if csv_stats:
+                    self.load_fit_statistics(csv_stats)
+                for s, player in zip(csv_stats, players):
+                    self.add_fit_statistic(s, player)
+            with stats.timer('write'):
+                self.flush_statistics(self.FIT_FIELDS)
+        return self.finish(len(csv_stats))
+
+    def finish(self, n):
+        telemetry.stats.count(self.created, self.found)
+        logger.info('Bulk import of %d player statistics created: %s, updated: %d', n, self.created,
+                    len(self.updated_statistics))
+        return self.created
+
+    def resolve_players(self, csv_stats, game_stats):
+        """Resolves and writes the tournaments, teams, persons and players of the rows, returns the players."""
+        stats = telemetry.stats
+        with stats.timer('resolve'):
+            self.load_tournaments(csv_stats)
+            self.load_teams(csv_stats, game_stats)
+            self.persons.load({(s.first_name, s.last_name) for s in csv_stats})
+            persons = [self.persons.get(s.first_name, s.last_name, s.gender) for s in csv_stats]
+        with stats.timer('write'):
+            self._count(Person, *self.persons.flush())
+            players = self.flush_players(csv_stats, persons)
+            for s, player in zip(csv_stats, players):
+                self.links.add_tournament(player.pk, self.get_tournament(s).pk)
+            self.links.flush()
+        return players
+
+    # identity maps
+
+    def load_tournaments(self, csv_stats):
+        keys = {(s.tournament_name, s.division) for s in csv_stats}
+        for batch in chunks({key[0] for key in keys}):
+            for t in Tournament.objects.filter(
+                    type=self.TYPE, padel_serie__isnull=True, name__in=batch).order_by('pk'):
+                self.tournaments.setdefault((t.name, t.division), t)
+        new_tournaments = [Tournament(name=key[0], division=key[1], type=self.TYPE, padel_serie=None)
+                           for key in keys if key not in self.tournaments]
+        stored = bulk_get_or_create(Tournament, new_tournaments, ('name', 'division', 'type', 'padel_serie'))
+        self._count(Tournament, len(new_tournaments) - stored, len(keys) - len(new_tournaments) + stored)
+        for t in new_tournaments:
+            self.tournaments[(t.name, t.division)] = t
+
+    def load_teams(self, csv_stats, game_stats):
+        """Loads the teams of the players, created if missing, and the teams of the games, which must exist."""
+        keys = {(s.team, s.division) for s in csv_stats}
+        game_keys = {(name, s.division) for s in game_stats for name in (s.local, s.visitor)}
+        for batch in chunks({key[0] for key in keys | game_keys}):
+            for team in Team.objects.filter(name__in=batch).order_by('pk'):
+                self.teams.setdefault((team.name, team.division), team)
+        new_teams = [Team(name=key[0], division=key[1]) for key in keys if key not in self.teams]
+        stored = bulk_get_or_create(Team, new_teams, ('name', 'division'))
+        self._count(Team, len(new_teams) - stored, len(keys) - len(new_teams) + stored)
+        for team in new_teams:
+            self.teams[(team.name, team.division)] = team
+
+    def load_games(self, game_stats):
+        tournament_ids = {self.get_tournament(s).pk for s, player in game_stats}
+        for batch in chunks(tournament_ids):
+            for game in Game.objects.filter(tournament_id__in=batch).order_by('pk'):
+                key = (game.tournament_id, game.phase_id, game.local_id, game.visitor_id, game.local_score,
+                       game.visitor_score)
+                self.games.setdefault(key, []).append(game)
+
+    def load_nts_statistics(self, game_stats):
+        tournament_ids = {self.get_tournament(s).pk for s, player in game_stats}
+        for batch in chunks(tournament_ids):
+            for stat in PlayerStadistic.objects.filter(game__tournament_id__in=batch).order_by('pk'):
+                self.statistics.setdefault((stat.game_id, stat.player_id), stat)
+
+    def load_fit_statistics(self, csv_stats):
+        tournament_ids = {self.get_tournament(s).pk for s in csv_stats}
+        for batch in chunks(tournament_ids):
+            for stat in PlayerStadistic.objects.filter(tournament_id__in=batch).order_by('pk'):
+                self.statistics.setdefault((stat.tournament_id, stat.player_id), stat)
+
+    # resolution of a single csv row
+
+    def get_tournament(self, csv_stats):
+        return self.tournaments[(csv_stats.tournament_name, csv_stats.division)]
+
+    def get_team(self, name, division):
+        try:
+            return self.teams[(name, division)]
+        except KeyError:
+            raise Team.DoesNotExist('Team %s %s does not exist.' % (name, division))
+
+    def get_game(self, tournament, phase, local, local_score, visitor, visitor_score):
+        """Finds a game like DjangoSimpleFetcher.get_game, first with the given local and visitor then swapped."""
+        for key in [(tournament.pk, phase.pk, local.pk, visitor.pk, local_score, visitor_score),
+                    (tournament.pk, phase.pk, visitor.pk, local.pk, visitor_score, local_score)]:
+            candidates = self.games.get(key, [])
+            if len(candidates) > 1:
+                raise Game.MultipleObjectsReturned('Game %s returned more than one game.' % (key,))
+            if candidates:
+                return candidates[0]
+        raise Game.DoesNotExist('Game %s %s %s %s - %s %s does not exist.' % (
+            tournament, phase, local, local_score, visitor_score, visitor))
+
+    def add_nts_statistic(self, csv_stats, player):
+        local = self.get_team(csv_stats.local, csv_stats.division)
+        visitor = self.get_team(csv_stats.visitor, csv_stats.division)
+        phase = phases.registry.get(csv_stats.category, csv_stats.round, csv_stats.team_numbers)
+        game = self.get_game(self.get_tournament(csv_stats), phase, local, int(csv_stats.local_score), visitor,
+                             int(csv_stats.visitor_score))
+        if not csv_stats.tries or int(csv_stats.tries) <= 0:
+            return
+        stat = self.statistics.get((game.pk, player.pk))
+        if stat is None:
+            self.add_statistic((game.pk, player.pk), PlayerStadistic(game=game, player=player, points=csv_stats.tries))
+        else:
+            # like get_or_create_nts_statistic, an update clears the mvp
+            stat.points = csv_stats.tries
+            stat.mvp = None
+            self.update_statistic(stat)
+
+    def add_fit_statistic(self, csv_stats, player):
+        tournament = self.get_tournament(csv_stats)
+        stat = self.statistics.get((tournament.pk, player.pk))
+        if stat is None:
+            self.add_statistic((tournament.pk, player.pk), PlayerStadistic(
+                tournament=tournament, player=player, played=csv_stats.played, points=csv_stats.scores,
+                mvp=csv_stats.mvp))
+        else:
+            stat.played = csv_stats.played
+            stat.points = csv_stats.scores
+            stat.mvp = csv_stats.mvp
+            self.update_statistic(stat)
+
+    def add_statistic(self, key, stat):
+        self.statistics[key] = stat
+        self.new_statistics.append(stat)
+
+    def update_statistic(self, stat):
+        # statistics of the file are written with their last values by flush_statistics
+        if stat.pk:
+            self.updated_statistics[stat.pk] = stat
+
+    # writes
+
+    def flush_players(self, csv_stats, persons):
+        team_ids = {self.teams[(s.team, s.division)].pk for s in csv_stats}
+        for batch in chunks(team_ids):
+            for player in Player.objects.filter(team_id__in=batch).order_by('pk'):
+                self.players.setdefault((player.person_id, player.team_id, player.number), player)
+        keys = set()
+        players = list()
+        new_players = list()
+        for s, person in zip(csv_stats, persons):
+            team = self.teams[(s.team, s.division)]
+            key = (person.pk, team.pk, get_player_number(s.number))
+            keys.add(key)
+            player = self.players.get(key)
+            if player is None:
+                player = self.players[key] = Player(person=person, team=team, number=key[2])
+                new_players.append(player)
+            players.append(player)
+        bulk_create_with_ids(Player, new_players)
+        self._count(Player, len(new_players), len(keys) - len(new_players))
+        return players
+
+    def flush_statistics(self, fields):
+        PlayerStadistic.objects.bulk_create(self.new_statistics, BATCH_SIZE)
+        self._count(PlayerStadistic, len(self.new_statistics), len(self.updated_statistics))
+        PlayerStadistic.objects.bulk_update(self.updated_statistics.values(), fields, BATCH_SIZE)
+
+
+class DjangoBulkRankingFetcher:
+    """
+    Writes padel ranking csv rows as validity intervals: a ranking is valid from the monday after its date to the
+    last monday of the year, or to the monday of its valid to column, and overrides the mondays of older rankings of
+    the person. Existing rankings of the affected countries, circuits and divisions are loaded once and overridden in
+    memory, persons are resolved through a prefetched name map. The ranking snapshots of those groups are rebuilt
+    afterwards.
+    """
+    DATE_FORMAT = "%d/%m/%Y"
+
+    def __init__(self):
+        self.persons = PersonMap()
+        self.intervals = dict()
+        self.updated = dict()
+        self.deleted = set()
+        self.created = dict()
+        self.found = dict()
+
+    def create_padel_rankings(self, columns):
+        """Writes the rankings of a RankingColumns, the numbers are converted once per column."""
+        stats = telemetry.stats
+        with transaction.atomic():
+            with stats.timer('resolve'):
+                names = list(zip(columns.first_name, columns.last_name))
+                self.persons.load(set(names))
+                # a ranking file has few distinct dates
+                intervals = {date: ranking_interval(datetime.strptime(date, self.DATE_FORMAT))
+                             for date in set(columns.date)}
+                ends = {date: datetime.strptime(date, self.DATE_FORMAT).date()
+                        for date in set(columns.valid_to) if date}
+                numbers = zip(columns.integers(columns.points, 0), columns.integers(columns.plus),
+                              columns.integers(columns.minus))
+                rows = list()
+                for country, circuit, division, (first_name, last_name), date, end, (points, plus, minus) in zip(
+                        columns.country, columns.circuit, columns.division, names, columns.date, columns.valid_to,
+                        numbers):
+                    person = self.persons.get(first_name, last_name, get_player_gender(division))
+                    valid_from, valid_to = intervals[date]
+                    if end:
+                        valid_to = ends[end]
+                    if valid_from <= valid_to:
+                        rows.append((PadelRanking(
+                            country=country, circuit=circuit, division=division, valid_from=valid_from,
+                            valid_to=valid_to, points=points, plus=plus, minus=minus), person))
+            with stats.timer('write'):
+                self.created[Person.__name__], self.found[Person.__name__] = self.persons.flush()
+            with stats.timer('resolve'):
+                if rows:
+                    self.load_rankings([ranking for ranking, person in rows])
+                for ranking, person in rows:
+                    # new persons have a primary key after the flush
+                    ranking.person = person
+                    self.add_ranking(ranking)
+            with stats.timer('write'):
+                self.flush_rankings()
+            if rows:
+                with stats.timer('snapshot'):
+                    groups = set(zip(columns.country, columns.circuit, columns.division))
+                    self.created.update(RankingSnapshotBuilder().rebuild(
+                        groups, min(r.valid_from for r, person in rows)))
+        stats.count(self.created, self.found)
+        logger.info('Bulk import of %d padel rankings: %s', len(columns), self.created)
+        return self.created
+
+    @staticmethod
+    def _key(ranking):
+        return ranking.country, ranking.circuit, ranking.division, ranking.person_id
+
+    def load_rankings(self, rankings):
+        groups = {(r.country, r.circuit, r.division) for r in rankings}
+        start = min(r.valid_from for r in rankings)
+        end = max(r.valid_to for r in rankings)
+        for country, circuit, division in groups:
+            for ranking in PadelRanking.objects.filter(
+                    country=country, circuit=circuit, division=division, valid_to__gte=start, valid_from__lte=end):
+                self.intervals.setdefault(self._key(ranking), []).append(ranking)
+
+    def add_ranking(self, new):
+        intervals = self.intervals.setdefault(self._key(new), [])
+        overlapping = [r for r in intervals if r.valid_from <= new.valid_to and r.valid_to >= new.valid_from]
+        if len(overlapping) == 1 and overlapping[0].valid_from == new.valid_from and \
+                overlapping[0].valid_to == new.valid_to and overlapping[0].same_values(new):
+            self.found[PadelRanking.__name__] = self.found.get(PadelRanking.__name__, 0) + 1
+            return
+
+        # the new ranking overrides the mondays of older rankings within its interval
+        for old in overlapping:
+            intervals.remove(old)
+            if old.valid_to > new.valid_to:
+                intervals.append(PadelRanking(
+                    country=old.country, circuit=old.circuit, division=old.division, person_id=old.person_id,
+                    valid_from=new.valid_to + timedelta(days=7), valid_to=old.valid_to, points=old.points,
+                    plus=old.plus, minus=old.minus))
+            if old.valid_from < new.valid_from:
+                old.valid_to = new.valid_from - timedelta(days=7)
+                intervals.append(old)
+                if old.pk:
+                    self.updated[old.pk] = old
+            elif old.pk:
+                self.updated.pop(old.pk, None)
+                self.deleted.add(old.pk)
+        intervals.append(new)
+
+    def flush_rankings(self):
+        for batch in chunks(self.deleted):
+            PadelRanking.objects.filter(pk__in=batch).delete()
+        PadelRanking.objects.bulk_update(self.updated.values(), ['valid_to'], BATCH_SIZE)
+        new_rankings = [r for intervals in self.intervals.values() for r in intervals if r.pk is None]
+        PadelRanking.objects.bulk_create(new_rankings, BATCH_SIZE)
+        self.created[PadelRanking.__name__] = len(new_rankings)
+        logger.info('Padel rankings updated: %d, deleted: %d', len(self.updated), len(self.deleted))
+
+
+class RankingSnapshotBuilder:
+    """
+    Materialises the padel rankings as RankingSnapshot rows: one per country, circuit and division and monday on
+    which a ranking of the group starts or ends, with the positions of the rankings valid from that monday ordered by
+    a dense rank on points. The previous rank of a person is the rank in the last snapshot of the group with
+    positions.
+    """
+    WEEK = timedelta(days=7)
+
+    def __init__(self):
+        self.created = {RankingSnapshot.__name__: 0, RankingPosition.__name__: 0}
+
+    def rebuild(self, groups=None, since=None):
+        """
+        Rebuilds the snapshots of the (country, circuit, division) groups, of every group if None, from the monday
+        since on, of every monday if None. Runs after the rankings of the groups are written.
+        """
+        with transaction.atomic():
+            if groups is None:
+                groups = set(PadelRanking.objects.values_list('country', 'circuit', 'division').distinct())
+                RankingPosition.objects.all().delete()
+                RankingSnapshot.objects.all().delete()
+            for country, circuit, division in groups:
+                snapshots = RankingSnapshot.objects.filter(country=country, circuit=circuit, division=division)
+                rankings = PadelRanking.objects.filter(
+                    country=country, circuit=circuit, division=division).select_related('person')
+                previous = dict()
+                if since is not None:
+                    snapshots.filter(date__gte=since).delete()
+                    # rankings ending the week before since are left at since
+                    rankings = rankings.filter(valid_to__gte=since - self.WEEK)
+                    last = snapshots.filter(date__lt=since, positions__isnull=False).order_by('-date').first()
+                    if last:
+                        previous = dict(last.positions.filter(person__isnull=False).values_list('person_id', 'rank'))
+                self.write_snapshots(country, circuit, division, rankings, previous, since)
+        logger.info('Ranking snapshots of %d groups: %s', len(groups), self.created)
+        return self.created
+
+    def write_snapshots(self, country, circuit, division, rankings, previous, since):
+        new_snapshots = list()
+        for date, active in self.sweep(list(rankings)):
+            if since is not None and date < since:
+                continue
+            positions = self.get_positions(active, previous)
+            new_snapshots.append((RankingSnapshot(
+                country=country, circuit=circuit, division=division, date=date), positions))
+            if positions:
+                previous = {p.person_id: p.rank for p in positions if p.person_id is not None}
+        bulk_create_with_ids(RankingSnapshot, [snapshot for snapshot, positions in new_snapshots])
+        new_positions = list()
+        for snapshot, positions in new_snapshots:
+            # the snapshots have a primary key after the insert
+            for position in positions:
+                position.snapshot = snapshot
+            new_positions.extend(positions)
+        RankingPosition.objects.bulk_create(new_positions, BATCH_SIZE)
+        self.created[RankingSnapshot.__name__] += len(new_snapshots)
+        self.created[RankingPosition.__name__] += len(new_positions)
+
+    def sweep(self, rankings):
+        """Yields every monday a ranking starts or ends with the rankings valid from that monday."""
+        rankings.sort(key=lambda r: r.valid_from)
+        dates = sorted({r.valid_from for r in rankings} | {r.valid_to + self.WEEK for r in rankings})
+        active = dict()
+        ends = list()
+        i = 0
+        for date in dates:
+            while i < len(rankings) and rankings[i].valid_from <= date:
+                heapq.heappush(ends, (rankings[i].valid_to + self.WEEK, i))
+                active[i] = rankings[i]
+                i += 1
+            while ends and ends[0][0] <= date:
+                active.pop(heapq.heappop(ends)[1])
+            yield date, list(active.values())
+
+    @staticmethod
+    def get_positions(rankings, previous):
+        """Returns the positions of the rankings by points, persons with the same points share the rank."""
+        positions = list()
+        for ranking in rankings:
+            person = ranking.person
+            positions.append(RankingPosition(
+                person_id=ranking.person_id, first_name=person.first_name if person else '',
+                last_name=person.last_name if person else '', points=ranking.points, plus=ranking.plus,
+                minus=ranking.minus, previous_rank=previous.get(ranking.person_id)))
+        positions.sort(key=lambda p: (-p.points, p.last_name, p.first_name))
+        rank = 0
+        points = None
+        for position in positions:
+            if position.points != points:
+                rank += 1
+                points = position.points
+            position.rank = rank
+        return positions
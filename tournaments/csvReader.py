@@ -3,35 +3,47 @@ import logging
 
 import itertools
 
-from tournaments.models import PadelRanking
+from tournaments import bulk
 from tournaments import games
 from tournaments import csvdata
+from tournaments import manifest
+from tournaments import mmapcsv
+from tournaments import phases
+from tournaments import pipeline
+from tournaments import rankings
+from tournaments import telemetry
 from tournaments.models import Game
 from tournaments.models import PadelResult
 from tournaments.models import GameField
-from tournaments.models import GameRound
 from tournaments.models import Person
 from tournaments.models import Player
 from tournaments.models import PlayerStadistic
 from tournaments.models import Team
 from tournaments.models import Tournament
+from tournaments.models import get_normalized_name
 from tournaments.models import get_player_gender
-from tournaments.service import all_mondays_from
 
 
-from django.core.exceptions import MultipleObjectsReturned
-from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
 
 # Get an instance of a logger
 logger = logging.getLogger(__name__)
 
+# persons of the running import by normalized name, cleared by CsvReader.read_file
+person_cache = dict()
+# many-to-many links of the running import, written once per file
+links = bulk.LinkBuffer()
+
 
 class DjangoSimpleFetcher:
     @staticmethod
     def print_fetch_result(obj, created=False):
+        telemetry.stats.fetched(obj, created)
+        if telemetry.stats.quiet:
+            return
         if created:
             print('Created {:s}:\n'.format(type(obj).__name__) + str(obj))
-            logger.debug('Created {:s}:\n'.format(type(obj).__name__) + str(obj))
+            logger.debug('Created %s:\n%s', type(obj).__name__, obj)
 
         else:
             if obj is None:
@@ -39,7 +51,7 @@ class DjangoSimpleFetcher:
                 logger.debug('Neither object found or created.\n')
             else:
                 print('Found {:s}:\n'.format(type(obj).__name__) + str(obj))
-                logger.debug('Found {:s}:\n'.format(type(obj).__name__) + str(obj))
+                logger.debug('Found %s:\n%s', type(obj).__name__, obj)
 
     @staticmethod
     def get_or_create_tournament(tournament_name, tournament_division, type, ranking=None):
@@ -58,43 +70,44 @@ class DjangoSimpleFetcher:
 
     @staticmethod
     def get_or_create_person(first_name, last_name, gender=Person.UNKNOWN, nationality=None, born=None):
-        try:
-            result = Person.objects.get(first_name=first_name, last_name=last_name)
-            update = False
+        key = get_normalized_name(first_name, last_name)
+        candidates = person_cache.get(key)
+        if candidates is None:
+            candidates = person_cache[key] = list(Person.objects.filter(normalized_name=key).order_by('pk'))
+
+        if len(candidates) == 1:
+            result = candidates[0]
+            update_fields = list()
             if gender != Person.UNKNOWN and result.gender == Person.UNKNOWN:
                 result.gender = gender
-                result.save()
-                #Person.objects.get(first_name=first_name, last_name=last_name).update(gender=gender)
-                update = True
-            if nationality and result.nationality is None:
-                result.nationality = nationality
-                Person.objects.get(first_name=first_name, last_name=last_name).update(nationality=nationality)
-                update = True
+                update_fields.append('gender')
+            if nationality and not result.country:
+                result.country = nationality
+                update_fields.append('country')
             if born and result.born is None:
                 result.born = born
-                Person.objects.get(first_name=first_name, last_name=last_name).update(born=born)
-                update = True
-            result = result, update
-        except MultipleObjectsReturned:
-            result = Person.objects.get(first_name=first_name, last_name=last_name, gender=gender)
-            result = result, False
-        except ObjectDoesNotExist:
-            result = Person.objects.get_or_create(first_name=first_name, last_name=last_name, gender=gender)
+                update_fields.append('born')
+            if update_fields:
+                result.save(update_fields=update_fields)
+            return result, len(update_fields) > 0
+        elif len(candidates) > 1:
+            candidates = [p for p in candidates if p.gender == gender]
+            if len(candidates) == 0:
+                raise Person.DoesNotExist('Person %s %s %s does not exist.' % (first_name, last_name, gender))
+            return candidates[0], False
+
+        result = Person.objects.get_or_create(normalized_name=key, gender=gender, defaults=dict(
+            first_name=first_name, last_name=last_name, country=nationality, born=born))
+        person_cache[key].append(result[0])
         return result
 
     @staticmethod
     def get_or_create_player(person, team, number, tournament_id=None):
-        number2 = None
-        if number:
-            try:
-                number2 = int(number)
-            except ValueError:
-                pass
-        obj, created = Player.objects.get_or_create(person=person, team=team, number=number2)
+        obj, created = Player.objects.get_or_create(person=person, team=team, number=bulk.get_player_number(number))
         if tournament_id is None:
             pass
         else:
-            obj.tournaments_played.add(tournament_id)
+            links.add_tournament(obj.pk, getattr(tournament_id, 'pk', tournament_id))
         return obj, created
 
     @staticmethod
@@ -124,37 +137,25 @@ class DjangoSimpleFetcher:
 
     @staticmethod
     def create_game(tournament, phase, field, time, local_team, visitor_team, local_score, visitor_score, padel_scores):
-        if padel_scores:
-            result_padel = PadelResult.create(padel_scores.scores)
-            result_padel.save()
-        else:
-            result_padel = None
-
-        result = Game.objects.get_or_create(
-                tournament=tournament,
-                local=local_team,
-                visitor=visitor_team,
-                local_score=local_score,
-                visitor_score=visitor_score,
-                phase=phase,
-                field=field,
-                time=time,
-                result_padel=result_padel)
-
-        return result
+        values = dict(tournament=tournament, local=local_team, visitor=visitor_team, local_score=local_score,
+                      visitor_score=visitor_score, phase=phase, field=field, time=time)
+        if not padel_scores:
+            return Game.objects.get_or_create(result_padel=None, **values)
+
+        # the result is only written for a new game, reading a file again finds the game with the same sets
+        result_padel = PadelResult.create(padel_scores.scores)
+        sets = bulk.get_result_values(result_padel)
+        for game in Game.objects.filter(result_padel__isnull=False, **values).select_related('result_padel'):
+            if bulk.get_result_values(game.result_padel) == sets:
+                return game, False
+        result_padel.save()
+        return Game.objects.create(result_padel=result_padel, **values), True
 
     @staticmethod
     def get_or_create_game_phase(category, round, number, create):
-        get_round = round
-        print(get_round.encode('utf-8'))
-        if get_round.encode('utf-8') == b'\xc2\xbc' or get_round.encode(
-                'utf-8') == b'\xc2\xbd' or get_round == '\xc2\xbc':
-            get_round = '1/4'
         if create:
-            result = GameRound.objects.get_or_create(category=category, round=get_round, number_teams=number)
-        else:
-            result = GameRound.objects.get(category=category, round=get_round, number_teams=number), False
-        return result
+            return phases.registry.get_or_create(category, round, number)
+        return phases.registry.get(category, round, number), False
 
     @staticmethod
     def get_or_create_nts_statistic(game, player, scores, mvp=None):
@@ -186,33 +187,6 @@ class DjangoSimpleFetcher:
                 tournament=tournament, player=player, played=played, points=scores, mvp=mvp)
         return result
 
-    @staticmethod
-    def get_or_create_padel_ranking(ranking, monday, person):
-        try:
-            obj = PadelRanking.objects.get(country=ranking.country, date=monday, circuit=ranking.circuit,
-                                           division=ranking.division, person=person.id)
-            obj.points = ranking.points
-            obj.plus = ranking.plus
-            obj.minus = ranking.minus
-            obj.save(force_update=True)
-        except PadelRanking.DoesNotExist:
-            obj = PadelRanking.objects.create(
-                country=ranking.country, date=monday, circuit=ranking.circuit, division=ranking.division, person=person,
-                points=ranking.points, plus=ranking.plus, minus=ranking.minus)
-        return obj
-
-    @staticmethod
-    def create_padel_ranking(ranking):
-        from datetime import datetime
-        # date_format = "%Y-%m-%d"
-        #date_format = "%d.%m.%Y"
-        date_format = "%d/%m/%Y"
-        person, b = DjangoCsvFetcher.create_padel_person(ranking)
-        mondays = all_mondays_from(datetime.strptime(ranking.date, date_format))
-        for monday in mondays:
-            obj = DjangoSimpleFetcher.get_or_create_padel_ranking(ranking, monday, person)
-        return obj, True
-
 
 class DjangoCsvFetcher:
     @staticmethod
@@ -220,31 +194,14 @@ class DjangoCsvFetcher:
         if not isinstance(csv_game, csvdata.CsvGame) and not isinstance(csv_game, games.Game):
             assert 0, "Wrong game to read: " + csv_game
 
-        round = csv_game.round
-        if round.encode('utf-8') == b'\xc2\xbc':
-            round = '1/4'
-        print(round.encode('utf-8'))
-
         if create:
-            result, created = GameRound.objects.get_or_create(
-                    category=csv_game.category,
-                    round=round,
-                    number_teams=csv_game.nteams)
+            result, created = phases.registry.get_or_create(csv_game.category, csv_game.round, csv_game.nteams)
         else:
-            result, created = GameRound.objects.get(
-                    category=csv_game.category,
-                    round=round,
-                    number_teams=csv_game.nteams), False
+            result, created = phases.registry.get(csv_game.category, csv_game.round, csv_game.nteams), False
 
         DjangoSimpleFetcher.print_fetch_result(result, created)
         return result, created
 
-    def create_padel_person(ranking):
-        gender = get_player_gender(ranking.division)
-        person = DjangoSimpleFetcher.get_or_create_person(
-            first_name=ranking.first_name, last_name=ranking.last_name, gender=gender)
-        return person
-
     def create_padel_persons(game, local_team, visitor_team, tournament_id):
         if game.padel_team_names:
             gender = get_player_gender(game.division)
@@ -423,16 +380,12 @@ class DjangoCsvFetcher:
                     game, player, csv_stats.tries)
             DjangoSimpleFetcher.print_fetch_result(nts_stat, created)
         else:
-            print('GameStadistic skipped: there are no tries for player: {:s}\n '.format(str(player)))
+            telemetry.echo('GameStadistic skipped: there are no tries for player: {:s}\n '.format(str(player)))
 
 
 def add_team_to_tournament(tournament, team):
-    if not tournament.teams.filter(id=team.id).exists():
-        tournament.teams.add(team)
-        tournament.save()
-        print("Added team %s into tournament %s" % (team.name, tournament.name))
-    else:
-        print("Tournament %s already has the team %s" % (tournament.name, team.name))
+    links.add_team(tournament.pk, team.pk)
+    telemetry.echo("Added team %s into tournament %s" % (team.name, tournament.name))
 
 
 def create_or_fetch_team(pName, pDivision, type=None):
@@ -452,15 +405,20 @@ def create_or_fetch_team(pName, pDivision, type=None):
 def printCF(obj, created):
     if obj:
         if created:
-            print('Created {:s}:\n {:s}'.format(obj.__class__.__name__, obj))
+            telemetry.echo('Created {:s}:\n {:s}'.format(obj.__class__.__name__, obj))
         else:
-            print('Found {:s}:\n {:s}'.format(obj.__class__.__name__, obj))
+            telemetry.echo('Found {:s}:\n {:s}'.format(obj.__class__.__name__, obj))
     else:
-        print('ERROR\n')
+        telemetry.echo('ERROR\n')
 
 
 class CsvReader:
     (PHASE, TOURNAMENT, NTS_STATISTIC, FIT_STATISTIC, PADEL_GAME, PERSON, PADEL_RANKING) = (0, 1, 2, 3, 4, 5, 6)
+    # types by the names used in the readcsv command and the ingest jobs
+    TYPE_NAMES = {'phases': PHASE, 'games': TOURNAMENT, 'stats_game': NTS_STATISTIC, 'stats_tournament': FIT_STATISTIC,
+                  'padel': PADEL_GAME, 'person': PERSON, 'padel_ranking': PADEL_RANKING}
+    # columns not read by the csv objects of a type, not decoded by the memory mapped reader
+    UNUSED_COLUMNS = {PADEL_GAME: frozenset([4, 5, 17]), PADEL_RANKING: frozenset([9])}
 
     def __init__(self, type):
         if type in [self.PHASE, self.TOURNAMENT, self.NTS_STATISTIC, self.FIT_STATISTIC, self.PADEL_GAME, self.PERSON,
@@ -468,27 +426,30 @@ class CsvReader:
             self._fexit = '####'
             self._exit_text = '\n Force exit #### :)\n'
             self._type = type
+            self._manifest = None
+            self._mmap = False
+            self._skip_columns = frozenset()
         else:
             assert 0, "Wrong reader creation: " + type
 
     @staticmethod
     def print_row_to_read(csv):
-        print('\nRow to read:\n' + str(csv) + '\n')
+        telemetry.echo('\nRow to read:\n' + str(csv) + '\n')
 
     def print_file_footer(self, arg):
-        print('\nFinished reading {:s}...\n'.format(arg))
+        telemetry.echo('\nFinished reading {:s}...\n'.format(arg))
 
     def print_fetch_result(self, obj, created):
         if created:
-            print('Created {:s}:\n'.format(self._type) + str(obj))
+            telemetry.echo('Created {:s}:\n'.format(self._type) + str(obj))
         else:
-            print('Found {:s}:\n'.format(self._type) + str(obj))
+            telemetry.echo('Found {:s}:\n'.format(self._type) + str(obj))
 
     def get_csv_object(self, row):
         if self._type == self.PHASE:
             result = csvdata.CsvPhase(row)
         elif self._type == self.TOURNAMENT:
-            result = csvdata.CsvGame(row, None, None, None)
+            result = csvdata.CsvGame(row)
         elif self._type == self.NTS_STATISTIC:
             result = csvdata.CsvNTSStatistic(row)
         elif self._type == self.FIT_STATISTIC:
@@ -497,12 +458,16 @@ class CsvReader:
             result = games.Game.padel_from_csv_list(row)
         elif self._type == self.PERSON:
             result = csvdata.create_person(row)
-        elif self._type == self.PADEL_RANKING:
-            result = csvdata.create_padel_ranking(row)
         else:
             assert 0, "Wrong object to read: " + self._type
         return result
 
+    def parse_rows(self, rows, first_row=1):
+        """Parses rows into the objects written by bulk_create_django_objects, rankings are parsed as columns."""
+        if self._type == self.PADEL_RANKING:
+            return rankings.RankingColumns.from_rows(rows, first_row)
+        return [self.get_csv_object(row) for row in rows]
+
     def create_django_object(self, csv_object):
         if self._type == self.PHASE and isinstance(csv_object, csvdata.CsvPhase):
             phase, created = DjangoSimpleFetcher.get_or_create_game_phase(
@@ -519,26 +484,182 @@ class CsvReader:
         elif self._type == self.PERSON and isinstance(csv_object, Person):
             DjangoSimpleFetcher.get_or_create_person(
                 csv_object.first_name, csv_object.last_name, csv_object.gender, csv_object.nationality, csv_object.born)
-        elif self._type == self.PADEL_RANKING and isinstance(csv_object, csvdata.Ranking):
-            DjangoSimpleFetcher.create_padel_ranking(csv_object)
         else:
             assert 0, "Wrong object to read: " + str(self._type)
 
-    def read_file(self, file):
+    def read_rows(self, file):
+        if self._mmap:
+            telemetry.echo('\nStarting memory mapped reading {:n} from {:s}\n'.format(self._type, file))
+            for row in mmapcsv.read_rows(file, self._fexit, self._skip_columns):
+                if self._manifest and not self._manifest.is_new_row(row):
+                    telemetry.stats.skipped += 1
+                    continue
+                yield row
+            return
         with open(file, 'rt', encoding='utf-8') as csv_file:
             # reader2 = csv.reader(csv_file, delimiter=';')
             reader1, reader2 = itertools.tee(csv.reader(csv_file, delimiter=';'))
             columns = len(next(reader1))
             del reader1
-            print('\nDetected %s columns\n' % columns)
-            print('\nStarting reading {:n} from {:s}\n'.format(self._type, file))
+            telemetry.echo('\nDetected %s columns\n' % columns)
+            telemetry.echo('\nStarting reading {:n} from {:s}\n'.format(self._type, file))
             for row in reader2:
                 if any(row):
                     if row[0] == self._fexit:
-                        print(self._exit_text)
+                        telemetry.echo(self._exit_text)
                         break
-                    self.print_row_to_read(row)
+                    if self._manifest and not self._manifest.is_new_row(row):
+                        telemetry.stats.skipped += 1
+                        continue
+                    yield row
+
+    def read_file(self, file, bulk=False, workers=None, batch_size=pipeline.BATCH_SIZE, incremental=False,
+                  resume=False, mmap=False, replace=False):
+        if self._type in [self.NTS_STATISTIC, self.FIT_STATISTIC, self.PADEL_RANKING]:
+            # statistics and rankings are always written in batches
+            bulk = True
+        if bulk and self._type not in [self.NTS_STATISTIC, self.FIT_STATISTIC, self.PADEL_GAME, self.PADEL_RANKING]:
+            raise ValueError("Bulk reading is only supported for statistics, padel games and rankings.")
+        if resume and (workers or incremental):
+            raise ValueError("Resumable reading can not be combined with workers or incremental reading.")
+        if replace and self._type != self.PADEL_GAME:
+            raise ValueError("Replacing tournaments is only supported for padel games.")
+        if replace and (workers or incremental or resume):
+            raise ValueError("Replacing tournaments reads the whole file at once, it can not be combined with workers, "
+                             "incremental or resumable reading.")
+        person_cache.clear()
+        links.clear()
+        # phases created by a failed import may have been rolled back
+        phases.registry.clear()
+        self._mmap = mmap
+        # the fingerprints of incremental and resumable reading cover every column
+        self._skip_columns = frozenset() if incremental or resume else self.UNUSED_COLUMNS.get(self._type, frozenset())
+        if not incremental:
+            try:
+                if replace:
+                    return self.replace_read_file(file)
+                if resume:
+                    return self.resume_read_file(file, bulk, batch_size)
+                return self._read_file(file, bulk, workers, batch_size)
+            finally:
+                self._mmap = False
+                person_cache.clear()
+                links.clear()
+
+        self._manifest = manifest.Manifest(self._type, file)
+        try:
+            if self._manifest.is_file_known():
+                telemetry.echo('\nSkipping {:s}: the file was already read.\n'.format(file))
+                return
+            self._manifest.load()
+            with transaction.atomic():
+                self._read_file(file, bulk, workers, batch_size)
+                self._manifest.save()
+            telemetry.echo('\nSkipped {:d} rows already read.\n'.format(self._manifest.skipped))
+        finally:
+            self._manifest = None
+            self._mmap = False
+            person_cache.clear()
+            links.clear()
+
+    def _read_file(self, file, bulk, workers, batch_size):
+        if workers:
+            rows = pipeline.Pipeline(self, workers, batch_size, bulk).read_file(file)
+            telemetry.echo('\nFinished pipelined reading {:d} rows with {:d} workers\n'.format(rows, workers))
+            return
+        if bulk:
+            return self.bulk_read_file(file)
+        stats = telemetry.stats
+        completed = False
+        try:
+            for row in self.read_rows(file):
+                self.print_row_to_read(row)
+                with stats.timer('parse'):
                     csv_object = self.get_csv_object(row)
+                with stats.timer('write'):
                     self.create_django_object(csv_object)
-        csv_file.close()
-        print('\nFinished reading {:s}...[0=PHASE, 1=TOURNAMENT, 2=NTS_STADISTIC]\n'.format(str(self._type)))
+                stats.rows_done()
+            completed = True
+        finally:
+            # without a transaction the rows written before a failure are kept, so are their links
+            if completed or not transaction.get_connection().in_atomic_block:
+                self.flush_links()
+        telemetry.echo('\nFinished reading {:s}...[0=PHASE, 1=TOURNAMENT, 2=NTS_STADISTIC]\n'.format(str(self._type)))
+
+    def resume_read_file(self, file, bulk, batch_size):
+        """
+        Reads the file in chunks of batch_size rows, every chunk is committed together with a checkpoint. Rows
+        committed by a previous call for the same file are skipped, so a failure costs at most one chunk.
+        """
+        checkpoint = manifest.Checkpoint(self._type, file)
+        offset = checkpoint.load(self.read_rows(file))
+        if offset:
+            telemetry.echo('\nResuming {:s} after {:d} committed rows\n'.format(file, offset))
+            telemetry.stats.skipped += offset
+        rows = itertools.islice(self.read_rows(file), offset, None)
+        while True:
+            chunk = list(itertools.islice(rows, batch_size))
+            if not chunk:
+                break
+            try:
+                with transaction.atomic():
+                    self.write_rows(chunk, bulk)
+                    checkpoint.save(chunk, offset + len(chunk))
+            except Exception:
+                logger.error('Failed after %d committed rows of %s, read it again with resume to continue.',
+                             offset, file)
+                raise
+            offset += len(chunk)
+        telemetry.echo('\nFinished resumable reading {:d} rows of {:s}\n'.format(offset, file))
+
+    def write_rows(self, rows, bulk):
+        stats = telemetry.stats
+        if bulk:
+            with stats.timer('parse'):
+                csv_objects = self.parse_rows(rows)
+            self.bulk_create_django_objects(csv_objects)
+            stats.rows_done(len(csv_objects))
+            return
+        for row in rows:
+            self.print_row_to_read(row)
+            with stats.timer('parse'):
+                csv_object = self.get_csv_object(row)
+            with stats.timer('write'):
+                self.create_django_object(csv_object)
+            stats.rows_done()
+        self.flush_links()
+
+    @staticmethod
+    def flush_links():
+        with telemetry.stats.timer('write'):
+            n = links.flush()
+        logger.info('Written %d tournament links', n)
+
+    def bulk_create_django_objects(self, csv_objects):
+        if self._type == self.PADEL_GAME:
+            return bulk.DjangoBulkFetcher().create_padel_csv_games(csv_objects)
+        elif self._type == self.PADEL_RANKING:
+            return bulk.DjangoBulkRankingFetcher().create_padel_rankings(csv_objects)
+        elif self._type == self.NTS_STATISTIC:
+            return bulk.DjangoBulkStatisticFetcher().create_nts_statistics(csv_objects)
+        elif self._type == self.FIT_STATISTIC:
+            return bulk.DjangoBulkStatisticFetcher().create_fit_statistics(csv_objects)
+        else:
+            assert 0, "Wrong objects to bulk read: " + str(self._type)
+
+    def replace_read_file(self, file):
+        """Replaces the games of the tournaments of the file by the games of the file in one transaction."""
+        with telemetry.stats.timer('parse'):
+            csv_objects = [self.get_csv_object(row) for row in self.read_rows(file)]
+        result = bulk.DjangoReplaceFetcher().replace_padel_csv_games(csv_objects)
+        telemetry.stats.rows_done(len(csv_objects))
+        telemetry.echo('\nFinished replacing tournaments with {:d} rows, created {:s}, updated {:s}, '
+                       'deleted {:s}\n'.format(len(csv_objects), str(result['created']), str(result['updated']),
+                                                str(result['deleted'])))
+
+    def bulk_read_file(self, file):
+        with telemetry.stats.timer('parse'):
+            csv_objects = self.parse_rows(self.read_rows(file))
+        created = self.bulk_create_django_objects(csv_objects)
+        telemetry.stats.rows_done(len(csv_objects))
+        telemetry.echo('\nFinished bulk reading {:d} rows, created {:s}\n'.format(len(csv_objects), str(created)))
@@ -1,4 +1,6 @@
 from time import strftime
+from tournaments import phases
+from tournaments.records import Record
 from tournaments.models import MO, M40, WO, W27, MXO, SMX
 
 
@@ -215,215 +217,75 @@ def get_tournament_year(tournament):
         raise ValueError("Tournament not supported.")
 
 
-class FitStatistic:
-    def __init__(self, tournament_name, division, team, player_number, first_name, last_name, gender, played, scores,
-                 mvp):
-        self.tournament_name = tournament_name
-        self.division = division
-        self.team = team
-        self.number = player_number
-        self.first_name = first_name
-        self.last_name = last_name
-        self.gender = gender
-        self.played = played
-        self.scores = scores
-        self.mvp = mvp
-
-    @classmethod
-    def from_array(cls, row):
-        return cls(row[0], row[1], row[2], row[3], row[4], row[5], row[6], row[7], row[8], row[9])
-
-
-class CsvNTSStatistic:
-    def __init__(self, row, tname=None, division=None, team=None, number=None, first_name=None, last_name=None,
-                 gender=None, tries=None, mvp=None, local=None, local_score=None, visitor_score=None, visitor=None,
-                 category=None, round=None, team_numbers=None):
-        if row:
-            self._tournament_name = row[PL_ST_TOURNAMENT_INDEX]
-            self._division = row[PL_ST_DIVISION_INDEX]
-            self._team = row[PL_ST_TEAM_INDEX]
-            self._number = row[PL_ST_NUMBER_INDEX]
-            self._first_name = row[PL_ST_FIRST_NAME_INDEX]
-            self._last_name = row[PL_ST_LAST_NAME_INDEX]
-            self._gender = row[PL_ST_GENDER_INDEX]
-            self._tries = row[PL_ST_PLAYER_TRIES_INDEX]
-            self._mvp = row[PL_ST_PLAYER_MVP_INDEX]
-            self._local = row[PL_ST_LOCAL_TEAM_INDEX]
-            self._local_score = row[PL_ST_LOCAL_TEAM_SCORE_INDEX]
-            self._visitor_score = row[PL_ST_VISITOR_TEAM_SCORE_INDEX]
-            self._visitor = row[PL_ST_VISITOR_TEAM_INDEX]
-            self._category = row[PL_ST_GAME_CATEGORY_INDEX]
-            self._round = row[PL_ST_GAME_ROUND_INDEX]
-            self._team_numbers = row[PL_ST_PHASE_TEAMS_INDEX]
-        else:
-            self._tournament_name = tname
-            self._division = division
-            self._team = team
-            self._number = number
-            self._first_name = first_name
-            self._last_name = last_name
-            self._gender = gender
-            self._tries = tries
-            self._mvp = mvp
-            self._local = local
-            self._local_score = local_score
-            self._visitor_score = visitor_score
-            self._visitor = visitor
-            self._category = category
-            self._round = round
-            self._team_numbers = team_numbers
-
-    @property
-    def tournament_name(self):
-        return self._tournament_name
-
-    @tournament_name.setter
-    def tournament_name(self, tournament_name):
-        self._tournament_name = tournament_name
-
-    @property
-    def division(self):
-        return self._division
-
-    @division.setter
-    def division(self, division):
-        self._division = division
-
-    @property
-    def team(self):
-        return self._team
-
-    @team.setter
-    def team(self, team):
-        self._team = team
-
-    @property
-    def number(self):
-        return self._number
-
-    @number.setter
-    def number(self, number):
-        self._number = number
-
-    @property
-    def first_name(self):
-        return self._first_name
-
-    @first_name.setter
-    def first_name(self, first_name):
-        self._first_name = first_name
-
-    @property
-    def last_name(self):
-        return self._last_name
-
-    @last_name.setter
-    def last_name(self, last_name):
-        self._last_name = last_name
-
-    @property
-    def gender(self):
-        return self._gender
-
-    @gender.setter
-    def gender(self, gender):
-        self._gender = gender
-
-    @property
-    def tries(self):
-        return self._tries
-
-    @tries.setter
-    def tries(self, tries):
-        self._tries = tries
-
-    @property
-    def mvp(self):
-        return self.mvp
-
-    @mvp.setter
-    def mvp(self, mvp):
-        self._mvp = mvp
-
-    @property
-    def local(self):
-        return self._local
-
-    @local.setter
-    def local(self, local):
-        self._local = local
-
-    @property
-    def local_score(self):
-        return self._local_score
+# PHASES_INDEXES
+PH_PHASE_ROUND_INDEX = 0
+PH_CATEGORY_INDEX = 1
+PH_PHASE_TEAMS_INDEX = 2
 
-    @local_score.setter
-    def local_score(self, local_score):
-        self._local_score = local_score
+# TOURNAMENT_GAMES_INDEXES
+TG_TOURNAMENT_INDEX = 0
+TG_DIVISION_INDEX = 1
+TG_DATE_INDEX = 2
+TG_TIME_INDEX = 3
+TG_FIELD_INDEX = 4
+TG_PHASE_INDEX = 5
+TG_CATEGORY_INDEX = 6
+TG_PHASE_TEAMS_INDEX = 7
+# TG_GAME_ROUND_INDEX = 8
+TG_LOCAL_TEAM_INDEX = 9
+TG_LOCAL_TEAM_SCORE_INDEX = 10
+TG_VISITOR_TEAM_SCORE_INDEX = 11
+TG_VISITOR_TEAM_INDEX = 12
+# fox games rows end with the link to the statistics page of the game
+TG_STATISTIC_LINK_INDEX = 13
 
-    @property
-    def visitor_score(self):
-        return self._visitor_score
+# PLAYER_STATISTICS_INDEXES
+PL_ST_TOURNAMENT_INDEX = 0
+PL_ST_DIVISION_INDEX = 1
+PL_ST_TEAM_INDEX = 2
+PL_ST_NUMBER_INDEX = 3
+PL_ST_FIRST_NAME_INDEX = 4
+PL_ST_LAST_NAME_INDEX = 5
+PL_ST_GENDER_INDEX = 6
+PL_ST_PLAYER_TRIES_INDEX = 7
+PL_ST_PLAYER_MVP_INDEX = 8
+PL_ST_LOCAL_TEAM_INDEX = 9
+PL_ST_LOCAL_TEAM_SCORE_INDEX = 10
+PL_ST_VISITOR_TEAM_SCORE_INDEX = 11
+PL_ST_VISITOR_TEAM_INDEX = 12
+PL_ST_GAME_CATEGORY_INDEX = 13
+PL_ST_GAME_ROUND_INDEX = 14
+PL_ST_PHASE_TEAMS_INDEX = 15
 
-    @visitor_score.setter
-    def visitor_score(self, visitor_score):
-        self._visitor_score = visitor_score
 
-    @property
-    def visitor(self):
-        return self._visitor
+class FitStatistic(Record):
+    FIELDS = (('tournament_name', 0), ('division', 1), ('team', 2), ('number', 3), ('first_name', 4),
+              ('last_name', 5), ('gender', 6), ('played', 7), ('scores', 8), ('mvp', 9))
 
-    @visitor.setter
-    def visitor(self, visitor):
-        self._visitor = visitor
+    @classmethod
+    def from_array(cls, row):
+        return cls(row)
 
-    @property
-    def category(self):
-        return self._category
 
-    @category.setter
-    def category(self, category):
-        self._category = category
+class CsvNTSStatistic(Record):
+    FIELDS = (('tournament_name', PL_ST_TOURNAMENT_INDEX), ('division', PL_ST_DIVISION_INDEX),
+              ('team', PL_ST_TEAM_INDEX), ('number', PL_ST_NUMBER_INDEX), ('first_name', PL_ST_FIRST_NAME_INDEX),
+              ('last_name', PL_ST_LAST_NAME_INDEX), ('gender', PL_ST_GENDER_INDEX),
+              ('tries', PL_ST_PLAYER_TRIES_INDEX), ('mvp', PL_ST_PLAYER_MVP_INDEX), ('local', PL_ST_LOCAL_TEAM_INDEX),
+              ('local_score', PL_ST_LOCAL_TEAM_SCORE_INDEX), ('visitor_score', PL_ST_VISITOR_TEAM_SCORE_INDEX),
+              ('visitor', PL_ST_VISITOR_TEAM_INDEX), ('category', PL_ST_GAME_CATEGORY_INDEX),
+              ('_round', PL_ST_GAME_ROUND_INDEX), ('team_numbers', PL_ST_PHASE_TEAMS_INDEX))
 
     @property
     def round(self):
-        # print(self._round.encode('UTF-8'))
-        if self._round.encode('UTF-8') == b'\xc2\xbc':
-            result = '1/4'
-        else:
-            result = self._round
-        return result
+        return phases.normalize_round(self._round)
 
     @round.setter
     def round(self, round):
         self._round = round
 
-    @property
-    def team_numbers(self):
-        return self._team_numbers
-
-    @team_numbers.setter
-    def team_numbers(self, team_numbers):
-        self._team_numbers = team_numbers
-
     def to_csv_array(self):
-        result = list(range(15))
-        result[PL_ST_TOURNAMENT_INDEX] = self._tournament_name
-        result[PL_ST_DIVISION_INDEX] = self._division
-        result[PL_ST_TEAM_INDEX] = self._team
-        result[PL_ST_NUMBER_INDEX] = self._number
-        result[PL_ST_FIRST_NAME_INDEX] = self._first_name
-        result[PL_ST_LAST_NAME_INDEX] = self._last_name
-        result[PL_ST_GENDER_INDEX] = self._gender
-        result[PL_ST_PLAYER_TRIES_INDEX] = self._tries
-        result[PL_ST_LOCAL_TEAM_INDEX] = self._local
-        result[PL_ST_LOCAL_TEAM_SCORE_INDEX] = self._local_score
-        result[PL_ST_VISITOR_TEAM_SCORE_INDEX] = self._visitor_score
-        result[PL_ST_VISITOR_TEAM_INDEX] = self._visitor
-        result[PL_ST_GAME_CATEGORY_INDEX] = self._category
-        result[PL_ST_GAME_ROUND_INDEX] = self._round
-        result[PL_ST_PHASE_TEAMS_INDEX] = self._team_numbers
-        return result
+        return self.to_row()
 
     def to_csv_game(self):
         pass
@@ -432,298 +294,82 @@ class CsvNTSStatistic:
         return self.to_csv_array().__str__()
 
 
-class CsvPhase:
-    def __init__(self, row):
-        self._category = row[PH_CATEGORY_INDEX]
-        self._round = row[PH_PHASE_ROUND_INDEX]
-        self._teams = row[PH_PHASE_TEAMS_INDEX]
-
-    @property
-    def category(self):
-        return self._category
-
-    @category.setter
-    def category(self, category):
-        self._category = category
+class CsvPhase(Record):
+    FIELDS = (('_round', PH_PHASE_ROUND_INDEX), ('category', PH_CATEGORY_INDEX), ('teams', PH_PHASE_TEAMS_INDEX))
 
     @property
     def round(self):
-        if self._round.encode('UTF-8') == b'\xc2\xbc':
-            result = '1/4'
-        else:
-            result = self._round
-        return result
+        return phases.normalize_round(self._round)
 
     @round.setter
     def round(self, round):
         self._round = round
 
-    @property
-    def teams(self):
-        return self._teams
-
-    @teams.setter
-    def teams(self, teams):
-        self._teams = teams
-
     def to_csv_array(self):
-        result = list(range(3))
-        result[PH_CATEGORY_INDEX] = self._category
-        result[PH_PHASE_ROUND_INDEX] = self._round
-        result[PH_PHASE_TEAMS_INDEX] = self._teams
-        return result
-
-
-class FitGame:
-    def __init__(self, game, round=None, finals=None, nteams=None, date=None, time=None,
-                 field=None, local=None, local_score=None, visitor_score=None, visitor=None):
-        if game:
-            self._round = game[0]
-            self._finals = game[2]
-            self._nteams = game[1]
-            self._date = strftime("%m/%d/%y", game[3])
-            self._time = strftime("%H:%M", game[3])
-            self._timedate = game[3]
-            self._field = game[4]
-            self._local = game[5]
-            self._local_score = game[6]
-            self._visitor_score = game[7]
-            self._visitor = game[8]
-        else:
-            self._round = round
-            self._finals = finals
-            self._nteams = nteams
-            self._date = date
-            self._time = time
-            self._field = field
-            self._local = local
-            self._local_score = local_score
-            self._visitor_score = visitor_score
-            self._visitor = visitor
+        return self.to_row()
 
-    def to_array(self):
-        result = list(range(8))
-        result[0] = self.round
-        result[1] = self.nteams
-        result[2] = self.finals
-        result[3] = None
-        result[4] = self.field
-        result[5] = self.local
-        result[6] = self.local_score
-        result[7] = self.visitor_score
-        result[8] = self.visitor
 
-    @property
-    def round(self):
-        return self._round
+class FitGame(Record):
+    FIELDS = (('round', None), ('finals', None), ('nteams', None), ('date', None), ('time', None),
+              ('timedate', None), ('field', None), ('local', None), ('local_score', None), ('visitor_score', None),
+              ('visitor', None))
 
-    @round.setter
-    def round(self, round):
-        self._round = round
-
-    @property
-    def finals(self):
-        return self._finals
-
-    @finals.setter
-    def finals(self, finals):
-        self._finals = finals
-
-    @property
-    def nteams(self):
-        return self._nteams
-
-    @nteams.setter
-    def nteams(self, nteams):
-        self._nteams = nteams
-
-    @property
-    def date(self):
-        return self._date
-
-    @date.setter
-    def date(self, date):
-        self._date = date
-
-    @property
-    def time(self):
-        return self._time
-
-    @time.setter
-    def time(self, time):
-        self._time = time
-
-    @property
-    def field(self):
-        return self._field
-
-    @field.setter
-    def field(self, field):
-        self._field = field
-
-    @property
-    def local(self):
-        return self._local
-
-    @local.setter
-    def local(self, local):
-        self._local = local
-
-    @property
-    def visitor(self):
-        return self._visitor
-
-    @visitor.setter
-    def visitor(self, visitor):
-        self._visitor = visitor
-
-    @property
-    def local_score(self):
-        return self._local_score
+    @classmethod
+    def from_game(cls, game):
+        """Returns the game of a scraped tuple: round, teams, finals, date, field, local, scores and visitor."""
+        return cls(round=game[0], finals=game[2], nteams=game[1], date=strftime("%m/%d/%y", game[3]),
+                   time=strftime("%H:%M", game[3]), timedate=game[3], field=game[4], local=game[5],
+                   local_score=game[6], visitor_score=game[7], visitor=game[8])
 
-    @local_score.setter
-    def local_score(self, local_score):
-        self._local_score = local_score
+    def to_array(self):
+        return [self.round, self.nteams, self.finals, None, self.field, self.local, self.local_score,
+                self.visitor_score, self.visitor]
 
-    @property
-    def visitor_score(self):
-        return self._visitor_score
 
-    @visitor_score.setter
-    def visitor_score(self, visitor_score):
-        self._visitor_score = visitor_score
+class CsvGame(FitGame):
+    FIELDS = (('tournament_name', TG_TOURNAMENT_INDEX), ('division', TG_DIVISION_INDEX), ('date', TG_DATE_INDEX),
+              ('time', TG_TIME_INDEX), ('field', TG_FIELD_INDEX), ('round', TG_PHASE_INDEX),
+              ('category', TG_CATEGORY_INDEX), ('nteams', TG_PHASE_TEAMS_INDEX), ('local', TG_LOCAL_TEAM_INDEX),
+              ('local_score', TG_LOCAL_TEAM_SCORE_INDEX), ('visitor_score', TG_VISITOR_TEAM_SCORE_INDEX),
+              ('visitor', TG_VISITOR_TEAM_INDEX))
 
+    @classmethod
+    def from_fit_game(cls, game, tournament_name, division):
+        """Returns the csv game of a scraped game, with the category and the round named after its round."""
+        if game.round == 'Division 2':
+            category = 'Silver'
+        elif game.round == 'Division 3':
+            category = 'Bronze'
+        elif 'Seeding' in game.round:
+            category = 'Silver'
+        else:
+            category = 'Gold'
 
-class CsvGame(FitGame):
-    def __init__(self, row, game, tournament_name, division):
-        if row is None:
-            super().__init__(None, game.round, game.finals, game.nteams, game.date, game.time, game.field,
-                             game.local, game.local_score, game.visitor_score, game.visitor)
-
-            self._tournament_name = tournament_name
-            self._division = division
-            self._category = 'Gold'
-
-            if game.round == 'Division 2':
-                self._category = 'Silver'
-            elif game.round == 'Division 3':
-                self._category = 'Bronze'
-            elif 'Seeding' in game.round:
-                self._category = 'Silver'
-            else:
-                self._category = 'Gold'
-
-            if 'Division' in game.round:
-                self._round = 'Division'
-            elif 'finals' == game.round:
-                self._round = game.finals
-                self._round = self._round.replace('Grand Final', 'Final', 1)
-                self._round = self._round.replace('Playoff 5th/6th', FIFTH_POSITION, 1)
-                self._round = self._round.replace('5th/6th Playoff', FIFTH_POSITION, 1)
-                self._round = self._round.replace('5th/6th Seeding', FIFTH_POSITION, 1)
-                self._round = self._round.replace('Playoff 6th/7th', SIXTH_POSITION, 1)
-                self._round = self._round.replace('Playoff 7th/8th', SEVENTH_POSITION, 1)
-                self._round = self._round.replace('7th/8th Playoff', SEVENTH_POSITION, 1)
-                self._round = self._round.replace('7th/8th Seeding', SEVENTH_POSITION, 1)
-                self._round = self._round.replace('Playoff 8th/9th', EIGHTH_POSITION, 1)
-                self._round = self._round.replace('Playoff 9th/10th', NINTH_POSITION, 1)
-                self._round = self._round.replace('9th/10th/11th', NINTH_POSITION, 1)
-                self._round = self._round.replace('Playoff 10th/11th', TENTH_POSITION, 1)
-                self._round = self._round.replace('Playoff 11th/12th', ELEVENTH_POSITION, 1)
-                self._round = self._round.replace('Playoff 12th/13th', TWELFTH_POSITION, 1)
-                self._round = self._round.replace('Playoff 13th/14th', THIRTEENTH_POSITION, 1)
-                self._round = self._round.replace('Playoff 14th/15th', FOURTEENTH_POSITION, 1)
-                self._round = self._round.replace('Playoff 15th/16th', FIFTEENTH_POSITION, 1)
-                self._round = self._round.replace('Playoff 16th/17th', SIXTEENTH_POSITION, 1)
-                self._round = self._round.replace('Playoff 18th/19th', EIGHTEENTH_POSITION, 1)
-                self._round = self._round.replace('Playoff 20th/21st', TWENTIETH_POSITION, 1)
-                self._round = self._round.replace('Bronze Final', THIRD_POSITION, 1)
-                self._round = self._round.replace('Bronze', THIRD_POSITION, 1)
-                self._round = self._round.replace('Seeding Semi Final 1', 'Semifinal', 1)
-                self._round = self._round.replace('Seeding Semi Final 2', 'Semifinal', 1)
-            else:
-                self._round = game.round
+        if 'Division' in game.round:
+            round = 'Division'
+        elif 'finals' == game.round:
+            round = phases.normalize_finals(game.finals)
         else:
-            super(CsvGame, self).__init__(None, row[TG_PHASE_INDEX], None, row[TG_PHASE_TEAMS_INDEX],
-                                          row[TG_DATE_INDEX], row[TG_TIME_INDEX], row[TG_FIELD_INDEX],
-                                          row[TG_LOCAL_TEAM_INDEX], row[TG_LOCAL_TEAM_SCORE_INDEX],
-                                          row[TG_VISITOR_TEAM_SCORE_INDEX], row[TG_VISITOR_TEAM_INDEX])
-            self._tournament_name = row[TG_TOURNAMENT_INDEX]
-            self._division = row[TG_DIVISION_INDEX]
-            self._category = row[TG_CATEGORY_INDEX]
+            round = game.round
+        return cls(tournament_name=tournament_name, division=division, category=category, round=round,
+                   finals=game.finals, nteams=game.nteams, date=game.date, time=game.time, field=game.field,
+                   local=game.local, local_score=game.local_score, visitor_score=game.visitor_score,
+                   visitor=game.visitor)
 
     @classmethod
     def from_scratch(cls, t_name, division, date, time, field, phase, category, team_number, local, local_score,
                      visitor_score, visitor):
-        row = list(range(13))
-        row[TG_TOURNAMENT_INDEX] = t_name
-        row[TG_DIVISION_INDEX] = division
-        row[TG_DATE_INDEX] = date
-        row[TG_TIME_INDEX] = time
-        row[TG_FIELD_INDEX] = field
-        row[TG_PHASE_INDEX] = cls.parse_phase(phase)
-        row[TG_CATEGORY_INDEX] = category
-        row[TG_PHASE_TEAMS_INDEX] = team_number
-        row[TG_LOCAL_TEAM_INDEX] = local
-        row[TG_LOCAL_TEAM_SCORE_INDEX] = local_score
-        row[TG_VISITOR_TEAM_SCORE_INDEX] = visitor_score
-        row[TG_VISITOR_TEAM_INDEX] = visitor
-        return cls(row, None, None, None)
+        return cls(tournament_name=t_name, division=division, date=date, time=time, field=field,
+                   round=cls.parse_phase(phase), category=category, nteams=team_number, local=local,
+                   local_score=local_score, visitor_score=visitor_score, visitor=visitor)
 
     @staticmethod
     def parse_phase(phase_name):
-        result = phase_name
-        if phase_name in ROUNDS_CONVERSIONS:
-            result = ROUNDS_CONVERSIONS[phase_name]
-        return result
-
-    @property
-    def tournament_name(self):
-        return self._tournament_name
-
-    @tournament_name.setter
-    def tournament_name(self, tournament_name):
-        self._tournament_name = tournament_name
-
-    @property
-    def division(self):
-        return self._division
-
-    @division.setter
-    def division(self, division):
-        self._division = division
-
-    @property
-    def round(self):
-        return self._round
-
-    @round.setter
-    def round(self, round):
-        self._round = round
-
-    @property
-    def category(self):
-        return self._category
-
-    @category.setter
-    def category(self, category):
-        self._category = category
+        return phases.parse_phase(phase_name)
 
     def to_csv_array(self):
-        result = list(range(13))
-        result[TG_TOURNAMENT_INDEX] = self._tournament_name
-        result[TG_DIVISION_INDEX] = self._division
-        result[TG_DATE_INDEX] = self.date
-        result[TG_TIME_INDEX] = self.time
-        result[TG_FIELD_INDEX] = self._field
-        result[TG_PHASE_INDEX] = self._round
-        result[TG_CATEGORY_INDEX] = self._category
-        result[TG_PHASE_TEAMS_INDEX] = self._nteams
+        result = self.to_row(self.csv_len_standard())
         result[8] = 'xx'
-        result[TG_LOCAL_TEAM_INDEX] = self._local
-        result[TG_LOCAL_TEAM_SCORE_INDEX] = self._local_score
-        result[TG_VISITOR_TEAM_SCORE_INDEX] = self._visitor_score
-        result[TG_VISITOR_TEAM_INDEX] = self._visitor
         return result
 
     def __str__(self):
@@ -737,31 +383,21 @@ class CsvGame(FitGame):
 
 
 class FoxGame(CsvGame):
+    FIELDS = (('stats_link', None),)
+
     def __init__(self, t_name, division, date, time, field, phase, category, team_number, local, local_score,
                  visitor_score, visitor, link):
-        self._stats_link = link
-        row = list(range(13))
-        row[TG_TOURNAMENT_INDEX] = t_name
-        row[TG_DIVISION_INDEX] = division
-        row[TG_DATE_INDEX] = date
-        row[TG_TIME_INDEX] = time
-        row[TG_FIELD_INDEX] = field
-        row[TG_PHASE_INDEX] = CsvGame.parse_phase(phase)
-        row[TG_CATEGORY_INDEX] = category
-        row[TG_PHASE_TEAMS_INDEX] = team_number
-        row[TG_LOCAL_TEAM_INDEX] = local
-        row[TG_LOCAL_TEAM_SCORE_INDEX] = local_score
-        row[TG_VISITOR_TEAM_SCORE_INDEX] = visitor_score
-        row[TG_VISITOR_TEAM_INDEX] = visitor
-        super().__init__(row, None, None, None)
+        super().__init__(tournament_name=t_name, division=division, date=date, time=time, field=field,
+                         round=CsvGame.parse_phase(phase), category=category, nteams=team_number, local=local,
+                         local_score=local_score, visitor_score=visitor_score, visitor=visitor, stats_link=link)
 
-    @property
-    def stats_link(self):
-        return self._stats_link
-
-    @stats_link.setter
-    def link(self, stats_link):
-        self._stats_link = stats_link
+    @classmethod
+    def from_csv_row(cls, row):
+        """Returns the game of a tournament games csv row followed by the link to its statistics page."""
+        game = CsvGame(row)
+        return cls(game.tournament_name, game.division, game.date, game.time, game.field, game.round, game.category,
+                   game.nteams, game.local, game.local_score, game.visitor_score, game.visitor,
+                   row[TG_STATISTIC_LINK_INDEX])
 
     def get_game_statistic_file_to_save(self):
         destination = self.tournament_name + '-' + self.division + '-' + self.date + '-' + self.time + '-' + self. \
@@ -796,115 +432,9 @@ def create_person(row):
     return person
 
 
-class Ranking:
-    def __init__(self, country, circuit, division, first_name, last_name, date, points, plus, minus):
-        self.country = country
-        self.circuit = circuit
-        self.division = division
-        self.first_name = first_name
-        self.last_name = last_name
-        self.date = date
-        self.points = 0
-        self.plus = 0
-        self.minus = 0
-        try:
-            self.points = round(float(points.replace(',', '.')))
-            self.plus = round(float(plus.replace(',', '.')))
-            self.minus = round(float(minus.replace(',', '.')))
-        except ValueError:
-            # igore empty strings
-            pass
-
-    @classmethod
-    def from_array(cls, row):
-        return cls(row[0], row[1], row[2], row[3], row[4], row[5], row[6], row[7], row[8])
-
-
-def create_padel_ranking(row):
-    return Ranking.from_array(row)
-
-
-# PHASES_INDEXES
-PH_PHASE_ROUND_INDEX = 0
-PH_CATEGORY_INDEX = 1
-PH_PHASE_TEAMS_INDEX = 2
-
-# TOURNAMENT_GAMES_INDEXES
-TG_TOURNAMENT_INDEX = 0
-TG_DIVISION_INDEX = 1
-TG_DATE_INDEX = 2
-TG_TIME_INDEX = 3
-TG_FIELD_INDEX = 4
-TG_PHASE_INDEX = 5
-TG_CATEGORY_INDEX = 6
-TG_PHASE_TEAMS_INDEX = 7
-# TG_GAME_ROUND_INDEX = 8
-TG_LOCAL_TEAM_INDEX = 9
-TG_LOCAL_TEAM_SCORE_INDEX = 10
-TG_VISITOR_TEAM_SCORE_INDEX = 11
-TG_VISITOR_TEAM_INDEX = 12
-
-# PLAYER_STATISTICS_INDEXES
-PL_ST_TOURNAMENT_INDEX = 0
-PL_ST_DIVISION_INDEX = 1
-PL_ST_TEAM_INDEX = 2
-PL_ST_NUMBER_INDEX = 3
-PL_ST_FIRST_NAME_INDEX = 4
-PL_ST_LAST_NAME_INDEX = 5
-PL_ST_GENDER_INDEX = 6
-PL_ST_PLAYER_TRIES_INDEX = 7
-PL_ST_PLAYER_MVP_INDEX = 8
-PL_ST_LOCAL_TEAM_INDEX = 9
-PL_ST_LOCAL_TEAM_SCORE_INDEX = 10
-PL_ST_VISITOR_TEAM_SCORE_INDEX = 11
-PL_ST_VISITOR_TEAM_INDEX = 12
-PL_ST_GAME_CATEGORY_INDEX = 13
-PL_ST_GAME_ROUND_INDEX = 14
-PL_ST_PHASE_TEAMS_INDEX = 15
-
 # FOX GAMES INDEXES
 FOX_GAME_STATISTIC_LINK_LINK = 10
 
-# POSITION CONSTANTS CONVERSION
-THIRD_POSITION = 'Third position'
-FIFTH_POSITION = 'Fifth position'
-SIXTH_POSITION = 'Sixth position'
-SEVENTH_POSITION = 'Seventh position'
-EIGHTH_POSITION = 'Eighth position'
-NINTH_POSITION = 'Ninth position'
-TENTH_POSITION = 'Tenth position'
-ELEVENTH_POSITION = 'Eleventh position'
-TWELFTH_POSITION = 'Twelfth position'
-THIRTEENTH_POSITION = 'Thirteenth position'
-FOURTEENTH_POSITION = 'Fourteenth position'
-FIFTEENTH_POSITION = 'Fifteenth position'
-SIXTEENTH_POSITION = 'Sixteenth position'
-EIGHTEENTH_POSITION = 'Eighteenth position'
-TWENTIETH_POSITION = 'Twentieth position'
-
-ROUNDS_CONVERSIONS = {'Grand Final': 'Final',
-                      'Gold Medal Game': 'Final',
-                      'Bronze': THIRD_POSITION,
-                      'Bronze Medal Game': THIRD_POSITION,
-                      'Playoff 5th/6th': FIFTH_POSITION,
-                      'Playoff 7th/8th': SEVENTH_POSITION,
-                      'Playoff 8th/9th': EIGHTH_POSITION,
-                      'Playoff 9th/10th': NINTH_POSITION,
-                      'Playoff 10th/11th': TENTH_POSITION,
-                      'Playoff 11th/12th': ELEVENTH_POSITION,
-                      'Playoff 12th/13th': TWELFTH_POSITION,
-                      'Playoff 13th/14th': THIRTEENTH_POSITION,
-                      'Playoff 15th/16th': FIFTEENTH_POSITION,
-                      'Playoff 18th/19th': EIGHTEENTH_POSITION,
-                      'Playoff 20th/21st': TWENTIETH_POSITION,
-                      'Playoff for 5th/6th': FIFTH_POSITION,
-                      'Playoff for 7th/8th': SEVENTH_POSITION,
-                      'Playoff for 11th/12th': ELEVENTH_POSITION,
-                      'Playoff for 15th/16th': FIFTEENTH_POSITION,
-                      'Plate Final': NINTH_POSITION,
-                      'Playoff 9th/10th (Plate Final)': NINTH_POSITION,
-                      'Playoff 16th/17th (Bowl Final)': SIXTEENTH_POSITION}
-
 # CONSTANTS DIRECTORIES
 DATA_FILES = './player/data_files/'
 RAW_FILES = DATA_FILES + 'raw/'
@@ -0,0 +1,146 @@
+import csv
+import json
+import logging
+
+from itertools import islice
+
+from tournaments.models import Game
+from tournaments.models import PadelRanking
+from tournaments.models import Player
+from tournaments.models import Tournament
+
+# Get an instance of a logger
+logger = logging.getLogger(__name__)
+
+# rows fetched per query, the memory of an export does not depend on its size
+CHUNK_SIZE = 500
+DATE_FORMAT = '%d/%m/%Y'
+# the set scores of a padel game row start at this column, the layout read by games.Game.padel_from_csv_list
+PADEL_SCORES_INDEX = 18
+
+
+def batched(iterable, size=CHUNK_SIZE):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def format_date(d):
+    return d.strftime(DATE_FORMAT) if d else ''
+
+
+class Export:
+    """
+    An export of a queryset as rows. The rows of the types read by CsvReader keep the column layout of the reader
+    and have no header, so an exported csv file can be read again; the other exports start with a header row.
+    """
+
+    def __init__(self, fields, rows, header=False, to_dict=None):
+        self.fields = fields
+        self.rows = rows
+        self.header = header
+        self.to_dict = to_dict or (lambda row: dict(zip(self.fields, row)))
+
+    def csv_lines(self):
+        writer = csv.writer(Echo(), delimiter=';', lineterminator='\n')
+        if self.header:
+            yield writer.writerow(self.fields)
+        for row in self.rows:
+            yield writer.writerow(row)
+
+    def jsonl_lines(self):
+        for row in self.rows:
+            yield json.dumps(self.to_dict(row), default=str) + '\n'
+
+    def lines(self, fmt):
+        if fmt == 'csv':
+            return self.csv_lines()
+        elif fmt == 'jsonl':
+            return self.jsonl_lines()
+        raise ValueError('Export format %s not supported.' % fmt)
+
+
+class Echo:
+    """File-like object which returns what is written, so csv.writer produces lines for a streaming response."""
+
+    def write(self, value):
+        return value
+
+
+def tournaments_export(type=None):
+    tournaments = Tournament.objects.order_by('pk')
+    if type:
+        tournaments = tournaments.filter(type=type)
+
+    def rows():
+        for t in tournaments.iterator(chunk_size=CHUNK_SIZE):
+            yield [t.pk, t.type, t.name, t.division, t.padel_serie, t.country, t.city, format_date(t.date)]
+    return Export(['id', 'type', 'name', 'division', 'padel_serie', 'country', 'city', 'date'], rows(), header=True)
+
+
+def get_team_persons(team_ids):
+    """Returns the persons of the padel teams ordered by last name, the order of the names of the team."""
+    result = dict()
+    for player in Player.objects.filter(team_id__in=team_ids, number__isnull=True).select_related('person').order_by(
+            'person__last_name', 'person__first_name', 'pk'):
+        result.setdefault(player.team_id, []).append(player.person)
+    return result
+
+
+def get_team_names(persons):
+    names = list()
+    for person in (persons + [None, None])[:2]:
+        names += [person.last_name, person.first_name] if person else ['', '']
+    return names
+
+
+def padel_games_export(tournament=None):
+    games = Game.objects.filter(tournament__type='PADEL').select_related(
+        'tournament', 'phase', 'field', 'result_padel', 'local', 'visitor').order_by('tournament_id', 'pk')
+    if tournament:
+        games = games.filter(tournament=tournament)
+
+    def rows():
+        for batch in batched(games.iterator(chunk_size=CHUNK_SIZE)):
+            persons = get_team_persons({g.local_id for g in batch} | {g.visitor_id for g in batch})
+            for g in batch:
+                scores = list()
+                if g.result_padel:
+                    for local, visitor in zip(g.result_padel.local_scores, g.result_padel.visitor_scores):
+                        scores += [local, visitor]
+                yield [g.tournament.name, g.tournament.padel_serie or '', g.tournament.division or '',
+                       format_date(g.tournament.date), g.time.strftime('%H:%M') if g.time else '',
+                       g.field.name if g.field else '', g.phase.round, g.phase.category, g.phase.number_teams] + \
+                    get_team_names(persons.get(g.local_id, [])) + get_team_names(persons.get(g.visitor_id, [])) + \
+                    [''] + scores
+
+    fields = ['tournament', 'padel_serie', 'division', 'date', 'time', 'field', 'round', 'category', 'number_teams',
+              'local_first_last_name', 'local_first_first_name', 'local_second_last_name', 'local_second_first_name',
+              'visitor_first_last_name', 'visitor_first_first_name', 'visitor_second_last_name',
+              'visitor_second_first_name']
+    return Export(fields, rows(), to_dict=lambda row: dict(zip(fields, row), scores=row[PADEL_SCORES_INDEX:]))
+
+
+def padel_ranking_export(date=None, division=None):
+    """
+    Exports the rankings valid at the monday date, or every ranking interval when date is None. The date column is
+    the first monday of the exported interval, reading the file again creates the same rankings from that monday to
+    the valid to monday.
+    """
+    rankings = PadelRanking.objects.select_related('person').order_by('valid_from', 'division', '-points', 'pk')
+    if date:
+        rankings = rankings.filter(valid_from__lte=date, valid_to__gte=date).order_by('division', '-points', 'pk')
+    if division:
+        rankings = rankings.filter(division=division)
+
+    def rows():
+        for r in rankings.iterator(chunk_size=CHUNK_SIZE):
+            yield [r.country, r.circuit, r.division] + \
+                ([r.person.first_name, r.person.last_name] if r.person else ['', '']) + \
+                [format_date(date or r.valid_from), r.points, '' if r.plus is None else r.plus,
+                 '' if r.minus is None else r.minus, format_date(r.valid_to)]
+    return Export(['country', 'circuit', 'division', 'first_name', 'last_name', 'date', 'points', 'plus', 'minus',
+                   'valid_to'], rows())
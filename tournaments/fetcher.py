@@ -0,0 +1,252 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from urllib.error import HTTPError
+from urllib.error import URLError
+from urllib.parse import urljoin
+from urllib.parse import urlsplit
+from urllib.parse import urlunsplit
+from urllib.request import Request
+from urllib.request import urlopen
+
+from tournaments import csvdata
+
+# Get an instance of a logger
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = csvdata.RAW_STATS_FILES + 'cache/'
+CONCURRENCY = 8
+RETRIES = 4
+TIMEOUT = 30
+USER_AGENT = 'padelanalytics-fetcher'
+# statuses worth a retry, other errors fail the page at once
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# links of the fixture pages to the statistics of a game: fox sports pulse match centres and internationaltouch matches
+GAME_LINK = re.compile(r'[?&](?:a|action)=MATCH\b|/match(?:es)?/', re.IGNORECASE)
+
+
+class LinkParser(HTMLParser):
+    """Collects the href of the anchors of a page, entities are already unescaped by the parser."""
+
+    def __init__(self):
+        super().__init__()
+        self.links = list()
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'a':
+            href = dict(attrs).get('href')
+            if href:
+                self.links.append(href)
+
+
+def get_game_links(url, content):
+    """Returns the absolute links to game statistics of a fixture page in page order without repetitions."""
+    parser = LinkParser()
+    parser.feed(content.decode('utf-8', errors='replace'))
+    links = [urljoin(url, link).split('#')[0] for link in parser.links if GAME_LINK.search(link)]
+    return list(dict.fromkeys(links))
+
+
+def get_tournament_pages(tournament):
+    """Returns the fixture pages of a csvdata tournament constant and the statistics pages of its teams."""
+    fixtures = list(csvdata.get_tournament_url(tournament))
+    try:
+        statistics = list(csvdata.get_fit_remote_stats_files(tournament).values())
+    except (ValueError, AttributeError):
+        # only the euros publish statistics per team
+        statistics = list()
+    return fixtures, statistics
+
+
+class PageCache:
+    """
+    Content addressed cache of downloaded pages. Pages are stored gzipped once per sha256 of their content under
+    objects/, index.json maps every url to its digest and the validators of the last response, so a page is only
+    downloaded again if the server reports a change. The statistics page of a game also has the file name given by
+    FoxGame.get_game_statistic_file_to_save, which holds the game the page belongs to.
+    """
+    INDEX = 'index.json'
+
+    def __init__(self, path=CACHE_DIR):
+        self.path = path
+        self.index = dict()
+        index = os.path.join(path, self.INDEX)
+        if os.path.exists(index):
+            with open(index, 'rt', encoding='utf-8') as f:
+                self.index = json.load(f)
+
+    def object_path(self, digest):
+        return os.path.join(self.path, 'objects', digest[:2], digest + '.html.gz')
+
+    def validators(self, url):
+        """Returns the headers of a conditional request for a cached url."""
+        entry = self.index.get(url)
+        if entry is None or not os.path.exists(self.object_path(entry['digest'])):
+            return dict()
+        headers = dict()
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def get(self, url):
+        entry = self.index.get(url)
+        if entry is None:
+            return None
+        with gzip.open(self.object_path(entry['digest']), 'rb') as f:
+            return f.read()
+
+    def put(self, url, content, etag=None, last_modified=None):
+        digest = hashlib.sha256(content).hexdigest()
+        path = self.object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = '{:s}.{:d}.tmp'.format(path, os.getpid())
+            with gzip.open(tmp, 'wb') as f:
+                f.write(content)
+            os.replace(tmp, path)
+        file_name = self.index.get(url, dict()).get('file_name')
+        self.index[url] = {'digest': digest, 'etag': etag, 'last_modified': last_modified, 'fetched': time.time()}
+        if file_name:
+            self.index[url]['file_name'] = file_name
+        return digest
+
+    def touch(self, url):
+        self.index[url]['fetched'] = time.time()
+
+    def set_file_name(self, url, file_name):
+        self.index[url]['file_name'] = file_name
+
+    def named_pages(self):
+        """Returns the cached statistics pages as (object path, file name) sorted by file name."""
+        return sorted(((self.object_path(entry['digest']), entry['file_name']) for entry in self.index.values()
+                       if entry.get('file_name')), key=lambda page: page[1])
+
+    def save(self):
+        os.makedirs(self.path, exist_ok=True)
+        index = os.path.join(self.path, self.INDEX)
+        tmp = '{:s}.{:d}.tmp'.format(index, os.getpid())
+        with open(tmp, 'wt', encoding='utf-8') as f:
+            json.dump(self.index, f, indent=1, sort_keys=True)
+        os.replace(tmp, index)
+
+
+class Fetcher:
+    """
+    Downloads pages into a PageCache with at most concurrency requests in flight. Requests are conditional on the
+    validators of the cached page and are retried with exponential backoff on connection errors and on the statuses
+    of RETRY_STATUSES. A base_url replaces the scheme and host of every url, to sync from a mirror or a local server.
+    """
+
+    def __init__(self, cache, concurrency=CONCURRENCY, retries=RETRIES, timeout=TIMEOUT, base_url=None, force=False):
+        if concurrency < 1:
+            raise ValueError('Argument concurrency must be a positive integer. Received : %s' % concurrency)
+        self.cache = cache
+        self.concurrency = concurrency
+        self.retries = retries
+        self.timeout = timeout
+        self.base_url = base_url
+        self.force = force
+        self.downloaded = 0
+        self.not_modified = 0
+        self.failed = dict()
+        # urls fetched by this fetcher, a page linked by several pages is requested once
+        self.fetched = set()
+
+    def rebase(self, url):
+        if not self.base_url:
+            return url
+        base = urlsplit(self.base_url)
+        parts = urlsplit(url)
+        return urlunsplit((base.scheme, base.netloc, base.path.rstrip('/') + parts.path, parts.query, ''))
+
+    def request(self, url, headers):
+        """Runs a blocking request, returns the status, the response headers and the body."""
+        headers = dict(headers, **{'User-Agent': USER_AGENT, 'Accept-Encoding': 'identity'})
+        try:
+            with urlopen(Request(self.rebase(url), headers=headers), timeout=self.timeout) as response:
+                return response.status, response.headers, response.read()
+        except HTTPError as ex:
+            if ex.code == 304:
+                return ex.code, ex.headers, b''
+            raise
+
+    async def fetch(self, url, semaphore, loop, executor):
+        """Returns the content of the url, from the cache if the server reports it unchanged, None if it failed."""
+        headers = dict() if self.force else self.cache.validators(url)
+        for attempt in range(self.retries + 1):
+            try:
+                async with semaphore:
+                    status, response_headers, content = await loop.run_in_executor(
+                        executor, self.request, url, headers)
+                break
+            except (HTTPError, URLError, OSError) as ex:
+                retry = not isinstance(ex, HTTPError) or ex.code in RETRY_STATUSES
+                if not retry or attempt == self.retries:
+                    logger.warning('Failed to fetch %s: %s', url, ex)
+                    self.failed[url] = str(ex)
+                    return None
+                logger.info('Fetching %s failed with %s, retry %d of %d', url, ex, attempt + 1, self.retries)
+                await asyncio.sleep(random.uniform(0, 0.5 * 2 ** attempt))
+
+        self.fetched.add(url)
+        if status == 304:
+            self.not_modified += 1
+            self.cache.touch(url)
+            return self.cache.get(url)
+        self.downloaded += 1
+        self.cache.put(url, content, response_headers.get('ETag'), response_headers.get('Last-Modified'))
+        return content
+
+    async def fetch_all(self, urls):
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            return await asyncio.gather(*[self.fetch(url, semaphore, loop, executor) for url in urls])
+
+    async def fetch_tournament(self, tournament):
+        """Downloads the fixture and statistics pages of a tournament, then the statistics of every fixture game."""
+        fixtures, statistics = get_tournament_pages(tournament)
+        contents = await self.fetch_all(fixtures + statistics)
+        games = list()
+        for url, content in zip(fixtures, contents):
+            if content is not None:
+                games.extend(link for link in get_game_links(url, content) if link not in games)
+        logger.info('Found %d games in %d fixture pages', len(games), len(fixtures))
+        await self.fetch_all(games)
+        return len(fixtures) + len(statistics) + len(games)
+
+    async def fetch_games(self, games):
+        """Downloads the statistics page of every FoxGame and names it after the game in the cache."""
+        links = list(dict.fromkeys(game.stats_link.split('#')[0] for game in games))
+        new_links = [link for link in links if link not in self.fetched]
+        await self.fetch_all(new_links)
+        for game in games:
+            link = game.stats_link.split('#')[0]
+            if link in self.fetched:
+                self.cache.set_file_name(link, os.path.basename(game.get_game_statistic_file_to_save()))
+        return len(new_links)
+
+    async def fetch_pages(self, tournament, games):
+        pages = await self.fetch_tournament(tournament) if tournament is not None else 0
+        return pages + await self.fetch_games(games)
+
+    def sync(self, tournament, games=()):
+        """
+        Downloads the pages of a tournament, if any, and the statistics pages of the games, then saves the cache index.
+        Returns the number of pages.
+        """
+        try:
+            return asyncio.run(self.fetch_pages(tournament, games))
+        finally:
+            self.cache.save()
@@ -3,6 +3,7 @@ from time import strftime
 from datetime import datetime
 
 from tournaments import csvdata
+from tournaments.records import Record
 
 
 def hashing():
@@ -18,6 +19,7 @@ class DrawError(Exception):
 
 
 class PadelResult:
+    __slots__ = ('scores', 'local_score', 'visitor_score')
 
     def __init__(self, scores):
         self._asset_init(scores)
@@ -82,23 +84,19 @@ class PadelResult:
         return str(self.scores)
 
 
-class PadelTeamNames:
+class PadelTeamNames(Record):
+    # columns of the names in the csv slice of the two teams
+    FIELDS = (('local_first_last_name', 0), ('local_first_first_name', 1), ('local_second_last_name', 2),
+              ('local_second_first_name', 3), ('visitor_first_last_name', 4), ('visitor_first_first_name', 5),
+              ('visitor_second_last_name', 6), ('visitor_second_first_name', 7), ('local', None), ('visitor', None))
+
     def __init__(self, csv):
         if len(csv) != 8:
             raise ValueError("Touch games has a local and a visitor names")
         for name in csv:
             if not isinstance(name, str):
                 raise ValueError("Names must be a string.")
-
-        self.local_first_first_name = csv[1]
-        self.local_first_last_name = csv[0]
-        self.local_second_first_name = csv[3]
-        self.local_second_last_name = csv[2]
-
-        self.visitor_first_first_name = csv[5]
-        self.visitor_first_last_name = csv[4]
-        self.visitor_second_first_name = csv[7]
-        self.visitor_second_last_name = csv[6]
+        super().__init__(csv)
 
         # order alphabetically by surname to avoid duplicates teams
         if self.local_first_last_name <= self.local_second_last_name:
@@ -112,12 +110,12 @@ class PadelTeamNames:
             self.visitor = self.visitor_second_last_name + " - " + self.visitor_first_last_name
 
 
-class Game:
-    def __init__(self):
-        self.local = self.visitor = self.padel_team_names = None
-        self.round = self.category = self.nteams = None
-        self.tournament_name = self.division = self.result = None
-        self.date_time = self.field = None
+class Game(Record):
+    # columns of a padel game row, the other fields are computed from the row
+    FIELDS = (('tournament_name', 0), ('ranking', 1), ('division', 2), ('round', 6), ('category', 7), ('nteams', 8),
+              ('date_time', None), ('time', None), ('field', None), ('local', None), ('visitor', None),
+              ('local_score', None), ('visitor_score', None), ('padel_team_names', None), ('padel_result', None),
+              ('result', None))
 
     def get_local_score(self):
         return self.result.get_local_score()
@@ -162,18 +160,13 @@ class Game:
 
     @classmethod
     def padel_from_csv_list(cls, csv):
-        game = cls()
-        game.tournament_name = csv[0]
-        game.ranking = csv[1]
-        game.division = csv[2]
+        game = cls(csv)
         #game.date_time = datetime.strptime(csv[3], '%d/%m/%y')
-        game.date_time = datetime.strptime(csv[3], '%d/%m/%Y')
+        # the date of a game is optional, tournaments exported without date have an empty column
+        game.date_time = datetime.strptime(csv[3], '%d/%m/%Y') if csv[3] else None
         # game.date = strftime("%m/%d/%y", game.date_time)
         # game.time = None
         # 4 => time , 5 => field
-        game.round = csv[6]
-        game.category = csv[7]
-        game.nteams = csv[8]
         game.padel_team_names = PadelTeamNames(csv[9:17])
         game.local = game.padel_team_names.local
         game.visitor = game.padel_team_names.visitor
@@ -0,0 +1,88 @@
+import logging
+import os
+import time
+
+from django.core.files import File
+from django.utils import timezone
+
+from tournaments import telemetry
+from tournaments.csvReader import CsvReader
+from tournaments.models import IngestJob
+
+# Get an instance of a logger
+logger = logging.getLogger(__name__)
+
+# dropped files younger than this may still be being copied
+SETTLE_SECONDS = 2.0
+
+
+def collect_dropped_files(folder):
+    """
+    Creates a job for every csv file dropped in a sub folder of folder named as the csv type, e.g. folder/padel/,
+    and removes the file from the folder. Returns the created jobs.
+    """
+    result = list()
+    now = time.time()
+    for csv_type, label in IngestJob.CSV_TYPE_CHOICES:
+        type_folder = os.path.join(folder, csv_type)
+        if not os.path.isdir(type_folder):
+            continue
+        for name in sorted(os.listdir(type_folder)):
+            path = os.path.join(type_folder, name)
+            if not name.lower().endswith('.csv') or not os.path.isfile(path):
+                continue
+            if now - os.path.getmtime(path) < SETTLE_SECONDS:
+                continue
+            job = IngestJob(csv_type=csv_type)
+            with open(path, 'rb') as f:
+                job.file.save(name, File(f))
+            os.remove(path)
+            logger.info('Created ingest job %s from %s', job, path)
+            result.append(job)
+    return result
+
+
+def claim_next_job():
+    """Marks the oldest pending job as running and returns it, None if there are no pending jobs."""
+    while True:
+        job = IngestJob.objects.filter(status=IngestJob.PENDING).order_by('created', 'pk').first()
+        if job is None:
+            return None
+        # another worker may claim the same job, only one of the updates changes the row
+        if IngestJob.objects.filter(pk=job.pk, status=IngestJob.PENDING).update(
+                status=IngestJob.RUNNING, started=timezone.now()):
+            job.refresh_from_db()
+            return job
+
+
+def requeue_running_jobs():
+    """Sets jobs left running by a stopped worker back to pending, they continue after their last checkpoint."""
+    return IngestJob.objects.filter(status=IngestJob.RUNNING).update(status=IngestJob.PENDING)
+
+
+def run_job(job):
+    """
+    Reads the file of a running job with resumable chunks, so the progress of the job is visible while it runs and
+    a failed or interrupted job continues after its committed rows when it runs again. The file of a done job is
+    deleted, the job keeps its name.
+    """
+    path = job.file.path
+    stats = telemetry.start(quiet=True, total_rows=telemetry.count_rows(path))
+    stats.listener = lambda s: IngestJob.objects.filter(pk=job.pk).update(rows=s.rows + s.skipped)
+    IngestJob.objects.filter(pk=job.pk).update(total_rows=stats.total_rows)
+    try:
+        reader = CsvReader(CsvReader.TYPE_NAMES[job.csv_type])
+        reader.read_file(path, job.bulk, resume=True)
+        status, message = IngestJob.DONE, 'Read {:d} rows in {:.1f}s'.format(stats.rows, stats.finish().elapsed)
+        # the line count of the file includes blank and ignored lines
+        stats.total_rows = stats.rows + stats.skipped
+    except Exception as ex:
+        logger.exception('Ingest job %s failed', job)
+        status, message = IngestJob.FAILED, str(ex)
+    IngestJob.objects.filter(pk=job.pk).update(
+        status=status, message=message, rows=stats.rows + stats.skipped, total_rows=stats.total_rows,
+        finished=timezone.now())
+    if status == IngestJob.DONE:
+        job.file.storage.delete(job.file.name)
+    job.refresh_from_db()
+    return job
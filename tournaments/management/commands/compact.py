@@ -0,0 +1,79 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db import transaction
+
+from tournaments.bulk import BATCH_SIZE
+from tournaments.bulk import chunks
+from tournaments.models import PadelResult
+from tournaments.models import Player
+from tournaments.models import Team
+from tournaments.models import Tournament
+
+
+def get_database_size():
+    """Returns the size in bytes of the sqlite database, None for other databases."""
+    if connection.vendor != 'sqlite':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA page_count')
+        pages = cursor.fetchone()[0]
+        cursor.execute('PRAGMA page_size')
+        return pages * cursor.fetchone()[0]
+
+
+def format_size(size):
+    return 'unknown' if size is None else '{:.1f} KB'.format(size / 1024)
+
+
+class Command(BaseCommand):
+    help = 'Delete padel results without game and links to deleted rows, then analyze and vacuum the database.'
+
+    # many-to-many links and the models of both sides
+    LINKS = [
+        (Tournament.teams.through, 'tournament_id', Tournament, 'team_id', Team),
+        (Player.tournaments_played.through, 'player_id', Player, 'tournament_id', Tournament),
+    ]
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only count the rows which would be deleted.')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        size = get_database_size()
+
+        with transaction.atomic():
+            deleted = self.delete_orphaned_results(dry_run)
+            self.stdout.write('Padel results without game: %d' % deleted)
+            for through, left, left_model, right, right_model in self.LINKS:
+                deleted = self.delete_stale_links(through, left, left_model, right, right_model, dry_run)
+                self.stdout.write('Stale %s links: %d' % (through._meta.db_table, deleted))
+        if dry_run:
+            return
+
+        # vacuum can not run in a transaction
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+            cursor.execute('VACUUM')
+        new_size = get_database_size()
+        reclaimed = None if size is None else size - new_size
+        self.stdout.write(self.style.SUCCESS('Compacted the database from %s to %s, reclaimed %s' % (
+            format_size(size), format_size(new_size), format_size(reclaimed))))
+
+    @staticmethod
+    def delete_orphaned_results(dry_run):
+        ids = list(PadelResult.objects.filter(game__isnull=True).values_list('pk', flat=True))
+        if not dry_run:
+            for batch in chunks(ids, BATCH_SIZE):
+                PadelResult.objects.filter(pk__in=batch).delete()
+        return len(ids)
+
+    @staticmethod
+    def delete_stale_links(through, left, left_model, right, right_model, dry_run):
+        """Deletes the links to rows which do not exist, written while sqlite did not check foreign keys."""
+        stale = through.objects.exclude(**{left + '__in': left_model.objects.values('pk')}) | \
+            through.objects.exclude(**{right + '__in': right_model.objects.values('pk')})
+        ids = list(stale.values_list('pk', flat=True))
+        if not dry_run:
+            for batch in chunks(ids, BATCH_SIZE):
+                through.objects.filter(pk__in=batch).delete()
+        return len(ids)
@@ -0,0 +1,62 @@
+import csv
+
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+
+from tournaments import csvdata
+from tournaments import fetcher
+
+
+class Command(BaseCommand):
+    help = 'Download the fixture and game statistics pages of a tournament into the raw statistics cache.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'tournament', nargs='?', default=None, help='Tournament constant of csvdata, for example EUROS_2014_MO.')
+        parser.add_argument(
+            '--games', default=None,
+            help='Tournament games csv file whose rows end with the link to the statistics page of the game.')
+        parser.add_argument(
+            '--concurrency', type=int, default=fetcher.CONCURRENCY, help='Requests in flight at the same time.')
+        parser.add_argument(
+            '--retries', type=int, default=fetcher.RETRIES, help='Retries of a page after errors and overload.')
+        parser.add_argument('--timeout', type=float, default=fetcher.TIMEOUT, help='Seconds to wait for a response.')
+        parser.add_argument('--cache', default=fetcher.CACHE_DIR, help='Folder of the page cache.')
+        parser.add_argument(
+            '--base-url', default=None, help='Replace the scheme and host of the urls, for a mirror or local server.')
+        parser.add_argument(
+            '--force', action='store_true', help='Download every page again instead of conditional requests.')
+
+    @staticmethod
+    def read_games(path):
+        with open(path, 'rt', encoding='utf-8', newline='') as f:
+            return [csvdata.FoxGame.from_csv_row(row) for row in csv.reader(f, delimiter=';')
+                    if len(row) > csvdata.TG_STATISTIC_LINK_INDEX and row[csvdata.TG_STATISTIC_LINK_INDEX]]
+
+    def handle(self, *args, **options):
+        name = options['tournament']
+        if name is None and not options['games']:
+            raise CommandError('Give a tournament, --games or both.')
+        tournament = None
+        if name is not None:
+            tournament = getattr(csvdata, name, None)
+            if not isinstance(tournament, int) or name.startswith('_'):
+                raise CommandError('Tournament %s not found in csvdata.' % name)
+            try:
+                fetcher.get_tournament_pages(tournament)
+            except ValueError as ex:
+                raise CommandError('Tournament %s: %s' % (name, ex))
+        games = self.read_games(options['games']) if options['games'] else list()
+
+        page_fetcher = fetcher.Fetcher(
+            fetcher.PageCache(options['cache']), options['concurrency'], options['retries'], options['timeout'],
+            options['base_url'], options['force'])
+        pages = page_fetcher.sync(tournament, games)
+
+        self.stdout.write('Pages: %d, downloaded: %d, not modified: %d, failed: %d, games: %d' % (
+            pages, page_fetcher.downloaded, page_fetcher.not_modified, len(page_fetcher.failed), len(games)))
+        for url, error in page_fetcher.failed.items():
+            self.stderr.write('%s: %s' % (url, error))
+        if page_fetcher.failed:
+            raise CommandError('Failed to fetch %d pages of %s.' % (len(page_fetcher.failed), name or options['games']))
+        self.stdout.write(self.style.SUCCESS('Successfully fetched pages: "%s"' % (name or options['games'])))
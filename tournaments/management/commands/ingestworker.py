@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from tournaments import bluegreen
+from tournaments import jobs
+
+
+class Command(BaseCommand):
+    help = 'Run the pending csv ingest jobs, optionally creating jobs from the files dropped in a folder.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--watch', default=None, help='Folder with one sub folder per csv type, e.g. WATCH/padel/, to pick up.')
+        parser.add_argument(
+            '--interval', type=float, default=5.0, help='Seconds to wait when there are no pending jobs.')
+        parser.add_argument(
+            '--once', action='store_true', help='Exit when there are no pending jobs.')
+        parser.add_argument(
+            '--requeue', action='store_true', help='Run again the jobs left running by a stopped worker.')
+
+    def handle(self, *args, **options):
+        watch = options['watch']
+        if options['requeue']:
+            self.stdout.write('Requeued %d running jobs' % jobs.requeue_running_jobs())
+
+        while True:
+            # a readcsv --swap may have replaced the database file since the last job
+            bluegreen.close_swapped_connections()
+            if watch:
+                jobs.collect_dropped_files(watch)
+            job = jobs.claim_next_job()
+            if job:
+                self.stdout.write('Running ingest job %s' % job)
+                job = jobs.run_job(job)
+                style = self.style.SUCCESS if job.status == job.DONE else self.style.ERROR
+                self.stdout.write(style('Ingest job %s: %s' % (job, job.message)))
+            elif options['once']:
+                break
+            else:
+                time.sleep(options['interval'])
@@ -0,0 +1,151 @@
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db import transaction
+
+from tournaments.bulk import BATCH_SIZE
+from tournaments.bulk import DjangoBulkRankingFetcher
+from tournaments.bulk import RankingSnapshotBuilder
+from tournaments.bulk import chunks
+from tournaments.models import PadelRanking
+from tournaments.models import Person
+from tournaments.models import Player
+from tournaments.models import PlayerStadistic
+from tournaments.models import RankingPosition
+from tournaments.models import get_normalized_name
+
+UNIQUE_FIELDS = ('normalized_name', 'gender')
+
+
+def has_unique_name():
+    """Returns True if the person table already has the unique constraint on the normalized name and gender."""
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, Person._meta.db_table)
+    return any(c['unique'] and tuple(c['columns']) == UNIQUE_FIELDS for c in constraints.values())
+
+
+class Command(BaseCommand):
+    help = 'Fill the normalized name of persons stored before it existed and merge the persons with the same ' \
+           'normalized name and gender, then add the unique constraint on both if the table has none. On a ' \
+           'database stored before the normalized name existed, add the column without the constraint and run ' \
+           'this command before reading new files.'
+
+    def handle(self, *args, **options):
+        self.subclassed = self.get_subclassed()
+        # persons which got the rankings of a duplicate
+        self.ranking_persons = set()
+        groups = dict()
+        for person in Person.objects.order_by('pk').iterator():
+            key = get_normalized_name(person.first_name, person.last_name)
+            groups.setdefault((key, person.gender), []).append(person)
+
+        for persons in groups.values():
+            subclassed = [p for p in persons if p.pk in self.subclassed]
+            if len(subclassed) > 1:
+                raise CommandError('Persons %s have the same name and are registered more than once, merge their '
+                                   'registrations first' % ', '.join(str(p.pk) for p in subclassed))
+
+        with transaction.atomic():
+            merged = 0
+            for persons in groups.values():
+                if len(persons) > 1:
+                    merged += self.merge(persons)
+            self.merge_rankings()
+
+            changed = list()
+            for (key, gender), persons in groups.items():
+                for person in persons:
+                    if person.pk is not None and person.normalized_name != key:
+                        person.normalized_name = key
+                        changed.append(person)
+            Person.objects.bulk_update(changed, ['normalized_name'], BATCH_SIZE)
+
+        self.stdout.write(self.style.SUCCESS('Normalized %d person names, merged %d duplicated persons' % (
+            len(changed), merged)))
+        if not has_unique_name():
+            with connection.schema_editor() as editor:
+                editor.alter_unique_together(Person, [], [UNIQUE_FIELDS])
+            self.stdout.write(self.style.SUCCESS('Added the unique constraint on %s' % ', '.join(UNIQUE_FIELDS)))
+
+    @staticmethod
+    def get_subclassed():
+        """Returns the ids of the persons stored with a subclass, for example the persons of a registration."""
+        ids = set()
+        for rel in Person._meta.related_objects:
+            if rel.one_to_one and rel.field.remote_field.parent_link:
+                ids.update(rel.related_model.objects.values_list(rel.field.attname, flat=True))
+        return ids
+
+    def merge(self, persons):
+        """
+        Merges the persons into the first one, the one with a subclass row if any, and returns the number of
+        persons deleted.
+        """
+        subclassed = [p for p in persons if p.pk in self.subclassed]
+        person = subclassed[0] if subclassed else persons[0]
+        duplicates = [p for p in persons if p is not person]
+        for duplicate in duplicates:
+            if person.born is None:
+                person.born = duplicate.born
+            if not person.country:
+                person.country = duplicate.country
+        Person.objects.filter(pk=person.pk).update(born=person.born, country=person.country)
+
+        ids = [p.pk for p in duplicates]
+        self.merge_players(person, ids)
+        if PadelRanking.objects.filter(person_id__in=ids).update(person=person):
+            self.ranking_persons.add(person.pk)
+        RankingPosition.objects.filter(person_id__in=ids).update(person=person)
+        Person.objects.filter(pk__in=ids).delete()
+        for duplicate in duplicates:
+            duplicate.pk = None
+        return len(ids)
+
+    @staticmethod
+    def merge_players(person, ids):
+        """Moves the players of the duplicates to the person, players of the same team are merged."""
+        players = {player.team_id: player for player in Player.objects.filter(person=person).order_by('pk')}
+        PlayerTournament = Player.tournaments_played.through
+        for player in Player.objects.filter(person_id__in=ids).order_by('pk'):
+            kept = players.get(player.team_id)
+            if kept is None:
+                player.person = person
+                player.save(update_fields=['person'])
+                players[player.team_id] = player
+                continue
+            if kept.number is None and player.number is not None:
+                kept.number = player.number
+                kept.save(update_fields=['number'])
+            PlayerStadistic.objects.filter(player=player).update(player=kept)
+            PlayerTournament.objects.bulk_create(
+                [PlayerTournament(player_id=kept.pk, tournament_id=t)
+                 for t in player.tournaments_played.values_list('pk', flat=True)], BATCH_SIZE, ignore_conflicts=True)
+            player.delete()
+
+    def merge_rankings(self):
+        """
+        Replays the rankings of the merged persons in import order, so the rankings of a duplicate override the
+        mondays of the older rankings of the person as if they had been read for the same person, and rebuilds the
+        snapshots of the changed groups.
+        """
+        by_person = dict()
+        for batch in chunks(self.ranking_persons):
+            for ranking in PadelRanking.objects.filter(person_id__in=batch).order_by('pk'):
+                by_person.setdefault(DjangoBulkRankingFetcher._key(ranking), []).append(ranking)
+        fetcher = DjangoBulkRankingFetcher()
+        since = dict()
+        for (country, circuit, division, person_id), rankings in by_person.items():
+            ordered = sorted(rankings, key=lambda r: r.valid_from)
+            if all(r1.valid_to < r2.valid_from for r1, r2 in zip(ordered, ordered[1:])):
+                continue
+            for ranking in rankings:
+                fetcher.deleted.add(ranking.pk)
+                ranking.pk = None
+                fetcher.add_ranking(ranking)
+            group = (country, circuit, division)
+            since[group] = min(since.get(group, ordered[0].valid_from), ordered[0].valid_from)
+        if since:
+            fetcher.flush_rankings()
+            builder = RankingSnapshotBuilder()
+            for group, date in since.items():
+                builder.rebuild([group], date)
@@ -0,0 +1,96 @@
+import csv
+
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from django.db import connections
+from django.db import transaction
+
+from tournaments import csvReader
+from tournaments import fetcher
+from tournaments import pipeline
+from tournaments import statspages
+from tournaments import telemetry
+
+
+class Command(BaseCommand):
+    help = 'Parse a folder of game statistics pages into stats_game rows, written to a csv file and/or the database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'directory', nargs='?', default=None,
+            help='Folder of the pages named by FoxGame.get_game_statistic_file_to_save.')
+        parser.add_argument(
+            '--cache', default=None, help='Read the statistics pages of a fetchpages cache instead of a folder.')
+        parser.add_argument('--jobs', type=int, default=None, help='Parse the pages in a pool of worker processes.')
+        parser.add_argument('--output', default=None, help='Write the rows to a stats_game csv file.')
+        parser.add_argument('--ingest', action='store_true', help='Write the rows to the database as they are parsed.')
+        parser.add_argument(
+            '--batch-size', type=int, default=pipeline.BATCH_SIZE, help='Rows per batch written to the database.')
+        parser.add_argument('--errors', default=None, help='Write the pages which could not be parsed to a csv file.')
+        parser.add_argument(
+            '--quiet', action='store_true', help='Print a progress line instead of every row and object.')
+
+    def handle(self, *args, **options):
+        directory = options['directory']
+        output = options['output']
+        ingest = options['ingest']
+        if (directory is None) == (options['cache'] is None):
+            raise CommandError('Give a directory or --cache.')
+        if not output and not ingest:
+            raise CommandError('Give --output, --ingest or both.')
+        if options['batch_size'] < 1:
+            raise CommandError('Option --batch-size must be a positive integer.')
+        if directory is None:
+            directory = options['cache']
+            # pages are stored under their digest, the game is in the file name kept by the index
+            files = fetcher.PageCache(directory).named_pages()
+        else:
+            files = statspages.list_stats_files(directory)
+        self.stdout.write(self.style.SUCCESS('Parse %d statistics pages of "%s"' % (len(files), directory)))
+
+        stats = telemetry.start(options['quiet'])
+        reader = csvReader.CsvReader(csvReader.CsvReader.NTS_STATISTIC)
+        errors = list()
+        rows = 0
+        batch = list()
+        output_file = open(output, 'wt', encoding='utf-8', newline='') if output else None
+        # the workers must open their own database connections
+        connections.close_all()
+        try:
+            writer = csv.writer(output_file, delimiter=';') if output_file else None
+            with ProcessPoolExecutor(max_workers=options['jobs'], initializer=pipeline._init_worker) as executor, \
+                    transaction.atomic() if ingest else nullcontext():
+                # pages are parsed in parallel and their rows consumed in file order
+                for name, page_rows, error in executor.map(
+                        statspages.parse_stats_file, [path for path, name in files], [name for path, name in files],
+                        chunksize=8):
+                    if error:
+                        errors.append((name, error))
+                        self.stderr.write('%s: %s' % (name, error))
+                        continue
+                    rows += len(page_rows)
+                    if writer:
+                        writer.writerows(page_rows)
+                    if ingest:
+                        batch.extend(page_rows)
+                        if len(batch) >= options['batch_size']:
+                            reader.write_rows(batch, True)
+                            batch = list()
+                if ingest and batch:
+                    reader.write_rows(batch, True)
+        finally:
+            if output_file:
+                output_file.close()
+        stats.finish()
+
+        if options['errors']:
+            with open(options['errors'], 'wt', encoding='utf-8', newline='') as f:
+                csv.writer(f, delimiter=';').writerows(errors)
+        if ingest:
+            self.stdout.write(stats.progress_line())
+        self.stdout.write('Pages: %d, parsed: %d, failed: %d, rows: %d' % (
+            len(files), len(files) - len(errors), len(errors), rows))
+        self.stdout.write(self.style.SUCCESS('Successfully parsed statistics pages: "%s"' % directory))
@@ -0,0 +1,110 @@
+from datetime import date
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db import models
+from django.db import transaction
+from django.utils.dateparse import parse_date
+
+from tournaments.bulk import BATCH_SIZE
+from tournaments.bulk import RankingSnapshotBuilder
+from tournaments.bulk import chunks
+from tournaments.models import PadelRanking
+
+WEEK = timedelta(days=7)
+LEGACY_COLUMN = 'date'
+INTERVAL_FIELDS = ['valid_from', 'valid_to']
+
+
+def get_columns():
+    with connection.cursor() as cursor:
+        return [c.name for c in connection.introspection.get_table_description(cursor, PadelRanking._meta.db_table)]
+
+
+def to_date(value):
+    return value if isinstance(value, date) else parse_date(value)
+
+
+def collapse(rankings):
+    """
+    Returns the first ranking of every run of consecutive mondays with the same values with the interval of the run
+    and the rankings covered by those runs. The rankings are of one person, ordered by date.
+    """
+    kept = list()
+    covered = list()
+    for ranking in rankings:
+        last = kept[-1] if kept else None
+        if last is not None and ranking.legacy_date == last.valid_to:
+            # the same monday is stored twice
+            covered.append(ranking)
+        elif last is not None and ranking.legacy_date == last.valid_to + WEEK and last.same_values(ranking):
+            last.valid_to = ranking.legacy_date
+            covered.append(ranking)
+        else:
+            ranking.valid_from = ranking.valid_to = ranking.legacy_date
+            kept.append(ranking)
+    return kept, covered
+
+
+class Command(BaseCommand):
+    help = 'Convert padel rankings stored with one row per monday into validity intervals: runs of consecutive ' \
+           'mondays with the same points, plus and minus of a person become one ranking, then the date column is ' \
+           'dropped and the ranking snapshots are rebuilt.'
+
+    def handle(self, *args, **options):
+        columns = get_columns()
+        if LEGACY_COLUMN not in columns:
+            self.stdout.write(self.style.SUCCESS('Padel rankings are already stored as validity intervals'))
+            return
+
+        table = connection.ops.quote_name(PadelRanking._meta.db_table)
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                for name in INTERVAL_FIELDS:
+                    if name not in columns:
+                        cursor.execute('ALTER TABLE %s ADD COLUMN %s date NULL' % (
+                            table, connection.ops.quote_name(name)))
+
+            by_person = dict()
+            rankings = PadelRanking.objects.raw(
+                'SELECT id, %s AS legacy_date, points, plus, minus, division, country, circuit, person_id FROM %s '
+                'ORDER BY %s, id' % (connection.ops.quote_name(LEGACY_COLUMN), table,
+                                     connection.ops.quote_name(LEGACY_COLUMN)))
+            for ranking in rankings.iterator():
+                ranking.legacy_date = to_date(ranking.legacy_date)
+                by_person.setdefault(
+                    (ranking.country, ranking.circuit, ranking.division, ranking.person_id), []).append(ranking)
+
+            kept = list()
+            covered = list()
+            for person_rankings in by_person.values():
+                person_kept, person_covered = collapse(person_rankings)
+                kept.extend(person_kept)
+                covered.extend(person_covered)
+            PadelRanking.objects.bulk_update(kept, INTERVAL_FIELDS, BATCH_SIZE)
+            for batch in chunks([ranking.pk for ranking in covered]):
+                PadelRanking.objects.filter(pk__in=batch).delete()
+
+        with connection.schema_editor() as editor:
+            for name in INTERVAL_FIELDS:
+                if name not in columns:
+                    new_field = PadelRanking._meta.get_field(name)
+                    old_field = models.DateField(null=True)
+                    old_field.set_attributes_from_name(name)
+                    old_field.model = PadelRanking
+                    editor.alter_field(PadelRanking, old_field, new_field)
+            # sqlite drops the column when the table is remade for the fields above
+            if LEGACY_COLUMN in get_columns():
+                editor.execute('ALTER TABLE %s DROP COLUMN %s' % (table, connection.ops.quote_name(LEGACY_COLUMN)))
+            with connection.cursor() as cursor:
+                constraints = connection.introspection.get_constraints(cursor, PadelRanking._meta.db_table)
+            for index in PadelRanking._meta.indexes:
+                if not any(c['index'] and c['columns'] == index.fields for c in constraints.values()):
+                    editor.add_index(PadelRanking, index)
+
+        self.stdout.write(self.style.SUCCESS('Converted %d padel rankings into %d validity intervals' % (
+            len(kept) + len(covered), len(kept))))
+        created = RankingSnapshotBuilder().rebuild()
+        self.stdout.write(self.style.SUCCESS('Built %d ranking snapshots with %d positions' % (
+            created['RankingSnapshot'], created['RankingPosition'])))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from tournaments.bulk import RankingSnapshotBuilder
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the ranking snapshots and positions of every country, circuit and division from the rankings.'
+
+    def handle(self, *args, **options):
+        created = RankingSnapshotBuilder().rebuild()
+
+        self.stdout.write(self.style.SUCCESS('Built %d ranking snapshots with %d positions' % (
+            created['RankingSnapshot'], created['RankingPosition'])))
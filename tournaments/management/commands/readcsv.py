@@ -1,6 +1,15 @@
+import cProfile
+
+from contextlib import nullcontext
+
 from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
 
+from tournaments import bluegreen
 from tournaments import csvReader
+from tournaments import pipeline
+from tournaments import telemetry
+from tournaments.models import IngestJob
 
 
 class Command(BaseCommand):
@@ -10,35 +19,91 @@ class Command(BaseCommand):
         parser.add_argument(
             'type', choices=['games', 'phases', 'stats_game', 'stats_tournament', 'padel', 'person', 'padel_ranking'])
         parser.add_argument('file_path', nargs='+')
+        parser.add_argument(
+            '--bulk', action='store_true', help='Resolve objects in memory and write them with bulk inserts.')
+        parser.add_argument(
+            '--workers', type=int, default=None, help='Parse rows in a pool of worker processes.')
+        parser.add_argument(
+            '--batch-size', type=int, default=pipeline.BATCH_SIZE, help='Rows per batch of the workers.')
+        parser.add_argument(
+            '--incremental', action='store_true', help='Skip files and rows read before by the same type.')
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Commit every batch-size rows and continue after the rows committed by a previous run.')
+        parser.add_argument(
+            '--mmap', action='store_true',
+            help='Memory map the files and decode only the columns read by the type, for very large files.')
+        parser.add_argument(
+            '--replace', action='store_true',
+            help='Replace the padel games of the tournaments of the files: insert, update and delete by game.')
+        parser.add_argument(
+            '--swap', action='store_true',
+            help='Import into a copy of the sqlite database and swap it in when verified, readers are never blocked.')
+        parser.add_argument(
+            '--jobs', type=int, default=None,
+            help='Read the files in parallel, one file per worker process committing every batch-size rows.')
+        parser.add_argument(
+            '--quiet', action='store_true', help='Print a progress line instead of every row and object.')
+        parser.add_argument(
+            '--stats-json', default=None, help='Write the import summary, including peak memory, to a json file.')
+        parser.add_argument(
+            '--profile', default=None, help='Write the cProfile stats of the import to a file.')
 
     def handle(self, *args, **options):
         csv_type = options['type']
-        file_path = options['file_path'][0]
-
-        self.stdout.write(self.style.SUCCESS('Read csv file: "%s"' % file_path))
-
-        if csv_type == 'stats_game':
-            reader = csvReader.CsvReader(csvReader.CsvReader.NTS_STATISTIC)
-            reader.read_file(file_path)
-        elif csv_type == 'stats_tournament':
-            reader = csvReader.CsvReader(csvReader.CsvReader.FIT_STATISTIC)
-            reader.read_file(file_path)
-        elif csv_type == 'games':
-            reader = csvReader.CsvReader(csvReader.CsvReader.TOURNAMENT)
-            reader.read_file(file_path)
-        elif csv_type == 'padel':
-            reader = csvReader.CsvReader(csvReader.CsvReader.PADEL_GAME)
-            reader.read_file(file_path)
-        elif csv_type == 'phases':
-            reader = csvReader.CsvReader(csvReader.CsvReader.PHASE)
-            reader.read_file(file_path)
-        elif csv_type == 'person':
-            reader = csvReader.CsvReader(csvReader.CsvReader.PERSON)
-            reader.read_file(file_path)
-        elif csv_type == 'padel_ranking':
-            reader = csvReader.CsvReader(csvReader.CsvReader.PADEL_RANKING)
-            reader.read_file(file_path)
-        else:
+        files = options['file_path']
+        workers = options['workers']
+        jobs = options['jobs']
+        stats_json = options['stats_json']
+        profile = options['profile']
+        # options of CsvReader.read_file
+        read_options = dict(bulk=options['bulk'], batch_size=options['batch_size'],
+                            incremental=options['incremental'], resume=options['resume'], mmap=options['mmap'],
+                            replace=options['replace'])
+
+        if jobs and jobs > 1 and workers:
+            raise CommandError('Options --jobs and --workers can not be combined.')
+        if jobs and jobs > 1 and (options['incremental'] or options['replace']):
+            # jobs commit every batch-size rows, these options read a file in one transaction
+            raise CommandError('Options --incremental and --replace can not be combined with --jobs.')
+        if options['swap'] and (jobs and jobs > 1 or options['resume']):
+            # jobs write through their own connections, resumable checkpoints would be lost with a failed copy
+            raise CommandError('Option --swap can not be combined with --jobs or --resume.')
+        if options['swap'] and IngestJob.objects.filter(status=IngestJob.RUNNING).exists():
+            # the writes of a running job would land in the replaced database
+            raise CommandError('Option --swap can not be used while ingest jobs are running.')
+        self.stdout.write(self.style.SUCCESS('Read csv files: "%s"' % '", "'.join(files)))
+
+        if csv_type not in csvReader.CsvReader.TYPE_NAMES:
             raise Exception('Argument %s not supported.' % csv_type)
+        reader = csvReader.CsvReader(csvReader.CsvReader.TYPE_NAMES[csv_type])
+
+        stats = telemetry.start(
+            options['quiet'], sum(telemetry.count_rows(f) for f in files), stats_json is not None)
+        try:
+            with bluegreen.green_database() if options['swap'] else nullcontext():
+                if profile:
+                    profiler = cProfile.Profile()
+                    profiler.runcall(self.read_files, reader, files, jobs, workers, read_options)
+                    profiler.dump_stats(profile)
+                else:
+                    self.read_files(reader, files, jobs, workers, read_options)
+        except bluegreen.SwapError as ex:
+            raise CommandError(str(ex))
+        stats.finish()
 
-        self.stdout.write(self.style.SUCCESS('Successfully read csv file: "%s"' % file_path))
+        self.stdout.write(stats.progress_line())
+        if stats_json:
+            stats.write_json(stats_json, type=csv_type, files=files)
+        self.stdout.write(self.style.SUCCESS('Successfully read csv files: "%s"' % '", "'.join(files)))
+
+    @staticmethod
+    def read_files(reader, files, jobs, workers, read_options):
+        if jobs and jobs > 1 and len(files) > 1:
+            try:
+                pipeline.read_files(reader._type, files, jobs, **read_options)
+            except ValueError as ex:
+                raise CommandError(str(ex))
+        else:
+            for file_path in files:
+                reader.read_file(file_path, workers=workers, **read_options)
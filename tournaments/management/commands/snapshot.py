@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from tournaments import snapshot
+
+
+class Command(BaseCommand):
+    help = 'Write a columnar numpy snapshot of games, set scores, teams, players and rankings.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Folder of the snapshot, replaced when the new snapshot is complete.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        tables = snapshot.write_snapshot(path)
+
+        for table, meta in tables.items():
+            self.stdout.write('%s: %d rows' % (table, meta['rows']))
+        self.stdout.write(self.style.SUCCESS('Successfully wrote snapshot: "%s"' % path))
@@ -0,0 +1,102 @@
+import hashlib
+import itertools
+import logging
+
+from tournaments.bulk import BATCH_SIZE
+from tournaments.models import IngestCheckpoint
+from tournaments.models import IngestedFile
+from tournaments.models import IngestedRow
+
+# Get an instance of a logger
+logger = logging.getLogger(__name__)
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def row_fingerprint(row):
+    """Returns the fingerprint of a csv row ignoring surrounding blanks and trailing empty columns."""
+    cells = [cell.strip() for cell in row]
+    while cells and cells[-1] == '':
+        del cells[-1]
+    return hashlib.blake2b('\x1f'.join(cells).encode('utf-8'), digest_size=16).hexdigest()
+
+
+class Manifest:
+    """
+    Remembers the files and rows read by a CsvReader type, so reading a cumulative file again only processes the
+    rows added since the last time. Known fingerprints are loaded with a single query, rows are filtered in memory.
+    """
+
+    def __init__(self, csv_type, file):
+        self.csv_type = csv_type
+        self.file = file
+        self.digest = file_digest(file)
+        self.known = None
+        self.new = set()
+        self.skipped = 0
+        self.rows = 0
+
+    def is_file_known(self):
+        return IngestedFile.objects.filter(csv_type=self.csv_type, digest=self.digest).exists()
+
+    def load(self):
+        self.known = set(IngestedRow.objects.filter(csv_type=self.csv_type).values_list('fingerprint', flat=True))
+
+    def is_new_row(self, row):
+        self.rows += 1
+        fingerprint = row_fingerprint(row)
+        if fingerprint in self.known:
+            self.skipped += 1
+            return False
+        self.new.add(fingerprint)
+        return True
+
+    def save(self):
+        IngestedRow.objects.bulk_create(
+            [IngestedRow(csv_type=self.csv_type, fingerprint=f) for f in self.new - self.known], BATCH_SIZE)
+        IngestedFile.objects.create(
+            csv_type=self.csv_type, digest=self.digest, name=self.file[-255:], rows=self.rows)
+        self.known |= self.new
+        self.new = set()
+        logger.info('Manifest of %s: %d rows, %d skipped', self.file, self.rows, self.skipped)
+
+
+class Checkpoint:
+    """
+    Remembers the rows of a file committed by a resumable import and the digest of those rows, so the next import
+    of the same file continues after them. Rows after the checkpoint may change, for example to fix the row which
+    stopped the import; if a committed row changed the file is read again from the top.
+    """
+
+    def __init__(self, csv_type, file):
+        self.csv_type = csv_type
+        self.name = file[-255:]
+        self.digest = hashlib.sha256()
+
+    def load(self, rows):
+        """Returns the number of committed rows if the file still starts with them, otherwise 0."""
+        checkpoint = IngestCheckpoint.objects.filter(csv_type=self.csv_type, name=self.name).first()
+        if checkpoint is None:
+            return 0
+        self.update(itertools.islice(rows, checkpoint.rows))
+        if self.digest.hexdigest() == checkpoint.digest:
+            return checkpoint.rows
+        logger.warning('Committed rows of %s changed, reading it from the top', self.name)
+        self.digest = hashlib.sha256()
+        return 0
+
+    def update(self, rows):
+        for row in rows:
+            self.digest.update(row_fingerprint(row).encode('ascii'))
+
+    def save(self, rows, offset):
+        """Adds the rows to the digest and stores the checkpoint after them, offset included."""
+        self.update(rows)
+        IngestCheckpoint.objects.update_or_create(
+            csv_type=self.csv_type, name=self.name, defaults=dict(digest=self.digest.hexdigest(), rows=offset))
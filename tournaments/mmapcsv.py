@@ -0,0 +1,51 @@
+import csv
+import mmap
+import os
+
+# separator of the csv files read by CsvReader
+DELIMITER = b';'
+QUOTE = b'"'
+
+
+def read_rows(path, fexit, skip_columns=frozenset(), delimiter=DELIMITER):
+    """
+    Yields the rows of a csv file as lists of strings, splitting the records on the bytes of the memory mapped file.
+    Blank rows are skipped and the row starting with fexit ends the file before any column is decoded; columns in
+    skip_columns are not decoded and read as empty strings. Rows with quotes are parsed by the csv module.
+    """
+    fexit_bytes = fexit.encode('utf-8')
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            start = 0
+            end = len(buffer)
+            while start < end:
+                stop = buffer.find(b'\n', start)
+                if stop == -1:
+                    stop = end
+                line = buffer[start:stop]
+                # a quoted column may contain line breaks
+                while line.count(QUOTE) % 2 and stop < end:
+                    next_stop = buffer.find(b'\n', stop + 1)
+                    stop = end if next_stop == -1 else next_stop
+                    line = buffer[start:stop]
+                start = stop + 1
+
+                line = line.rstrip(b'\r')
+                if not line.strip(delimiter):
+                    continue
+                if QUOTE in line:
+                    row = next(csv.reader([line.decode('utf-8')], delimiter=delimiter.decode('ascii')))
+                    if not any(row):
+                        continue
+                    if row[0] == fexit:
+                        return
+                    yield row
+                    continue
+                if line.startswith(fexit_bytes) and (
+                        len(line) == len(fexit_bytes) or line[len(fexit_bytes):].startswith(delimiter)):
+                    return
+                yield [
+                    '' if i in skip_columns else column.decode('utf-8')
+                    for i, column in enumerate(line.split(delimiter))]
@@ -1,5 +1,10 @@
+from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.core.files.storage import FileSystemStorage
 from django.db import models
+from django.db.models import F
+from django.db.models import OuterRef
+from django.db.models import Subquery
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils.translation import ugettext_lazy as _
 from django.utils.encoding import smart_str
@@ -91,9 +96,17 @@ class Person(models.Model):
     born = models.DateField(null=True, blank=True)
     country = CountryField(null=True, blank=True)
     gender = models.CharField(max_length=1, choices=GENDER_CHOICES, null=True, default=UNKNOWN)
+    # lookup key of the full name, see get_normalized_name
+    normalized_name = models.CharField(max_length=128, db_index=True, blank=True, editable=False)
 
     class Meta:
         ordering = ['gender', 'last_name', 'first_name']
+        # databases stored before normalized_name existed get it from normalizenames after merging the duplicates
+        unique_together = ('normalized_name', 'gender')
+
+    def save(self, *args, **kwargs):
+        self.normalized_name = get_normalized_name(self.first_name, self.last_name)
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return '{0} {1} - {2}'.format(smart_str(self.first_name), smart_str(self.last_name), self.gender)
@@ -128,6 +141,9 @@ class Team(models.Model):
     players = models.ManyToManyField(Person, through='Player')
     division = models.CharField(max_length=3, choices=TOUCH_DIVISION_CHOICES)
 
+    class Meta:
+        unique_together = ('name', 'division')
+
     def __str__(self):
         return self.name
 
@@ -166,6 +182,7 @@ class Tournament(models.Model):
 
     class Meta:
         ordering = ['name']
+        unique_together = ('name', 'division', 'type', 'padel_serie')
 
     def __str__(self):
         # padel
@@ -333,6 +350,9 @@ class GameRound(models.Model):
     number_teams = models.PositiveIntegerField(default=2, validators=[MinValueValidator(0), MaxValueValidator(20)])
     category = models.CharField(default=GOLD, max_length=6, null=False, blank=False, choices=CATEGORY_ROUND_CHOICES)
 
+    class Meta:
+        unique_together = ('category', 'round', 'number_teams')
+
     def __str__(self):
         return '{:s} {:s} {:s}'.format(str(self.round), str(self.number_teams), str(self.category))
 
@@ -553,7 +573,7 @@ class GameRound(models.Model):
 
 
 class GameField(models.Model):
-    name = models.CharField(max_length=50, null=False, blank=False)
+    name = models.CharField(max_length=50, null=False, blank=False, unique=True)
 
     def __str__(self):  # Python 3: def __str__(self):
         return '{}'.format(self.name)
@@ -704,7 +724,9 @@ class PadelRanking(models.Model):
     AUDI_PLAYDAYS = 'Audi PlayDays'
     CIRCUIT = ((OFFICIAL, OFFICIAL), (AUDI_PLAYDAYS, AUDI_PLAYDAYS))
 
-    date = models.DateField()
+    # the ranking is valid for every monday between valid_from and valid_to (both included)
+    valid_from = models.DateField()
+    valid_to = models.DateField()
     points = models.PositiveIntegerField(default=0, null=False)
     plus = models.SmallIntegerField(default=None, null=True, blank=True)
     minus = models.SmallIntegerField(default=None, null=True, blank=True)
@@ -714,13 +736,170 @@ class PadelRanking(models.Model):
     person = models.ForeignKey(Person, related_name="person", on_delete=models.DO_NOTHING,
                                null=True, blank=True, default=None)
 
+    class Meta:
+        indexes = [models.Index(fields=['division', 'valid_from', 'valid_to'])]
+
+    def __str__(self):
+        return '{} {} {} - {} - {} to {}'.format(
+            self.country, self.circuit, self.division, self.person, self.valid_from, self.valid_to)
+
+    def same_values(self, other):
+        return self.points == other.points and self.plus == other.plus and self.minus == other.minus
+
+
+class RankingSnapshot(models.Model):
+    """The padel ranking of a country, circuit and division from date until the next snapshot of the group."""
+    date = models.DateField()
+    division = models.CharField(max_length=3, choices=TOUCH_DIVISION_CHOICES)
+    country = CountryField()
+    circuit = models.CharField(max_length=30, choices=PadelRanking.CIRCUIT)
+
+    class Meta:
+        unique_together = ('division', 'country', 'circuit', 'date')
+
+    def __str__(self):
+        return '{} {} {} - {}'.format(self.country, self.circuit, self.division, self.date)
+
+
+class RankingPosition(models.Model):
+    """A ranking of a snapshot with its dense rank by points and the rank of the person in the previous ranking."""
+    snapshot = models.ForeignKey(RankingSnapshot, related_name='positions', on_delete=models.CASCADE)
+    person = models.ForeignKey(Person, related_name='ranking_positions', on_delete=models.DO_NOTHING,
+                               null=True, blank=True, default=None)
+    first_name = models.CharField(max_length=30, blank=True)
+    last_name = models.CharField(max_length=30, blank=True)
+    points = models.PositiveIntegerField(default=0)
+    plus = models.SmallIntegerField(default=None, null=True, blank=True)
+    minus = models.SmallIntegerField(default=None, null=True, blank=True)
+    rank = models.PositiveIntegerField()
+    previous_rank = models.PositiveIntegerField(default=None, null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['snapshot', 'rank']), models.Index(fields=['person', 'snapshot'])]
+
+    def __str__(self):
+        return '{} - {}. {} {} ({})'.format(self.snapshot, self.rank, self.first_name, self.last_name, self.points)
+
+
+class IngestedFile(models.Model):
+    """A csv file completely read by a CsvReader of the given type."""
+    csv_type = models.PositiveSmallIntegerField()
+    digest = models.CharField(max_length=64)
+    name = models.CharField(max_length=255)
+    rows = models.PositiveIntegerField(default=0)
+    date = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('csv_type', 'digest')
+
+    def __str__(self):
+        return '{} - {} ({} rows)'.format(self.csv_type, self.name, self.rows)
+
+
+class IngestedRow(models.Model):
+    """Fingerprint of a normalised csv row already read by a CsvReader of the given type."""
+    csv_type = models.PositiveSmallIntegerField()
+    fingerprint = models.CharField(max_length=32)
+
+    class Meta:
+        unique_together = ('csv_type', 'fingerprint')
+
+
+class IngestCheckpoint(models.Model):
+    """Rows of a csv file committed by a resumable import of the given type and the digest of those rows."""
+    csv_type = models.PositiveSmallIntegerField()
+    name = models.CharField(max_length=255)
+    digest = models.CharField(max_length=64)
+    rows = models.PositiveIntegerField(default=0)
+    date = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('csv_type', 'name')
+
+    def __str__(self):
+        return '{} - {} ({} rows)'.format(self.csv_type, self.name, self.rows)
+
+
+# csv files of ingest jobs are kept out of MEDIA_ROOT, which is served
+ingest_storage = FileSystemStorage(location=settings.INGEST_ROOT)
+
+
+class IngestJob(models.Model):
+    """A csv file uploaded or dropped in a watched folder, read off the request path by the ingestworker command."""
+    PENDING = 'PENDING'
+    RUNNING = 'RUNNING'
+    DONE = 'DONE'
+    FAILED = 'FAILED'
+    STATUS_CHOICES = ((PENDING, 'Pending'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed'))
+    # same names as the types of the readcsv command
+    CSV_TYPE_CHOICES = (('padel', 'Padel games'), ('padel_ranking', 'Padel ranking'), ('phases', 'Phases'),
+                        ('games', 'Touch games'), ('stats_game', 'Touch game statistics'),
+                        ('stats_tournament', 'Touch tournament statistics'), ('person', 'Persons'))
+
+    csv_type = models.CharField(max_length=20, choices=CSV_TYPE_CHOICES, default='padel')
+    file = models.FileField(upload_to='ingest/', storage=ingest_storage)
+    bulk = models.BooleanField(default=False)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING, db_index=True)
+    rows = models.PositiveIntegerField(default=0)
+    total_rows = models.PositiveIntegerField(default=0)
+    message = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    started = models.DateTimeField(null=True, blank=True)
+    finished = models.DateTimeField(null=True, blank=True)
+    uploaded_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created']
+
+    def __str__(self):
+        return '{} - {} ({})'.format(self.csv_type, self.file.name, self.status)
+
+    def to_dict(self):
+        return {
+            'id': self.pk,
+            'csv_type': self.csv_type,
+            'file': self.file.name,
+            'status': self.status,
+            'rows': self.rows,
+            'total_rows': self.total_rows,
+            'message': self.message,
+            'created': self.created.isoformat() if self.created else None,
+            'started': self.started.isoformat() if self.started else None,
+            'finished': self.finished.isoformat() if self.finished else None,
+        }
+
+
+def get_ingest_jobs(limit=50):
+    return IngestJob.objects.all()[:limit]
+
 
 def get_padel_ranking(date=None, division=None):
     if division is None:
         division = MO
     if date is None:
         date = last_monday()
-    return PadelRanking.objects.filter(division=division).filter(date=date).order_by('-points')
+    snapshots = list(get_ranking_snapshots(date).filter(division=division).values_list('pk', flat=True))
+    positions = RankingPosition.objects.filter(snapshot__in=snapshots)
+    if len(snapshots) == 1:
+        return positions.order_by('rank', 'pk')
+    # the rankings of several countries or circuits are merged by points
+    return positions.order_by('-points', 'rank', 'pk')
+
+
+def get_ranking_snapshots(date):
+    """Returns the snapshot of every country, circuit and division valid on the date: the last one not after it."""
+    latest = RankingSnapshot.objects.filter(
+        division=OuterRef('division'), country=OuterRef('country'), circuit=OuterRef('circuit'),
+        date__lte=date).order_by('-date').values('pk')[:1]
+    return RankingSnapshot.objects.filter(date__lte=date).annotate(latest=Subquery(latest)).filter(pk=F('latest'))
+
+
+def get_person_ranking_positions(person, date=None):
+    """Returns the positions of a person in the rankings valid on the date, by default the last monday."""
+    if date is None:
+        date = last_monday()
+    return RankingPosition.objects.filter(person=person, snapshot__in=get_ranking_snapshots(date)).select_related(
+        'snapshot').order_by('snapshot__division', 'snapshot__country', 'snapshot__circuit')
 
 
 def get_tournament_games(tournament):
@@ -792,6 +971,13 @@ def no_german_chars(string):
     return string
 
 
+def get_normalized_name(first_name, last_name):
+    """Returns the lookup key of a person name ignoring case, umlauts, punctuation and repeated blanks."""
+    def key(name):
+        return ' '.join(normalize(no_german_chars(name.lower())).split())
+    return '{0},{1}'.format(key(last_name), key(first_name))
+
+
 def last_monday():
     from datetime import datetime, timedelta
     d = datetime.now().date()
@@ -0,0 +1,190 @@
+import logging
+import re
+
+from functools import lru_cache
+
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from tournaments.models import GameRound
+
+# Get an instance of a logger
+logger = logging.getLogger(__name__)
+
+# raw round names seen by an import are few, their normalized names are cached
+CACHE_SIZE = 1024
+
+QUARTER = '1/4'
+
+# POSITION CONSTANTS CONVERSION
+THIRD_POSITION = 'Third position'
+FIFTH_POSITION = 'Fifth position'
+SIXTH_POSITION = 'Sixth position'
+SEVENTH_POSITION = 'Seventh position'
+EIGHTH_POSITION = 'Eighth position'
+NINTH_POSITION = 'Ninth position'
+TENTH_POSITION = 'Tenth position'
+ELEVENTH_POSITION = 'Eleventh position'
+TWELFTH_POSITION = 'Twelfth position'
+THIRTEENTH_POSITION = 'Thirteenth position'
+FOURTEENTH_POSITION = 'Fourteenth position'
+FIFTEENTH_POSITION = 'Fifteenth position'
+SIXTEENTH_POSITION = 'Sixteenth position'
+EIGHTEENTH_POSITION = 'Eighteenth position'
+TWENTIETH_POSITION = 'Twentieth position'
+
+# spellings of rounds in csv files, the quarter sign may arrive as utf-8 bytes decoded as latin-1
+ROUND_NAMES = {'¼': QUARTER, '½': QUARTER, '\xc2\xbc': QUARTER}
+
+# names of the phases of scraped games
+ROUNDS_CONVERSIONS = {'Grand Final': 'Final',
+                      'Gold Medal Game': 'Final',
+                      'Bronze': THIRD_POSITION,
+                      'Bronze Medal Game': THIRD_POSITION,
+                      'Playoff 5th/6th': FIFTH_POSITION,
+                      'Playoff 7th/8th': SEVENTH_POSITION,
+                      'Playoff 8th/9th': EIGHTH_POSITION,
+                      'Playoff 9th/10th': NINTH_POSITION,
+                      'Playoff 10th/11th': TENTH_POSITION,
+                      'Playoff 11th/12th': ELEVENTH_POSITION,
+                      'Playoff 12th/13th': TWELFTH_POSITION,
+                      'Playoff 13th/14th': THIRTEENTH_POSITION,
+                      'Playoff 15th/16th': FIFTEENTH_POSITION,
+                      'Playoff 18th/19th': EIGHTEENTH_POSITION,
+                      'Playoff 20th/21st': TWENTIETH_POSITION,
+                      'Playoff for 5th/6th': FIFTH_POSITION,
+                      'Playoff for 7th/8th': SEVENTH_POSITION,
+                      'Playoff for 11th/12th': ELEVENTH_POSITION,
+                      'Playoff for 15th/16th': FIFTEENTH_POSITION,
+                      'Plate Final': NINTH_POSITION,
+                      'Playoff 9th/10th (Plate Final)': NINTH_POSITION,
+                      'Playoff 16th/17th (Bowl Final)': SIXTEENTH_POSITION}
+
+# replacements in the finals names of scraped games, a longer name goes before the names it contains
+FINALS_REPLACEMENTS = [('Grand Final', 'Final'),
+                       ('Playoff 5th/6th', FIFTH_POSITION),
+                       ('5th/6th Playoff', FIFTH_POSITION),
+                       ('5th/6th Seeding', FIFTH_POSITION),
+                       ('Playoff 6th/7th', SIXTH_POSITION),
+                       ('Playoff 7th/8th', SEVENTH_POSITION),
+                       ('7th/8th Playoff', SEVENTH_POSITION),
+                       ('7th/8th Seeding', SEVENTH_POSITION),
+                       ('Playoff 8th/9th', EIGHTH_POSITION),
+                       ('Playoff 9th/10th', NINTH_POSITION),
+                       ('9th/10th/11th', NINTH_POSITION),
+                       ('Playoff 10th/11th', TENTH_POSITION),
+                       ('Playoff 11th/12th', ELEVENTH_POSITION),
+                       ('Playoff 12th/13th', TWELFTH_POSITION),
+                       ('Playoff 13th/14th', THIRTEENTH_POSITION),
+                       ('Playoff 14th/15th', FOURTEENTH_POSITION),
+                       ('Playoff 15th/16th', FIFTEENTH_POSITION),
+                       ('Playoff 16th/17th', SIXTEENTH_POSITION),
+                       ('Playoff 18th/19th', EIGHTEENTH_POSITION),
+                       ('Playoff 20th/21st', TWENTIETH_POSITION),
+                       ('Bronze Final', THIRD_POSITION),
+                       ('Bronze', THIRD_POSITION),
+                       ('Seeding Semi Final 1', 'Semifinal'),
+                       ('Seeding Semi Final 2', 'Semifinal')]
+
+_finals_map = dict(FINALS_REPLACEMENTS)
+_finals_pattern = re.compile('|'.join(re.escape(name) for name, replacement in FINALS_REPLACEMENTS))
+
+
+def normalize_round(round):
+    """Returns the round name stored in GameRound for a round read from a csv file."""
+    return ROUND_NAMES.get(round, round)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def normalize_finals(finals):
+    """Returns the round of a scraped finals game, replacing the playoff names by positions in a single pass."""
+    return _finals_pattern.sub(lambda match: _finals_map[match.group(0)], finals)
+
+
+def parse_phase(phase_name):
+    """Returns the round of a scraped phase name."""
+    return ROUNDS_CONVERSIONS.get(phase_name, phase_name)
+
+
+class PhaseRegistry:
+    """
+    The GameRound table loaded once per process. Phases are shared instances found by (category, round,
+    number_teams) or by primary key; a phase missing from the registry is looked up in the database, so phases
+    created by other processes are found as well.
+    """
+
+    def __init__(self):
+        self.by_key = None
+        self.by_pk = None
+
+    def load(self):
+        self.by_key = dict()
+        self.by_pk = dict()
+        for phase in GameRound.objects.order_by('pk'):
+            self.add(phase)
+        logger.info('Loaded %d phases', len(self.by_pk))
+
+    def clear(self):
+        self.by_key = None
+        self.by_pk = None
+
+    def add(self, phase):
+        if self.by_pk is None:
+            return
+        self.by_key.setdefault((phase.category, phase.round, phase.number_teams), phase)
+        self.by_pk[phase.pk] = phase
+
+    def get(self, category, round, number_teams):
+        if self.by_key is None:
+            self.load()
+        key = (category, normalize_round(round), int(number_teams))
+        phase = self.by_key.get(key)
+        if phase is None:
+            phase = GameRound.objects.filter(category=key[0], round=key[1], number_teams=key[2]).first()
+            if phase is None:
+                raise GameRound.DoesNotExist('GameRound %s %s %s does not exist.' % key)
+            self.add(phase)
+        return phase
+
+    def get_or_create(self, category, round, number_teams):
+        try:
+            return self.get(category, round, number_teams), False
+        except GameRound.DoesNotExist:
+            phase, created = GameRound.objects.get_or_create(
+                category=category, round=normalize_round(round), number_teams=int(number_teams))
+            self.add(phase)
+            return phase, created
+
+    def get_by_pk(self, pk):
+        if self.by_pk is None or pk not in self.by_pk:
+            self.load()
+        try:
+            return self.by_pk[pk]
+        except KeyError:
+            raise GameRound.DoesNotExist('GameRound %s does not exist.' % pk)
+
+    def attach(self, games):
+        """Sets the phase of the games from the registry instead of a query per game, returns the games as a list."""
+        games = list(games)
+        for game in games:
+            game.phase = self.get_by_pk(game.phase_id)
+        return games
+
+
+# phases of the process
+registry = PhaseRegistry()
+
+
+@receiver(post_save, sender=GameRound)
+def phase_saved(sender, instance, created, **kwargs):
+    if created:
+        registry.add(instance)
+    else:
+        # the natural key of the phase may have changed
+        registry.clear()
+
+
+@receiver(post_delete, sender=GameRound)
+def phase_deleted(sender, instance, **kwargs):
+    registry.clear()
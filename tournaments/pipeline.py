@@ -0,0 +1,169 @@
+import logging
+import queue
+import threading
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import as_completed
+
+import django
+from django.db import connections
+from django.db import transaction
+from django.db.backends.signals import connection_created
+
+from tournaments import telemetry
+
+# Get an instance of a logger
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+_DONE = None
+
+
+def begin_immediate(sender, connection, **kwargs):
+    """
+    Makes the transactions of a sqlite connection take the write lock when they begin. A deferred transaction which
+    reads before its first write fails at once when another worker holds the lock, an immediate one waits for it
+    within the timeout of the connection.
+    """
+    if connection.vendor == 'sqlite':
+        connection._start_transaction_under_autocommit = lambda: connection.cursor().execute('BEGIN IMMEDIATE')
+
+
+def _init_worker():
+    # workers started with spawn do not inherit the django setup of the parent process
+    django.setup()
+    connection_created.connect(begin_immediate)
+
+
+def parse_batch(csv_type, first_row, rows):
+    """
+    Parses a batch of csv rows into csv objects in a worker process. Runs the same normalisation as the single
+    process reader: team names ordering, padel scores validation and rounds rewriting. Returns the csv objects and
+    the seconds spent parsing them.
+    """
+    from tournaments.csvReader import CsvReader
+    start = time.perf_counter()
+    reader = CsvReader(csv_type)
+    if csv_type == CsvReader.PADEL_RANKING:
+        # rankings are parsed and validated as columns, errors give the rows at fault
+        return reader.parse_rows(rows, first_row), time.perf_counter() - start
+    result = list()
+    for index, row in enumerate(rows):
+        try:
+            result.append(reader.get_csv_object(row))
+        except Exception as ex:
+            raise ValueError('Row {:d} could not be parsed: {:s} ({:s})'.format(first_row + index, str(row), str(ex)))
+    return result, time.perf_counter() - start
+
+
+class Pipeline:
+    """
+    Reads a csv file in three stages: a reader thread splits the file in batches, a process pool parses the batches
+    and the calling thread writes the parsed batches in file order. Stages are connected through a bounded queue,
+    so only a few batches are in memory at any time.
+    """
+
+    def __init__(self, reader, workers=None, batch_size=BATCH_SIZE, bulk=False):
+        if batch_size < 1:
+            raise ValueError('Argument batch_size must be a positive integer. Received : %s' % batch_size)
+        self.reader = reader
+        self.workers = workers
+        self.batch_size = batch_size
+        self.bulk = bulk
+        self.rows = 0
+
+    def read_file(self, file):
+        pending = queue.Queue(maxsize=2 * (self.workers or 1))
+        errors = list()
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker) as executor:
+            feeder = threading.Thread(target=self._feed, args=(file, executor, pending, errors), daemon=True)
+            feeder.start()
+            try:
+                with transaction.atomic():
+                    self._write(pending)
+                    feeder.join()
+                    if errors:
+                        raise errors[0]
+                    if not self.bulk:
+                        self.reader.flush_links()
+            finally:
+                # unblock the feeder if the writer failed
+                while feeder.is_alive():
+                    try:
+                        pending.get(timeout=0.1)
+                    except queue.Empty:
+                        pass
+                feeder.join()
+        return self.rows
+
+    def _feed(self, file, executor, pending, errors):
+        try:
+            batch = list()
+            first_row = 1
+            for row in self.reader.read_rows(file):
+                batch.append(row)
+                if len(batch) == self.batch_size:
+                    pending.put(executor.submit(parse_batch, self.reader._type, first_row, batch))
+                    first_row += len(batch)
+                    batch = list()
+            if batch:
+                pending.put(executor.submit(parse_batch, self.reader._type, first_row, batch))
+        except Exception as ex:
+            errors.append(ex)
+        finally:
+            pending.put(_DONE)
+
+    def _write(self, pending):
+        while True:
+            future = pending.get()
+            if future is _DONE:
+                break
+            csv_objects, parse_time = future.result()
+            telemetry.stats.add_time('parse', parse_time)
+            if self.bulk:
+                self.reader.bulk_create_django_objects(csv_objects)
+            else:
+                with telemetry.stats.timer('write'):
+                    for csv_object in csv_objects:
+                        self.reader.create_django_object(csv_object)
+            self.rows += len(csv_objects)
+            telemetry.stats.rows_done(len(csv_objects))
+            logger.info('Written %d rows', self.rows)
+
+
+def read_file_job(csv_type, file, options, quiet=False, trace_memory=False):
+    """
+    Reads a whole file in a worker process and returns the telemetry summary. The file is committed in chunks of
+    batch_size rows, so a worker holds the sqlite write lock for one chunk and the other workers wait for it within
+    the timeout of their connection.
+    """
+    from tournaments.csvReader import CsvReader
+    stats = telemetry.start(quiet, trace_memory=trace_memory)
+    CsvReader(csv_type).read_file(file, **dict(options, resume=True))
+    return stats.finish().summary()
+
+
+def read_files(csv_type, files, jobs, **options):
+    """
+    Reads several files in parallel, one file per worker process. Every file is committed in chunks, a failed file
+    continues after its committed chunks when it is read again, and entities shared between files are deduplicated by
+    the natural key unique constraints of the models.
+    """
+    stats = telemetry.stats
+    failed = list()
+    # the workers must open their own database connections
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker) as executor:
+        futures = {executor.submit(read_file_job, csv_type, file, options, stats.quiet, stats.trace_memory): file
+                   for file in files}
+        for future in as_completed(futures):
+            file = futures[future]
+            try:
+                stats.merge(future.result())
+                telemetry.echo('\nFinished reading {:s}\n'.format(file))
+            except Exception as ex:
+                logger.error('File %s could not be read: %s', file, ex)
+                failed.append('{:s} ({:s})'.format(file, str(ex)))
+    if failed:
+        raise ValueError('Files could not be read: {:s}'.format(', '.join(failed)))
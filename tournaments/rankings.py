@@ -0,0 +1,114 @@
+import logging
+
+from operator import itemgetter
+
+import numpy as np
+
+# Get an instance of a logger
+logger = logging.getLogger(__name__)
+
+# columns of a ranking row
+(COUNTRY, CIRCUIT, DIVISION, FIRST_NAME, LAST_NAME, DATE, POINTS, PLUS, MINUS) = range(9)
+# optional last monday of the ranking as written by the export, blank or missing is the last monday of the year
+VALID_TO = 9
+
+# ranges of the model fields the numbers are written to
+POINTS_RANGE = (0, 2147483647)
+BALANCE_RANGE = (-32768, 32767)
+
+
+class InvalidColumn(ValueError):
+    def __init__(self, positions):
+        super().__init__(positions)
+        self.positions = positions
+
+
+def parse_numbers(values):
+    """
+    Parses a column of numbers with decimal point or comma into a float array, blank values are NaN. Raises a
+    ValueError listing the positions of the values which are not numbers.
+    """
+    if not len(values):
+        return np.empty(0)
+    text = np.char.replace(np.char.strip(np.asarray(values, dtype=str)), ',', '.')
+    blank = text == ''
+    # the replacement widens the strings of short columns to hold nan
+    text = np.where(blank, 'nan', text)
+    try:
+        numbers = text.astype(float)
+    except ValueError:
+        invalid = list()
+        for index, value in enumerate(text):
+            try:
+                float(value)
+            except ValueError:
+                invalid.append(index)
+        raise InvalidColumn(invalid)
+    # a literal nan or inf in the file is not a blank
+    invalid = np.flatnonzero(np.isinf(numbers) | (np.isnan(numbers) & ~blank))
+    if invalid.size:
+        raise InvalidColumn(invalid.tolist())
+    return np.rint(numbers)
+
+
+class RankingColumns:
+    """
+    The rows of a ranking file as columns. Names, divisions, dates and valid to dates are lists of strings, points,
+    plus and minus are float arrays of rounded numbers with NaN for blank values. The numbers of all rows are parsed and validated
+    together, so a wrong value fails the file with the rows at fault.
+    """
+
+    def __init__(self, country, circuit, division, first_name, last_name, date, points, plus, minus, valid_to=None):
+        self.country = country
+        self.circuit = circuit
+        self.division = division
+        self.first_name = first_name
+        self.last_name = last_name
+        self.date = date
+        self.points = points
+        self.plus = plus
+        self.minus = minus
+        self.valid_to = valid_to if valid_to is not None else [''] * len(date)
+
+    def __len__(self):
+        return len(self.date)
+
+    @classmethod
+    def from_rows(cls, rows, first_row=1):
+        """Returns the columns of the csv rows, first_row is the number of the first row in the file for errors."""
+        rows = list(rows)
+        short = [first_row + index for index, row in enumerate(rows) if len(row) <= MINUS]
+        if short:
+            raise ValueError('Ranking rows {:s} have less than {:d} columns'.format(str(short), MINUS + 1))
+        columns = [list(map(itemgetter(column), rows)) for column in range(MINUS + 1)]
+
+        numbers = dict()
+        for name, column, valid_range in [('points', POINTS, POINTS_RANGE), ('plus', PLUS, BALANCE_RANGE),
+                                          ('minus', MINUS, BALANCE_RANGE)]:
+            try:
+                values = parse_numbers(columns[column])
+            except InvalidColumn as ex:
+                raise ValueError('Ranking {:s} of rows {:s} are not numbers: {:s}'.format(
+                    name, str([first_row + i for i in ex.positions]), str([columns[column][i] for i in ex.positions])))
+            with np.errstate(invalid='ignore'):
+                out = np.flatnonzero((values < valid_range[0]) | (values > valid_range[1]))
+            if out.size:
+                raise ValueError('Ranking {:s} of rows {:s} are out of range: {:s}'.format(
+                    name, str((out + first_row).tolist()), str([columns[column][i] for i in out])))
+            numbers[name] = values
+
+        blank = np.flatnonzero(np.isnan(numbers['points']))
+        if blank.size:
+            logger.warning('Ranking rows %s without points, written with 0 points', (blank + first_row).tolist())
+        valid_to = [row[VALID_TO].strip() if len(row) > VALID_TO else '' for row in rows]
+        return cls(*columns[COUNTRY:POINTS], valid_to=valid_to, **numbers)
+
+    @staticmethod
+    def integers(values, blank=None):
+        """Returns the numbers of a column as a list of ints, NaN is replaced by blank."""
+        missing = np.isnan(values)
+        result = np.where(missing, 0, values).astype(np.int64).tolist()
+        if missing.any():
+            for index in np.flatnonzero(missing).tolist():
+                result[index] = blank
+        return result
@@ -0,0 +1,66 @@
+from operator import itemgetter
+
+
+class RecordType(type):
+    """
+    Compiles the FIELDS of a record class into __slots__ and an itemgetter. FIELDS are (name, column) pairs, column
+    is the index of the field in a csv row or None for fields not read from rows. A subclass may give a column to a
+    field of its base class, the field keeps the slot of the base class.
+    """
+
+    def __new__(mcs, name, bases, namespace):
+        inherited = list()
+        for base in bases:
+            for field, column in getattr(base, '_columns', ()):
+                if field not in inherited:
+                    inherited.append(field)
+        own = [field for field, column in namespace.get('FIELDS', ()) if field not in inherited]
+        namespace['__slots__'] = tuple(own) + tuple(namespace.get('__slots__', ()))
+        cls = super().__new__(mcs, name, bases, namespace)
+
+        columns = dict((field, None) for field in inherited)
+        for base in reversed(bases):
+            columns.update(getattr(base, '_columns', ()))
+        columns.update(namespace.get('FIELDS', ()))
+        cls._columns = tuple(columns.items())
+        cls._fields = tuple(columns)
+        cls._row_fields = tuple(field for field, column in cls._columns if column is not None)
+        cls._other_fields = tuple(field for field, column in cls._columns if column is None)
+        indexes = [column for field, column in cls._columns if column is not None]
+        # a single index makes itemgetter return the value instead of a tuple
+        cls._row_getter = itemgetter(*indexes) if len(indexes) > 1 else (
+            (lambda row: (row[indexes[0]],)) if indexes else (lambda row: ()))
+        return cls
+
+
+class Record(metaclass=RecordType):
+    """
+    A parsed csv row without instance dictionary. Records are built from a row, picking the columns of the FIELDS
+    with a single itemgetter call, or from keyword arguments; fields without value are None.
+    """
+    FIELDS = ()
+
+    def __init__(self, row=None, **values):
+        if row is not None:
+            for field, value in zip(self._row_fields, self._row_getter(row)):
+                setattr(self, field, value)
+            for field in self._other_fields:
+                setattr(self, field, values.pop(field, None))
+        else:
+            for field in self._fields:
+                setattr(self, field, values.pop(field, None))
+        if values:
+            raise TypeError('{:s} has no fields {:s}'.format(type(self).__name__, ', '.join(values)))
+
+    def to_row(self, size=None):
+        """Returns the fields read from rows as a csv row of size columns, empty columns are empty strings."""
+        columns = [column for field, column in self._columns if column is not None]
+        result = [''] * (size or max(columns) + 1)
+        for field, column in self._columns:
+            if column is not None:
+                result[column] = getattr(self, field)
+        return result
+
+    def __repr__(self):
+        return '{:s}({:s})'.format(
+            type(self).__name__, ', '.join('{:s}={!r}'.format(field, getattr(self, field)) for field in self._fields))
@@ -1,4 +1,5 @@
 from tournaments.models import GameRound
+from tournaments import phases
 
 import collections
 
@@ -34,6 +35,28 @@ def all_mondays_from(d, tuple=False):
     return result
 
 
+def next_monday(d):
+    """Returns d if it is a monday otherwise the first monday after d."""
+    if d.weekday() != 0:
+        d += timedelta(days=7-d.weekday())
+    return d
+
+
+def last_monday_of_year(year=None):
+    d = datetime(year or datetime.now().year, 12, 31).date()
+    return d - timedelta(days=d.weekday())
+
+
+def ranking_interval(d):
+    """
+    Returns the first and the last monday of all_mondays_from(d) as a tuple of dates, the first monday is after the
+    last one when there are no mondays.
+    """
+    if isinstance(d, datetime):
+        d = d.date()
+    return next_monday(d), last_monday_of_year()
+
+
 def all_mondays_until(d, tuple=False):
     """
     Returns all the mondays from the given date d until the last monday of the current
@@ -285,7 +308,8 @@ class Fixtures:
         self.sorted_pools = {}
         self.sorted_divisions = {}
 
-        for game in games:
+        # the phases of the games come from the registry instead of a query per game
+        for game in phases.registry.attach(games):
             # split games in different rounds
             if game.phase.round == GameRound.LIGA:
                 self.liga_games.update({game.id: game})
@@ -0,0 +1,156 @@
+import array
+import json
+import logging
+import os
+import shutil
+
+from datetime import date
+from datetime import datetime
+
+import numpy as np
+
+from django.db import transaction
+
+from tournaments.models import Game
+from tournaments.models import GameRound
+from tournaments.models import PadelRanking
+from tournaments.models import PadelResult
+from tournaments.models import Person
+from tournaments.models import Player
+from tournaments.models import Team
+from tournaments.models import Tournament
+
+# Get an instance of a logger
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 2000
+DICTIONARY = 'dictionary.json'
+# value of null integers, strings and dates
+NULL = -1
+# dates are stored as days since the epoch
+EPOCH = date(1970, 1, 1)
+TYPECODES = {'int8': 'b', 'int16': 'h', 'int32': 'i'}
+
+# table name, queryset and columns as (column name, model field, dtype or 'str:<dictionary>' or 'date')
+TABLES = [
+    ('tournaments', lambda: Tournament.objects.order_by('pk'), [
+        ('id', 'pk', 'int32'), ('name', 'name', 'str:tournament'), ('type', 'type', 'str:type'),
+        ('division', 'division', 'str:division'), ('padel_serie', 'padel_serie', 'str:padel_serie'),
+        ('date', 'date', 'date')]),
+    ('teams', lambda: Team.objects.order_by('pk'), [
+        ('id', 'pk', 'int32'), ('name', 'name', 'str:team'), ('division', 'division', 'str:division')]),
+    ('tournament_teams', lambda: Tournament.teams.through.objects.order_by('pk'), [
+        ('tournament', 'tournament_id', 'int32'), ('team', 'team_id', 'int32')]),
+    ('persons', lambda: Person.objects.order_by('pk'), [
+        ('id', 'pk', 'int32'), ('first_name', 'first_name', 'str:first_name'),
+        ('last_name', 'last_name', 'str:last_name'), ('gender', 'gender', 'str:gender')]),
+    ('players', lambda: Player.objects.order_by('pk'), [
+        ('id', 'pk', 'int32'), ('person', 'person_id', 'int32'), ('team', 'team_id', 'int32'),
+        ('number', 'number', 'int16')]),
+    ('player_tournaments', lambda: Player.tournaments_played.through.objects.order_by('pk'), [
+        ('player', 'player_id', 'int32'), ('tournament', 'tournament_id', 'int32')]),
+    ('phases', lambda: GameRound.objects.order_by('pk'), [
+        ('id', 'pk', 'int32'), ('round', 'round', 'str:round'), ('category', 'category', 'str:category'),
+        ('number_teams', 'number_teams', 'int16')]),
+    ('games', lambda: Game.objects.order_by('pk'), [
+        ('id', 'pk', 'int32'), ('tournament', 'tournament_id', 'int32'), ('phase', 'phase_id', 'int32'),
+        ('local', 'local_id', 'int32'), ('visitor', 'visitor_id', 'int32'), ('local_score', 'local_score', 'int16'),
+        ('visitor_score', 'visitor_score', 'int16'), ('result', 'result_padel_id', 'int32')]),
+    # scores and sets are small integer fields, tie breaks and forfeits can go above the range of int8
+    ('results', lambda: PadelResult.objects.order_by('pk'), [('id', 'pk', 'int32')] + [
+        ('{}{}'.format(side, n), '{}{}'.format(side, n), 'int16') for side in ('local', 'visitor') for n in range(1, 6)
+    ] + [('winner', 'winner', 'int8')]),
+    ('rankings', lambda: PadelRanking.objects.order_by('pk'), [
+        ('person', 'person_id', 'int32'), ('country', 'country', 'str:country'), ('circuit', 'circuit', 'str:circuit'),
+        ('division', 'division', 'str:division'), ('valid_from', 'valid_from', 'date'),
+        ('valid_to', 'valid_to', 'date'), ('points', 'points', 'int32'), ('plus', 'plus', 'int16'),
+        ('minus', 'minus', 'int16')]),
+]
+
+
+class StringDictionary:
+    """Codes the values of string columns as integers, the position of the value in the dictionary."""
+
+    def __init__(self):
+        self.codes = dict()
+
+    def code(self, value):
+        if value is None:
+            return NULL
+        return self.codes.setdefault(value, len(self.codes))
+
+    def values(self):
+        return list(self.codes)
+
+
+def get_dtype(kind):
+    return 'int32' if kind == 'date' or kind.startswith('str:') else kind
+
+
+def write_table(folder, table, queryset, columns, dictionaries):
+    """Writes every column of the table as a .npy file, returns the number of rows."""
+    buffers = [array.array(TYPECODES[get_dtype(kind)]) for name, field, kind in columns]
+    converters = list()
+    for name, field, kind in columns:
+        if kind == 'date':
+            converters.append(lambda v: NULL if v is None else (v - EPOCH).days)
+        elif kind.startswith('str:'):
+            converters.append(dictionaries.setdefault(kind[4:], StringDictionary()).code)
+        else:
+            converters.append(lambda v: NULL if v is None else v)
+
+    rows = 0
+    for values in queryset.values_list(*[field for name, field, kind in columns]).iterator(chunk_size=CHUNK_SIZE):
+        for buffer, convert, value in zip(buffers, converters, values):
+            buffer.append(convert(value))
+        rows += 1
+
+    for (name, field, kind), buffer in zip(columns, buffers):
+        np.save(os.path.join(folder, '{}.{}.npy'.format(table, name)), np.frombuffer(buffer, dtype=get_dtype(kind)))
+    return rows
+
+
+def write_snapshot(path):
+    """
+    Writes a columnar snapshot of the results database into the folder path: one .npy file per column, named
+    <table>.<column>.npy, and a dictionary.json with the tables, the column types and the values of the string
+    columns. Integer columns use -1 for null values, string columns store the index of the value in its dictionary
+    and dates the days since 1970-01-01. The folder is replaced at once when the snapshot is complete.
+    """
+    tmp = path.rstrip(os.sep) + '.tmp'
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    dictionaries = dict()
+    tables = dict()
+    # a single read transaction gives a consistent snapshot
+    with transaction.atomic():
+        for table, queryset, columns in TABLES:
+            rows = write_table(tmp, table, queryset(), columns, dictionaries)
+            tables[table] = {'rows': rows, 'columns': {name: kind for name, field, kind in columns}}
+            logger.info('Snapshot of %s: %d rows', table, rows)
+
+    with open(os.path.join(tmp, DICTIONARY), 'w', encoding='utf-8') as f:
+        json.dump({'created': datetime.now().isoformat(), 'null': NULL, 'epoch': EPOCH.isoformat(), 'tables': tables,
+                   'strings': {name: d.values() for name, d in dictionaries.items()}}, f, ensure_ascii=False)
+
+    old = path.rstrip(os.sep) + '.old'
+    shutil.rmtree(old, ignore_errors=True)
+    if os.path.exists(path):
+        os.rename(path, old)
+    os.rename(tmp, path)
+    shutil.rmtree(old, ignore_errors=True)
+    return tables
+
+
+def load_snapshot(path):
+    """
+    Returns the dictionary of a snapshot and its tables as {table: {column: array}}. The arrays are memory mapped,
+    so loading a snapshot does not read the columns.
+    """
+    with open(os.path.join(path, DICTIONARY), encoding='utf-8') as f:
+        dictionary = json.load(f)
+    tables = dict()
+    for table, meta in dictionary['tables'].items():
+        tables[table] = {column: np.load(os.path.join(path, '{}.{}.npy'.format(table, column)), mmap_mode='r')
+                         for column in meta['columns']}
+    return dictionary, tables
@@ -0,0 +1,171 @@
+import gzip
+import logging
+import os
+import re
+
+from html.parser import HTMLParser
+
+from tournaments import csvdata
+from tournaments.models import get_player_gender
+
+# Get an instance of a logger
+logger = logging.getLogger(__name__)
+
+# fields of the names given by FoxGame.get_game_statistic_file_to_save
+FILE_NAME_FIELDS = ('tournament_name', 'division', 'date', 'time', 'round', 'category', 'nteams', 'local',
+                    'local_score', 'visitor_score', 'visitor')
+# headers of the columns of a player statistics table
+NAME_HEADERS = {'name', 'player', 'player name'}
+NUMBER_HEADERS = {'#', 'no', 'no.', 'number'}
+TRIES_HEADERS = {'tries', 'td', 'tds', 'touchdowns', 't'}
+MVP_HEADERS = {'mvp', 'pom', 'player of the match'}
+# a round like 1/4 has its slash replaced by an underscore in the file name
+_fraction = re.compile(r'^(\d+)_(\d+)$')
+
+
+class TableParser(HTMLParser):
+    """Collects the tables of a page as lists of rows of cell texts, nested tables are read as separate tables."""
+
+    def __init__(self):
+        super().__init__()
+        self.tables = list()
+        self._open = list()
+        self._cell = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'table':
+            self._open.append(list())
+        elif tag == 'tr' and self._open:
+            self._open[-1].append(list())
+        elif tag in ('td', 'th') and self._open and self._open[-1]:
+            self._cell = list()
+
+    def handle_endtag(self, tag):
+        if tag in ('td', 'th') and self._cell is not None:
+            self._open[-1][-1].append(' '.join(''.join(self._cell).split()))
+            self._cell = None
+        elif tag == 'table' and self._open:
+            self.tables.append(self._open.pop())
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell.append(data)
+
+
+def parse_file_name(path):
+    """Returns the game of a statistics file name as a dict of FILE_NAME_FIELDS, names have their spaces back."""
+    name = os.path.basename(path)
+    if name.endswith('.html'):
+        name = name[:-len('.html')]
+    values = name.split('-')
+    if len(values) != len(FILE_NAME_FIELDS):
+        raise ValueError('File name has {:d} fields instead of {:d}, a name may contain a dash'.format(
+            len(values), len(FILE_NAME_FIELDS)))
+    game = dict(zip(FILE_NAME_FIELDS, values))
+    for field in ('tournament_name', 'local', 'visitor', 'category'):
+        game[field] = game[field].replace('_', ' ')
+    game['round'] = _fraction.sub(r'\1/\2', game['round']).replace('_', ' ')
+    return game
+
+
+def get_column(header, names):
+    for index, cell in enumerate(header):
+        if cell.lower().rstrip(':') in names:
+            return index
+    return None
+
+
+def get_player_tables(tables):
+    """Returns the tables with a name and a tries column as (rows, name, number, tries, mvp) in page order."""
+    result = list()
+    for table in tables:
+        for position, header in enumerate(table):
+            name = get_column(header, NAME_HEADERS)
+            tries = get_column(header, TRIES_HEADERS)
+            if name is not None and tries is not None:
+                result.append((table[position + 1:], name, get_column(header, NUMBER_HEADERS), tries,
+                               get_column(header, MVP_HEADERS)))
+                break
+    return result
+
+
+def split_name(name):
+    """Returns the first and last name of a player written as 'First Last' or 'Last, First'."""
+    if ',' in name:
+        last_name, first_name = [part.strip() for part in name.split(',', 1)]
+    else:
+        first_name, _, last_name = name.partition(' ')
+    return first_name.strip(), last_name.strip()
+
+
+def get_cell(row, column):
+    return row[column] if column is not None and column < len(row) else ''
+
+
+def get_count(row, column):
+    # pages write no tries as an empty cell or a dash
+    value = get_cell(row, column)
+    return '0' if value in ('', '-') else value
+
+
+def read_page(path):
+    """Returns the text of a page file, gzipped if its name ends with .gz as the objects of the fetcher cache."""
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8', errors='replace') as f:
+        return f.read()
+
+
+def parse_stats_page(path, name=None):
+    """
+    Parses a cached game statistics page into CsvNTSStatistic rows. The game is read from the file name, name if the
+    page is stored under another one, the players from the first two player tables of the page: the local team
+    first, then the visitor team.
+    """
+    game = parse_file_name(name or path)
+    gender = get_player_gender(game['division'])
+    parser = TableParser()
+    parser.feed(read_page(path))
+    parser.close()
+    tables = get_player_tables(parser.tables)
+    if len(tables) < 2:
+        raise ValueError('Found {:d} player tables instead of 2'.format(len(tables)))
+
+    result = list()
+    for team, (rows, name, number, tries, mvp) in zip([game['local'], game['visitor']], tables):
+        for row in rows:
+            player = get_cell(row, name)
+            # totals and empty rows have no player
+            if not player or player.lower() in ('total', 'totals'):
+                continue
+            first_name, last_name = split_name(player)
+            stats = csvdata.CsvNTSStatistic(
+                tournament_name=game['tournament_name'], division=game['division'], team=team,
+                number=get_cell(row, number).lstrip('#'), first_name=first_name, last_name=last_name, gender=gender,
+                tries=get_count(row, tries), mvp=get_count(row, mvp), local=game['local'],
+                local_score=game['local_score'], visitor_score=game['visitor_score'], visitor=game['visitor'],
+                category=game['category'], team_numbers=game['nteams'])
+            stats.round = game['round']
+            result.append(stats.to_csv_array())
+    return result
+
+
+def parse_stats_file(path, name=None):
+    """
+    Parses a single file in a worker process, returns the name of the page, by default its path, the rows and the
+    error of the file, if any.
+    """
+    name = name or path
+    try:
+        return name, parse_stats_page(path, name), None
+    except Exception as ex:
+        logger.info('Statistics page %s could not be parsed: %s', name, ex)
+        return name, [], '{:s}: {:s}'.format(type(ex).__name__, str(ex))
+
+
+def list_stats_files(directory):
+    """
+    Returns the html files of a directory as (path, name) sorted by name, so rows are emitted in the same order on
+    every run.
+    """
+    return [(path, path) for path in sorted(
+        os.path.join(directory, name) for name in os.listdir(directory) if name.endswith('.html'))]
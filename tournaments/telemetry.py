@@ -0,0 +1,146 @@
+import json
+import logging
+import time
+import tracemalloc
+
+from contextlib import contextmanager
+
+# Get an instance of a logger
+logger = logging.getLogger(__name__)
+
+
+def count_rows(file):
+    """Returns the number of lines of a file, used as total to estimate the remaining time."""
+    with open(file, 'rb') as f:
+        return sum(block.count(b'\n') for block in iter(lambda: f.read(1 << 20), b''))
+
+
+class IngestStats:
+    """
+    Collects the telemetry of an import: rows written, time spent per stage (parse, resolve, write), objects
+    created and found per model and optionally the peak memory traced by tracemalloc.
+    """
+    PROGRESS_INTERVAL = 5.0
+
+    def __init__(self, quiet=False, total_rows=None, trace_memory=False):
+        self.quiet = quiet
+        self.total_rows = total_rows
+        self.trace_memory = trace_memory
+        self.rows = 0
+        self.skipped = 0
+        self.stages = dict()
+        self.created = dict()
+        self.found = dict()
+        self.elapsed = None
+        self.peak_memory = None
+        # called with the stats at every progress line
+        self.listener = None
+        self.started = self._last_progress = time.perf_counter()
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def timer(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - start)
+
+    def add_time(self, stage, seconds):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def fetched(self, obj, created=False):
+        if obj is None:
+            return
+        counter = self.created if created else self.found
+        name = type(obj).__name__
+        counter[name] = counter.get(name, 0) + 1
+
+    def count_created(self, name, n):
+        self.created[name] = self.created.get(name, 0) + n
+
+    def count_found(self, name, n):
+        self.found[name] = self.found.get(name, 0) + n
+
+    def count(self, created, found):
+        """Adds the objects created and found per model by a bulk import."""
+        for name, n in created.items():
+            self.count_created(name, n)
+        for name, n in found.items():
+            if n:
+                self.count_found(name, n)
+
+    def rows_done(self, n=1):
+        self.rows += n
+        now = time.perf_counter()
+        if now - self._last_progress >= self.PROGRESS_INTERVAL:
+            self._last_progress = now
+            print(self.progress_line(now))
+            if self.listener:
+                self.listener(self)
+
+    def merge(self, summary):
+        """Adds the summary of an import run by another process."""
+        for stage, seconds in summary['stages_seconds'].items():
+            self.add_time(stage, seconds)
+        for name, n in summary['created'].items():
+            self.count_created(name, n)
+        for name, n in summary['found'].items():
+            self.count_found(name, n)
+        if summary['peak_memory_bytes'] is not None:
+            self.peak_memory = max(self.peak_memory or 0, summary['peak_memory_bytes'])
+        self.skipped += summary['skipped_rows']
+        self.rows_done(summary['rows'])
+
+    def progress_line(self, now=None):
+        elapsed = (now or time.perf_counter()) - self.started
+        speed = self.rows / elapsed if elapsed > 0 else 0.0
+        if self.total_rows and speed > 0:
+            eta = max(self.total_rows - self.rows - self.skipped, 0) / speed
+            return 'Progress: {:d}/{:d} rows ({:.1f} rows/s, ETA {:.0f}s)'.format(
+                self.rows, self.total_rows, speed, eta)
+        return 'Progress: {:d} rows ({:.1f} rows/s)'.format(self.rows, speed)
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.started
+        if self.trace_memory and tracemalloc.is_tracing():
+            self.peak_memory = max(self.peak_memory or 0, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        return self
+
+    def summary(self):
+        elapsed = self.elapsed if self.elapsed is not None else time.perf_counter() - self.started
+        return {
+            'rows': self.rows,
+            'skipped_rows': self.skipped,
+            'elapsed_seconds': round(elapsed, 3),
+            'rows_per_second': round(self.rows / elapsed, 1) if elapsed > 0 else None,
+            'stages_seconds': {k: round(v, 3) for k, v in self.stages.items()},
+            'created': self.created,
+            'found': self.found,
+            'peak_memory_bytes': self.peak_memory,
+        }
+
+    def write_json(self, path, **extra):
+        summary = self.summary()
+        summary.update(extra)
+        with open(path, 'w') as f:
+            json.dump(summary, f, indent=2, sort_keys=True)
+        logger.info('Import summary written to %s', path)
+
+
+# telemetry of the running import, replaced by start()
+stats = IngestStats()
+
+
+def start(quiet=False, total_rows=None, trace_memory=False):
+    global stats
+    stats = IngestStats(quiet, total_rows, trace_memory)
+    return stats
+
+
+def echo(*args):
+    """Prints per row and per file information unless the running import is quiet."""
+    if not stats.quiet:
+        print(*args)
@@ -0,0 +1,448 @@
+import csv
+import os
+import shutil
+import sqlite3
+import stat
+import tempfile
+import threading
+
+from contextlib import redirect_stdout
+from datetime import date
+from functools import partial
+from http.server import SimpleHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from io import StringIO
+
+from django.apps import apps
+from django.core.management import call_command
+from django.db import connection
+from django.db import transaction
+from django.test import SimpleTestCase
+from django.test import TestCase
+
+from tournaments import bluegreen
+from tournaments import csvdata
+from tournaments import fetcher
+from tournaments import mmapcsv
+from tournaments import snapshot
+from tournaments import telemetry
+from tournaments.bulk import RankingSnapshotBuilder
+from tournaments.bulk import bulk_create_with_ids
+from tournaments.bulk import bulk_get_or_create
+from tournaments.bulk import get_result_values
+from tournaments.csvReader import CsvReader
+from tournaments.models import Game
+from tournaments.models import GameRound
+from tournaments.models import PadelRanking
+from tournaments.models import PadelResult
+from tournaments.models import Person
+from tournaments.models import Player
+from tournaments.models import RankingSnapshot
+from tournaments.models import Team
+from tournaments.models import Tournament
+from tournaments.service import last_monday_of_year
+
+STATS_PAGE = """<html><body>
+<table><tr><th>#</th><th>Name</th><th>Tries</th><th>MVP</th></tr>
+<tr><td>7</td><td>Hans Muller</td><td>2</td><td>1</td></tr>
+<tr><td>9</td><td>Karl Weber</td><td>-</td><td></td></tr></table>
+<table><tr><th>#</th><th>Player</th><th>TD</th></tr>
+<tr><td>3</td><td>Smith, John</td><td>1</td></tr><tr><td></td><td>Total</td><td>1</td></tr></table>
+</body></html>"""
+
+PADEL_GAMES = """GPS Berlin;GPS-500;MO;01/03/2018;;;PoolA;Gold;4;Müller;Hans;Schmidt;Peter;Weber;Karl;Becker;Jan;;6;4;6;3
+GPS Berlin;GPS-500;MO;01/03/2018;;;PoolA;Gold;4;Müller;Hans;Schmidt;Peter;Fischer;Tom;Wagner;Uwe;;3;6;6;4;6;2
+GPS Berlin;GPS-500;MO;01/03/2018;;;PoolA;Gold;4;Weber;Karl;Becker;Jan;Fischer;Tom;Wagner;Uwe;;6;0;6;1
+GPS Berlin;GPS-500;MO;01/03/2018;;;KO1;Gold;2;Schmidt;Peter;Müller;Hans;Wagner;Uwe;Fischer;Tom;;7;5;6;4
+
+GPS Hamburg;GPS-250;WO;08/03/2018;;;PoolA;Gold;4;Meier;Anna;Koch;Eva;Roth;Lisa;Frank;Mia;;6;4;6;3
+####
+ignored;row
+"""
+
+
+def setUpModule():
+    # the apps have no migrations, the tables of the database tests are created from the models
+    with connection.schema_editor() as editor:
+        for label in ['tournaments', 'anmeldung']:
+            for model in apps.get_app_config(label).get_models():
+                editor.create_model(model)
+
+
+def write_file(folder, name, text):
+    path = os.path.join(folder, name)
+    with open(path, 'wt', encoding='utf-8') as f:
+        f.write(text)
+    return path
+
+
+def read_csv(csv_type, path, **options):
+    """Reads a csv file like readcsv --quiet, returns the telemetry of the import."""
+    stats = telemetry.start(quiet=True)
+    with redirect_stdout(StringIO()):
+        CsvReader(csv_type).read_file(path, **options)
+    return stats
+
+
+def get_games():
+    return sorted((g.tournament.name, g.phase.round, g.local.name, g.visitor.name, g.local_score, g.visitor_score,
+                   get_result_values(g.result_padel)) for g in Game.objects.select_related(
+        'tournament', 'phase', 'local', 'visitor', 'result_padel'))
+
+
+def get_padel_rows():
+    """Returns the games, players and links of the database by natural key."""
+    players = sorted((p.person.first_name, p.person.last_name, p.person.gender, p.team.name, p.number)
+                     for p in Player.objects.select_related('person', 'team'))
+    tournament_teams = sorted((t.name, team.name) for t in Tournament.objects.all() for team in t.teams.all())
+    player_tournaments = sorted((p.person.last_name, p.team.name, t.name)
+                                for p in Player.objects.select_related('person', 'team')
+                                for t in p.tournaments_played.all())
+    return get_games(), players, tournament_teams, player_tournaments
+
+
+def get_rankings(last_name):
+    return list(PadelRanking.objects.filter(person__last_name=last_name).order_by('valid_from').values_list(
+        'valid_from', 'valid_to', 'points'))
+
+
+class PadelImportTestCase(TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        for round, number_teams in [('PoolA', 4), ('KO1', 2)]:
+            GameRound.objects.create(category='Gold', round=round, number_teams=number_teams)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class SwapDatabaseTest(SimpleTestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.live = os.path.join(self.folder, 'db.sqlite3')
+        db = sqlite3.connect(self.live)
+        db.execute('CREATE TABLE t (x INTEGER)')
+        db.commit()
+        db.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_swap_keeps_mode(self):
+        os.chmod(self.live, 0o660)
+        green = self.live + bluegreen.GREEN_SUFFIX
+        old_umask = os.umask(0o077)
+        try:
+            bluegreen.copy_database(self.live, green)
+        finally:
+            os.umask(old_umask)
+        self.assertEqual(stat.S_IMODE(os.stat(green).st_mode), 0o600)
+
+        bluegreen.swap_database(self.live, green)
+        live_stat = os.stat(self.live)
+        self.assertEqual(stat.S_IMODE(live_stat.st_mode), 0o660)
+        blue_stat = os.stat(self.live + bluegreen.BLUE_SUFFIX)
+        self.assertEqual((live_stat.st_uid, live_stat.st_gid), (blue_stat.st_uid, blue_stat.st_gid))
+
+    def test_swap_refused_after_write(self):
+        green = self.live + bluegreen.GREEN_SUFFIX
+        counter = bluegreen.get_change_counter(self.live)
+        bluegreen.copy_database(self.live, green)
+        db = sqlite3.connect(self.live)
+        db.execute('INSERT INTO t VALUES (1)')
+        db.commit()
+        db.close()
+
+        with self.assertRaises(bluegreen.SwapError):
+            bluegreen.swap_database(self.live, green, counter=counter)
+        db = sqlite3.connect(self.live)
+        self.assertEqual(db.execute('SELECT COUNT(*) FROM t').fetchone(), (1,))
+        db.close()
+
+
+class FetchedStatsPagesTest(SimpleTestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        site = os.path.join(self.folder, 'site')
+        os.makedirs(os.path.join(site, 'match'))
+        with open(os.path.join(site, 'match', '1.html'), 'wt', encoding='utf-8') as f:
+            f.write(STATS_PAGE)
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), partial(QuietHandler, directory=site))
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.folder)
+
+    def test_parsestats_reads_fetcher_cache(self):
+        link = 'http://127.0.0.1:{:d}/match/1.html'.format(self.server.server_address[1])
+        game = csvdata.FoxGame.from_csv_row(
+            ['World Cup 2015', 'MO', '30/04/15', '10:00', '1', 'Pool A', 'Gold', '16', '', 'Germany', '2', '1',
+             'England', link])
+        cache = os.path.join(self.folder, 'cache')
+        page_fetcher = fetcher.Fetcher(fetcher.PageCache(cache), retries=0)
+        page_fetcher.sync(None, [game])
+        self.assertEqual(page_fetcher.downloaded, 1)
+
+        output = os.path.join(self.folder, 'stats.csv')
+        call_command('parsestats', '--cache', cache, '--output', output, '--jobs', '1', '--quiet',
+                     stdout=StringIO(), stderr=StringIO())
+        with open(output, 'rt', encoding='utf-8', newline='') as f:
+            rows = list(csv.reader(f, delimiter=';'))
+        self.assertEqual([row[2:6] for row in rows], [
+            ['Germany', '7', 'Hans', 'Muller'], ['Germany', '9', 'Karl', 'Weber'], ['England', '3', 'John', 'Smith']])
+        self.assertEqual(rows[0][9:], ['Germany', '2', '1', 'England', 'Gold', 'Pool A', '16'])
+
+
+class BulkImportTest(PadelImportTestCase):
+
+    def test_bulk_path_writes_the_rows_of_the_row_path(self):
+        path = write_file(self.folder, 'padel.csv', PADEL_GAMES)
+        read_csv(CsvReader.PADEL_GAME, path)
+        expected = get_padel_rows()
+        self.assertEqual(len(expected[0]), 5)
+
+        for model in [Game, PadelResult, Player, Person, Team, Tournament]:
+            model.objects.all().delete()
+        read_csv(CsvReader.PADEL_GAME, path, bulk=True)
+        self.assertEqual(get_padel_rows(), expected)
+
+    def test_bulk_import_counts_found_objects(self):
+        path = write_file(self.folder, 'padel.csv', PADEL_GAMES)
+        read_csv(CsvReader.PADEL_GAME, path, bulk=True)
+        stats = read_csv(CsvReader.PADEL_GAME, path, bulk=True)
+        self.assertEqual(stats.found, {'Game': 5, 'Person': 10, 'Player': 10, 'Team': 5, 'Tournament': 2})
+        self.assertEqual(sum(stats.created.values()), 0)
+
+    def test_bulk_get_or_create_sets_the_ids_of_stored_rows(self):
+        stored = Team.objects.create(name='Müller - Schmidt', division='MO')
+        teams = [Team(name='Müller - Schmidt', division='MO'), Team(name='Müller - Schmidt', division='WO')]
+        with transaction.atomic():
+            self.assertEqual(bulk_get_or_create(Team, teams, ('name', 'division')), 1)
+        self.assertEqual(teams[0].pk, stored.pk)
+        self.assertEqual(teams[1].pk, Team.objects.get(name='Müller - Schmidt', division='WO').pk)
+        self.assertEqual(Team.objects.count(), 2)
+
+    def test_bulk_create_with_ids_sets_the_ids_of_inserted_rows(self):
+        tournaments = [Tournament(name='GPS %d' % i, type='PADEL') for i in range(3)]
+        with transaction.atomic():
+            bulk_create_with_ids(Tournament, tournaments)
+        self.assertEqual([t.pk for t in tournaments],
+                         [Tournament.objects.get(name=t.name).pk for t in tournaments])
+
+
+class QuietImportTest(PadelImportTestCase):
+
+    def test_quiet_imports_print_nothing(self):
+        path = write_file(self.folder, 'padel.csv', PADEL_GAMES)
+        for options in [{}, {'bulk': True}, {'mmap': True}, {'resume': True}, {'incremental': True},
+                        {'incremental': True}, {'replace': True}]:
+            telemetry.start(quiet=True)
+            out = StringIO()
+            with redirect_stdout(out):
+                CsvReader(CsvReader.PADEL_GAME).read_file(path, **options)
+            self.assertEqual(out.getvalue(), '', options)
+
+
+class IdempotentImportTest(PadelImportTestCase):
+
+    def test_reading_a_file_again_writes_nothing(self):
+        path = write_file(self.folder, 'padel.csv', PADEL_GAMES)
+        for bulk in [False, True]:
+            read_csv(CsvReader.PADEL_GAME, path, bulk=bulk)
+            expected = get_padel_rows()
+            read_csv(CsvReader.PADEL_GAME, path, bulk=bulk)
+            self.assertEqual(get_padel_rows(), expected)
+            # every result belongs to a game
+            self.assertEqual(PadelResult.objects.count(), Game.objects.count())
+
+
+class ManifestTest(PadelImportTestCase):
+
+    def test_incremental_reading_skips_known_files_and_rows(self):
+        path = write_file(self.folder, 'padel.csv', PADEL_GAMES)
+        read_csv(CsvReader.PADEL_GAME, path, bulk=True, incremental=True)
+        self.assertEqual(Game.objects.count(), 5)
+
+        stats = read_csv(CsvReader.PADEL_GAME, path, bulk=True, incremental=True)
+        self.assertEqual(stats.rows, 0)
+
+        games = PADEL_GAMES.replace('####', 'GPS Hamburg;GPS-250;WO;08/03/2018;;;KO1;Gold;2;'
+                                            'Meier;Anna;Koch;Eva;Roth;Lisa;Frank;Mia;;6;2;6;2\n####')
+        path = write_file(self.folder, 'padel.csv', games)
+        stats = read_csv(CsvReader.PADEL_GAME, path, bulk=True, incremental=True)
+        self.assertEqual((stats.rows, stats.skipped), (1, 5))
+        self.assertEqual(Game.objects.count(), 6)
+
+    def test_resume_continues_after_the_committed_chunks(self):
+        games = PADEL_GAMES.replace(';KO1;', ';KO9;')
+        path = write_file(self.folder, 'padel.csv', games)
+        with self.assertRaises(GameRound.DoesNotExist), self.assertLogs('tournaments.csvReader', 'ERROR'):
+            read_csv(CsvReader.PADEL_GAME, path, resume=True, batch_size=2)
+        self.assertEqual(Game.objects.count(), 2)
+
+        # the row which stopped the import is fixed
+        path = write_file(self.folder, 'padel.csv', PADEL_GAMES)
+        stats = read_csv(CsvReader.PADEL_GAME, path, resume=True, batch_size=2)
+        self.assertEqual((stats.rows, stats.skipped), (3, 2))
+        self.assertEqual(Game.objects.count(), 5)
+
+
+class ReplaceTest(PadelImportTestCase):
+
+    def test_replace_writes_the_changed_games(self):
+        path = write_file(self.folder, 'padel.csv', PADEL_GAMES)
+        read_csv(CsvReader.PADEL_GAME, path, bulk=True)
+        kept = Game.objects.get(local__name='Becker - Weber')
+
+        lines = PADEL_GAMES.splitlines()
+        # the first game gets another score, the second one is missing and the last one is new
+        games = '\n'.join([lines[0].replace(';6;4;6;3', ';6;4;6;4'), lines[2], lines[3], lines[5],
+                           lines[5].replace(';PoolA;Gold;4;', ';KO1;Gold;2;'), '####'])
+        path = write_file(self.folder, 'padel.csv', games)
+        read_csv(CsvReader.PADEL_GAME, path, replace=True)
+
+        self.assertEqual(get_games(), [
+            ('GPS Berlin', 'KO1', 'Müller - Schmidt', 'Fischer - Wagner', 2, 0,
+             (7, 6, None, None, None, 5, 4, None, None, None, 1)),
+            ('GPS Berlin', 'PoolA', 'Becker - Weber', 'Fischer - Wagner', 2, 0,
+             (6, 6, None, None, None, 0, 1, None, None, None, 1)),
+            ('GPS Berlin', 'PoolA', 'Müller - Schmidt', 'Becker - Weber', 2, 0,
+             (6, 6, None, None, None, 4, 4, None, None, None, 1)),
+            ('GPS Hamburg', 'KO1', 'Koch - Meier', 'Frank - Roth', 2, 0,
+             (6, 6, None, None, None, 4, 3, None, None, None, 1)),
+            ('GPS Hamburg', 'PoolA', 'Koch - Meier', 'Frank - Roth', 2, 0,
+             (6, 6, None, None, None, 4, 3, None, None, None, 1))])
+        # unchanged games keep their rows
+        self.assertEqual(Game.objects.get(local__name='Becker - Weber').pk, kept.pk)
+        self.assertEqual(PadelResult.objects.count(), Game.objects.count())
+
+
+class RankingIntervalTest(TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.end = last_monday_of_year()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def read_rankings(self, text):
+        read_csv(CsvReader.PADEL_RANKING, write_file(self.folder, 'ranking.csv', text))
+
+    def test_newer_rankings_split_older_intervals(self):
+        self.read_rankings('DE;Official;MO;Hans;Müller;01/01/2018;100;3;1\n')
+        self.assertEqual(get_rankings('Müller'), [(date(2018, 1, 1), self.end, 100)])
+
+        self.read_rankings('DE;Official;MO;Hans;Müller;04/06/2018;130;3;1\n')
+        self.assertEqual(get_rankings('Müller'), [
+            (date(2018, 1, 1), date(2018, 5, 28), 100), (date(2018, 6, 4), self.end, 130)])
+
+        # a ranking with valid to overrides the mondays of its interval only
+        self.read_rankings('DE;Official;MO;Hans;Müller;05/03/2018;120;3;1;26/03/2018\n')
+        self.assertEqual(get_rankings('Müller'), [
+            (date(2018, 1, 1), date(2018, 2, 26), 100), (date(2018, 3, 5), date(2018, 3, 26), 120),
+            (date(2018, 4, 2), date(2018, 5, 28), 100), (date(2018, 6, 4), self.end, 130)])
+
+    def test_same_ranking_read_again_writes_nothing(self):
+        self.read_rankings('DE;Official;MO;Hans;Müller;01/01/2018;100;3;1\n')
+        pks = list(PadelRanking.objects.values_list('pk', flat=True))
+        self.read_rankings('DE;Official;MO;Hans;Müller;01/01/2018;100;3;1\n')
+        self.assertEqual(list(PadelRanking.objects.values_list('pk', flat=True)), pks)
+
+
+class RankingSnapshotTest(TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_snapshots_have_dense_ranks_and_previous_ranks(self):
+        path = write_file(self.folder, 'ranking.csv', '\n'.join([
+            'DE;Official;MO;Hans;Müller;01/01/2018;100;;',
+            'DE;Official;MO;Peter;Schmidt;01/01/2018;100;;',
+            'DE;Official;MO;Karl;Weber;01/01/2018;90;;',
+            'DE;Official;MO;Karl;Weber;05/03/2018;120;;']))
+        read_csv(CsvReader.PADEL_RANKING, path)
+
+        snapshots = RankingSnapshot.objects.filter(country='DE', circuit='Official', division='MO').order_by('date')
+        self.assertEqual([s.date for s in snapshots][:2], [date(2018, 1, 1), date(2018, 3, 5)])
+        positions = [[(p.last_name, p.points, p.rank, p.previous_rank)
+                      for p in s.positions.order_by('rank', 'last_name')] for s in snapshots[:2]]
+        self.assertEqual(positions, [
+            [('Müller', 100, 1, None), ('Schmidt', 100, 1, None), ('Weber', 90, 2, None)],
+            [('Weber', 120, 1, 2), ('Müller', 100, 2, 1), ('Schmidt', 100, 2, 1)]])
+
+        # rebuilding every group gives the same snapshots
+        RankingSnapshotBuilder().rebuild()
+        rebuilt = RankingSnapshot.objects.filter(country='DE', circuit='Official', division='MO').order_by('date')
+        self.assertEqual([[(p.last_name, p.rank, p.previous_rank) for p in s.positions.order_by('rank', 'last_name')]
+                          for s in rebuilt[:2]], [[p[:1] + p[2:] for p in ps] for ps in positions])
+
+
+class ColumnarSnapshotTest(TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_results_keep_scores_above_int8(self):
+        PadelResult.objects.create(local1=6, visitor1=4, local2=200, visitor2=198, winner=1)
+        path = os.path.join(self.folder, 'snapshot')
+        snapshot.write_snapshot(path)
+        dictionary, tables = snapshot.load_snapshot(path)
+        results = tables['results']
+        self.assertEqual([int(results[c][0]) for c in ['local1', 'visitor1', 'local2', 'visitor2', 'local3']],
+                         [6, 4, 200, 198, snapshot.NULL])
+
+
+class MmapReaderTest(SimpleTestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def read_with_csv(self, path):
+        rows = list()
+        with open(path, 'rt', encoding='utf-8', newline='') as f:
+            for row in csv.reader(f, delimiter=';'):
+                if not any(row):
+                    continue
+                if row[0] == '####':
+                    break
+                rows.append(row)
+        return rows
+
+    def test_mmap_rows_are_the_rows_of_the_csv_module(self):
+        text = ('DE;Official;MO;Hans;Müller;01/01/2018;100;3;1\r\n'
+                '\n'
+                ';;;\n'
+                'DE;Official;MO;"Peter; Jr";"Schmidt ""Pit""";01/01/2018;80;2;2\n'
+                'DE;Official;WO;"Anna\nMaria";Meier;01/01/2018;50;;\n'
+                'DE;Official;WO;Eva;Koch;01/01/2018;40;;\n'
+                '####;\n'
+                'DE;Official;WO;Lisa;Roth;01/01/2018;30;;\n')
+        path = write_file(self.folder, 'ranking.csv', text)
+        rows = list(mmapcsv.read_rows(path, '####'))
+        self.assertEqual(rows, self.read_with_csv(path))
+        self.assertEqual(len(rows), 4)
+
+    def test_skipped_columns_are_not_decoded(self):
+        path = write_file(self.folder, 'ranking.csv', 'DE;Official;MO;Hans;Müller;01/01/2018;100;3;1\n')
+        self.assertEqual(list(mmapcsv.read_rows(path, '####', frozenset([0, 5]))),
+                         [['', 'Official', 'MO', 'Hans', 'Müller', '', '100', '3', '1']])